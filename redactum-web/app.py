@@ -1,14 +1,78 @@
-from flask import Flask, render_template, request, jsonify
-import json
+from flask import Flask, request, jsonify, Response, stream_with_context, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 import os
+import sys
 from datetime import datetime
 import re
 import math
-import postprocess as pp
+import time
+import chunking
+import ratelimit
+import resilience
+import metrics
+import jobs
+import postprocess_pool
+import microbatch
+import paragraph_cache
+import startup
+import textpatch
+import compression
+import capture
+import httpclient
+import httpcache
+import jsoncodec
+import schemas
+import speculation
+import fewshot
+import lint
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 app = Flask(__name__)
 
+import importlib.util
 import tempfile
+import threading
+from functools import lru_cache
+
+
+def _request_timings():
+    """Per-request codec timings reported in the Server-Timing header"""
+    return g.setdefault('json_timings', {}) if has_request_context() else None
+
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """Flask's JSON (jsonify, request.json, |tojson) through jsoncodec"""
+
+    def dumps(self, obj, **kwargs):
+        return jsoncodec.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return jsoncodec.decode(s, 'request', timings=_request_timings())
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = jsoncodec.encode(obj, 'response', default=self.default, timings=_request_timings())
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+app.json = CodecJSONProvider(app)
+
+
+def request_data(schema):
+    """Decode the JSON request body and check it against a schemas.* TypedDict.
+
+    An empty body decodes to {}. Malformed JSON or mistyped fields raise
+    schemas.SchemaError, which is answered with 400.
+    """
+    raw = request.get_data(cache=True)
+    if not raw.strip():
+        return {}
+    try:
+        body = jsoncodec.decode(raw, 'request', timings=_request_timings())
+    except jsoncodec.DecodeError:
+        raise schemas.SchemaError('Request body is not valid JSON') from None
+    return schemas.validate(body, schema)
 
 # Configuration
 # Persist settings in a user-writable location by default so API keys survive
@@ -34,6 +98,42 @@ DEFAULT_SETTINGS = {
     }
 }
 
+# Background refinement jobs (see jobs.py) persist next to the settings file so
+# queued work survives restarts. Override with REDACTUM_JOBS_DB.
+JOBS_DB = os.environ.get('REDACTUM_JOBS_DB') or os.path.join(DEFAULT_SETTINGS_DIR, 'jobs.sqlite3')
+JOB_WORKERS = int(os.environ.get('REDACTUM_JOB_WORKERS', '2'))
+
+# Optional cross-request micro-batching of short inputs. Enable with
+# settings["microBatching"] = {"enabled": true, "windowMs": 10, "maxItems": 8}.
+MICRO_BATCHER = microbatch.MicroBatcher()
+MICROBATCH_MAX_ITEM_TOKENS = 300
+
+# Paragraph results shared by /api/postprocess requests (live preview in the editor)
+PARAGRAPH_CACHE = paragraph_cache.ParagraphCache()
+
+# Optional speculative prefetch of retries and tone switches. Enable with
+# settings["speculation"] = {"enabled": true, "tones": 1, "choices": 2, "tokensPerMinute": 20000};
+# requests need a "sessionId" and may opt out with "speculate": false.
+SPECULATOR = speculation.Speculator()
+
+# /api/refine/batch limits: items per request and concurrent provider calls.
+BATCH_MAX_ITEMS = 500
+BATCH_DEFAULT_CONCURRENCY = 4
+BATCH_MAX_CONCURRENCY = 16
+
+# Completion cap sent with every provider call. Inputs estimated above
+# CHUNK_TOKEN_BUDGET are split into paragraph-aligned chunks that are refined in
+# parallel so long documents are not truncated at this limit.
+MAX_COMPLETION_TOKENS = 2000
+CHUNK_TOKEN_BUDGET = chunking.DEFAULT_CHUNK_TOKENS
+CHUNK_MAX_WORKERS = 4
+
+# Time budget of one refine request in seconds (settings["requestTimeout"] overrides;
+# clients may ask for less with an X-Request-Timeout header). Provider calls get the
+# remaining budget as their timeout, and postprocessing skips optional steps when
+# little of it is left.
+REQUEST_TIMEOUT_SECONDS = 60
+
 # Tone definitions
 TONES = [
     {"id": "formal", "name": "Formal", "description": "Structured, precise, impersonal", "instruction": "Refine this text to be formal and professional. Use precise language, avoid contractions, maintain a structured tone, and focus on clarity and correctness."},
@@ -47,6 +147,7 @@ TONES = [
     {"id": "empathetic", "name": "Empathetic", "description": "Emotionally aware", "instruction": "Refine this text to be empathetic and understanding. Acknowledge feelings while providing clear communication."},
     {"id": "inspirational", "name": "Inspirational", "description": "Motivating, uplifting", "instruction": "Refine this text to be inspirational and motivating. Use uplifting language that encourages action and positive change."}
 ]
+capture.register_tones(t['id'] for t in TONES)
 
 # Quality control rules (same as terminal app)
 QUALITY_RULES = """
@@ -107,6 +208,16 @@ Delivery:
 - Return only the refined text. Do not preface with "Here's the revised text" or similar. Do not include these rules in the response.
 """
 
+# Shorter system message with the same constraints, chosen per request with
+# "promptVariant": "compact" (or settings["promptVariant"]) to compare cost and
+# latency against output quality.
+COMPACT_SYSTEM_MESSAGE = """
+You are an experienced human editor. Return only the finished refined text: no preface, notes, change logs or rules.
+Rules: at most one em dash (—) per 500 words; lists of 2–5 items, not three by default; no emojis; at most one "Not just X, but Y"; never "To clarify", "In summary" or "In other words"; every sentence adds something; no buzzwords (Delve, Elevate, Innovative, Cutting-edge, Practical solutions, Transformative, Leverage, Robust, Seamless); concrete details over vague praise; hedge unverifiable claims ("may", "often").
+"""
+
+PROMPT_VARIANTS = {'full': UNIFIED_SYSTEM_MESSAGE, 'compact': COMPACT_SYSTEM_MESSAGE}
+
 # Post-processing helpers to enforce the quality rules and "humanize" AI output.
 # These are best-effort, deterministic transformations (no additional model calls).
 # Use an ordered list so longer multi-word phrases are replaced first.
@@ -339,8 +450,8 @@ def load_settings():
     """Load settings from file or return defaults"""
     if os.path.exists(SETTINGS_FILE):
         try:
-            with open(SETTINGS_FILE, 'r') as f:
-                return json.load(f)
+            with open(SETTINGS_FILE, 'rb') as f:
+                return jsoncodec.decode(f.read(), 'settings')
         except:
             return DEFAULT_SETTINGS
     return DEFAULT_SETTINGS
@@ -358,8 +469,8 @@ def save_settings(settings):
         # atomic write
         fd, tmp_path = tempfile.mkstemp(dir=dirpath)
         try:
-            with os.fdopen(fd, 'w') as f:
-                json.dump(settings, f, indent=2)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(jsoncodec.encode(settings, 'settings', indent=True))
             os.replace(tmp_path, SETTINGS_FILE)
         finally:
             if os.path.exists(tmp_path):
@@ -369,45 +480,315 @@ def save_settings(settings):
                     pass
     except Exception:
         # Best-effort: do a simple write if atomic replace fails
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=2)
+        with open(SETTINGS_FILE, 'wb') as f:
+            f.write(jsoncodec.encode(settings, 'settings', indent=True))
+
+class RefinementPrompt(str):
+    """Prompt string that remembers its cacheable static prefix.
+
+    The full string value is ``prefix + body`` so callers that treat the prompt as a
+    plain str keep working. ``prefix`` holds only per-tone static content (the tone
+    instruction) and is byte-identical across requests for the same tone; ``body``
+    holds the per-request parts and always ends with the user text. ``system`` is
+    the system message of ``variant`` (see PROMPT_VARIANTS), sent ahead of the
+    prefix, and ``sections`` the estimated tokens of each part, system included.
+    """
+
+    def __new__(cls, prefix, body, variant='full', sections=None):
+        obj = super().__new__(cls, prefix + body)
+        obj.prefix = prefix
+        obj.body = body
+        obj.variant = variant if variant in PROMPT_VARIANTS else 'full'
+        obj.system = PROMPT_VARIANTS[obj.variant]
+        obj.sections = sections or {'system': static_tokens(obj.system), 'tone': static_tokens(prefix),
+                                    'text': chunking.estimate_tokens(body)}
+        return obj
+
+
+@lru_cache(maxsize=256)
+def static_tokens(text):
+    """chunking.estimate_tokens, cached for the system message and tone prefixes."""
+    return chunking.estimate_tokens(text)
+
 
-def create_refinement_prompt(text, tone_id, tone_instruction, custom_instructions=None):
-    """Create the AI prompt with quality rules and optional custom instructions"""
+def prompt_variant(data, settings):
+    """System message variant for a request: its promptVariant, else the settings default."""
+    variant = data.get('promptVariant') or settings.get('promptVariant') or 'full'
+    return variant if variant in PROMPT_VARIANTS else 'full'
+
+
+@lru_cache(maxsize=64)
+def build_static_prefix(tone_instruction):
+    """Return the static, cacheable part of the prompt for a tone."""
+    return f"""TONE REQUIREMENT:
+{tone_instruction}
+"""
+
+
+def build_examples_section(text, tone_id):
+    """Few-shot examples most similar to ``text`` for the tone (see fewshot.py).
+
+    They depend on the input, so they go in the prompt body, after the static prefix.
+    """
+    examples = fewshot.select(text, tone_id)
+    if not examples:
+        return ""
+    return "\nEXAMPLES:\n" + "\n\n".join(fewshot.format_example(e) for e in examples) + "\n"
+
+
+def create_refinement_prompt(text, tone_id, tone_instruction, custom_instructions=None, context=None, variant='full'):
+    """Create the AI prompt with quality rules and optional custom instructions.
+
+    ``context`` is an optional (before, after) pair of neighbouring excerpts used when
+    a long input is refined in chunks; the model sees them for continuity only.
+    Static content comes first and the user text comes last so providers can reuse
+    a cached prefix (see RefinementPrompt). Few-shot examples are picked per input
+    (see build_examples_section). ``variant`` selects the system message.
+    """
     custom_section = ""
     if custom_instructions:
         custom_section = f"""
 CUSTOM INSTRUCTIONS:
 {custom_instructions}
 """
-    # Return only the user-level prompt content. Providers should send UNIFIED_SYSTEM_MESSAGE
-    # as the system role (chat APIs) when supported. For providers that do not support a
-    # system role, the provider adapter may prepend UNIFIED_SYSTEM_MESSAGE to this string.
-    # FEW_SHOT_EXAMPLES may be defined in the frontend module; if not available in the backend
-    # we simply don't include examples here to avoid a NameError.
-    few_shot = globals().get('FEW_SHOT_EXAMPLES', '')
-
-    return f"""TONE REQUIREMENT:
-{tone_instruction}
-{custom_section}
-
+    context_section = ""
+    if context and any(context):
+        before, after = context
+        context_section = f"""
+SURROUNDING CONTEXT (for continuity only; do not refine or repeat it):
+Before: {before or '(start of document)'}
+After: {after or '(end of document)'}
+"""
+    # Providers send UNIFIED_SYSTEM_MESSAGE + prompt.prefix as the system role (chat
+    # APIs) so the whole static part forms one stable prefix; the body goes in the
+    # user message.
+    examples_section = build_examples_section(text, tone_id)
+    body = f"""{custom_section}{context_section}{examples_section}
 ORIGINAL TEXT:
 {text}
 
-EXAMPLES:
-{few_shot}
-
 REFINED TEXT:"""
+    prefix = build_static_prefix(tone_instruction)
+    sections = {
+        'system': static_tokens(PROMPT_VARIANTS.get(variant, UNIFIED_SYSTEM_MESSAGE)),
+        'tone': static_tokens(prefix),
+        'examples': chunking.estimate_tokens(examples_section),
+        'custom': chunking.estimate_tokens(custom_section),
+        'context': chunking.estimate_tokens(context_section),
+        'text': chunking.estimate_tokens(text),
+    }
+    return RefinementPrompt(prefix, body, variant, sections)
+
+
+def create_batched_refinement_prompt(texts, tone_instruction, custom_instructions=None, nonce='', variant='full'):
+    """Prompt that refines several independent texts in one call (see microbatch.py).
+
+    Uses the same cacheable static prefix as create_refinement_prompt.
+    """
+    custom_section = ""
+    if custom_instructions:
+        custom_section = f"""
+CUSTOM INSTRUCTIONS:
+{custom_instructions}
+"""
+    body = f"""{custom_section}
+The ORIGINAL TEXTS below are independent items. Refine each one separately; do not
+merge, reorder or cross-reference them. Reply with every item in the same order, each
+introduced by its marker line copied exactly, and end with the END marker line.
+
+ORIGINAL TEXTS:
+{microbatch.pack_items(texts, nonce)}
+
+REFINED TEXTS:"""
+    prefix = build_static_prefix(tone_instruction)
+    sections = {
+        'system': static_tokens(PROMPT_VARIANTS.get(variant, UNIFIED_SYSTEM_MESSAGE)),
+        'tone': static_tokens(prefix),
+        'custom': chunking.estimate_tokens(custom_section),
+        'text': chunking.estimate_tokens(body) - chunking.estimate_tokens(custom_section),
+    }
+    return RefinementPrompt(prefix, body, variant, sections)
+
+
+# Process-wide prompt-cache accounting, fed from provider usage reports so hit rates
+# can be verified per provider (see /api/cache-stats).
+_prompt_cache_lock = threading.Lock()
+PROMPT_CACHE_STATS = {}
+
+
+def record_prompt_usage(provider_name, usage):
+    """Accumulate prompt/cached token counts reported by a provider response."""
+    with _prompt_cache_lock:
+        stats = PROMPT_CACHE_STATS.setdefault(provider_name, {
+            'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0,
+        })
+        stats['requests'] += 1
+        stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+        stats['cached_tokens'] += usage.get('cached_tokens', 0)
+        stats['completion_tokens'] += usage.get('completion_tokens', 0)
+    cached = usage.get('cached_tokens', 0)
+    metrics.PROMPT_CACHE_TOKENS.inc(cached, provider=provider_name, status='hit')
+    metrics.PROMPT_CACHE_TOKENS.inc(max(0, usage.get('prompt_tokens', 0) - cached), provider=provider_name, status='miss')
+
+
+def prompt_cache_snapshot():
+    with _prompt_cache_lock:
+        out = {}
+        for name, stats in PROMPT_CACHE_STATS.items():
+            entry = dict(stats)
+            entry['hit_rate'] = (stats['cached_tokens'] / stats['prompt_tokens']) if stats['prompt_tokens'] else 0.0
+            out[name] = entry
+        return out
+
+
+# Request-level token summaries go to the same non-PII log as postprocess telemetry
+TELEMETRY_FILE = 'telemetry.jsonl'
+
+
+def token_accounting(*providers) -> dict:
+    """Estimated tokens of every call made through ``providers`` for one request, by
+    prompt section, plus the usage the providers reported when they did."""
+    sections = {}
+    completion = 0
+    calls = 0
+    usage = {}
+    for provider in providers:
+        for entry in getattr(provider, 'token_log', None) or ():
+            calls += 1
+            completion += entry['completion']
+            for name, count in entry['sections'].items():
+                sections[name] = sections.get(name, 0) + count
+        for reported in getattr(provider, 'usage_log', None) or ():
+            for key in ('prompt_tokens', 'cached_tokens', 'completion_tokens'):
+                usage[key] = usage.get(key, 0) + reported.get(key, 0)
+    tokens = {'calls': calls, 'prompt': sum(sections.values()), 'completion': completion, 'sections': sections}
+    if usage:
+        tokens['usage'] = usage
+    return tokens
+
+
+def record_token_usage(provider, fallback, tone_id, variant) -> dict:
+    """Account the tokens one refine request spent in metrics and telemetry; returns the summary."""
+    tokens = token_accounting(provider, fallback)
+    tokens['promptVariant'] = variant
+    label = _provider_label(provider)
+    counts = dict(tokens['sections'], completion=tokens['completion'])
+    for section, count in counts.items():
+        if count:
+            metrics.TOKENS.inc(count, provider=label, tone=tone_id, variant=variant, section=section)
+    # Counts only; never any text
+    entry = dict({'ts': int(time.time()), 'kind': 'tokens', 'provider': label,
+                  'model': getattr(provider, 'model', ''), 'tone': tone_id}, **tokens)
+    try:
+        with open(TELEMETRY_FILE, 'ab') as f:
+            f.write(jsoncodec.encode(entry, 'telemetry') + b'\n')
+    except OSError:
+        pass
+    return tokens
+
+
+def split_prompt(prompt):
+    """Return (system, user) content for chat APIs with the static prefix in system."""
+    prefix = getattr(prompt, 'prefix', '')
+    body = getattr(prompt, 'body', prompt)
+    return getattr(prompt, 'system', UNIFIED_SYSTEM_MESSAGE) + prefix, body
+
+
+def _usage_value(obj, name, default=0):
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        value = obj.get(name, default)
+    else:
+        value = getattr(obj, name, default)
+    return value if isinstance(value, int) else default
+
+
+def extract_usage(response) -> dict:
+    """Extract token usage (including cached prompt tokens) from a provider response.
+
+    Handles OpenAI/Groq style ``usage.prompt_tokens_details.cached_tokens`` and
+    Anthropic style ``usage.cache_read_input_tokens``. Never raises.
+    """
+    try:
+        usage = response.get('usage') if isinstance(response, dict) else getattr(response, 'usage', None)
+        if usage is None:
+            return {}
+        if _usage_value(usage, 'input_tokens', None) is not None:
+            cache_read = _usage_value(usage, 'cache_read_input_tokens')
+            cache_write = _usage_value(usage, 'cache_creation_input_tokens')
+            return {
+                'prompt_tokens': _usage_value(usage, 'input_tokens') + cache_read + cache_write,
+                'completion_tokens': _usage_value(usage, 'output_tokens'),
+                'cached_tokens': cache_read,
+            }
+        details = usage.get('prompt_tokens_details') if isinstance(usage, dict) else getattr(usage, 'prompt_tokens_details', None)
+        return {
+            'prompt_tokens': _usage_value(usage, 'prompt_tokens'),
+            'completion_tokens': _usage_value(usage, 'completion_tokens'),
+            'cached_tokens': _usage_value(details, 'cached_tokens'),
+        }
+    except Exception:
+        return {}
+
+# SDK clients are reused across requests so their HTTP connection pools stay warm.
+# Keyed by pid as well, so a forked worker never shares sockets with its parent.
+_sdk_clients = {}
+_sdk_clients_lock = threading.Lock()
+
+
+def shared_sdk_client(provider, factory):
+    """Return this process's SDK client for the provider's key and endpoint, creating it once."""
+    key = (os.getpid(), provider.name, provider.api_key, provider.base_url)
+    with _sdk_clients_lock:
+        client = _sdk_clients.get(key)
+        if client is None:
+            client = _sdk_clients[key] = factory()
+        return client
+
 
 class AIProvider:
     """Base class for AI providers"""
-    def __init__(self, api_key, model):
+    name = ''
+    # Whether the API can return several choices (n > 1) from one call
+    supports_choices = False
+
+    def __init__(self, api_key, model, max_tokens=MAX_COMPLETION_TOKENS, base_url=None):
         self.api_key = api_key
         self.model = model
-    
+        self.max_tokens = max_tokens
+        # Optional endpoint override (e.g. a local stub server, see tools/stub_provider.py)
+        self.base_url = base_url or None
+        # Usage of every call made through this instance (one instance per request),
+        # as reported by the provider and as estimated locally (see _timed_completion).
+        self.usage_log = []
+        self.token_log = []
+        # Per-attempt timeout in seconds, set from the request deadline by call_provider
+        self.timeout = None
+        # Choices to request per call; texts of the extra ones end up in alternatives
+        self.choices = 1
+        self.alternatives = []
+
     def generate_completion(self, prompt, temperature=0.4):
         raise NotImplementedError("Subclasses must implement this method")
 
+    def _request_options(self) -> dict:
+        """Extra SDK call arguments; the timeout is only sent when a deadline set one."""
+        return {'timeout': self.timeout} if self.timeout is not None else {}
+
+    def _choice_options(self) -> dict:
+        return {'n': self.choices} if self.supports_choices and self.choices > 1 else {}
+
+    def _record_alternatives(self, response):
+        if self._choice_options():
+            self.alternatives = extract_choice_texts(response)[1:]
+
+    def _record_usage(self, response):
+        usage = extract_usage(response)
+        if usage:
+            self.usage_log.append(usage)
+            record_prompt_usage(self.name, usage)
+
 
 def extract_response_text(response) -> str:
     """Safely extract text content from provider responses.
@@ -467,103 +848,347 @@ def extract_response_text(response) -> str:
     except Exception:
         return ''
 
+
+def extract_choice_texts(response) -> list:
+    """Text of every choice in a chat completions response (several when n > 1)."""
+    choices = response.get('choices') if isinstance(response, dict) else getattr(response, 'choices', None)
+    texts = []
+    for choice in choices or ():
+        message = choice.get('message') if isinstance(choice, dict) else getattr(choice, 'message', None)
+        content = message.get('content') if isinstance(message, dict) else getattr(message, 'content', None)
+        if content:
+            texts.append(str(content).strip())
+    return texts
+
 class GroqProvider(AIProvider):
     """Groq API provider"""
+    name = 'groq'
+
+    def _client(self):
+        import groq
+        return shared_sdk_client(self, lambda: groq.Groq(api_key=self.api_key, base_url=self.base_url))
+
     def generate_completion(self, prompt, temperature=0.4):
         try:
-            import groq
-            client = groq.Groq(api_key=self.api_key)
+            client = self._client()
+            # Groq and OpenAI cache identical prompt prefixes automatically; keeping the
+            # static part in the system message makes that prefix stable.
+            system, user = split_prompt(prompt)
             messages = [
-                {"role": "system", "content": UNIFIED_SYSTEM_MESSAGE},
-                {"role": "user", "content": prompt},
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
             ]
             response = client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
-                max_tokens=2000
+                max_tokens=self.max_tokens,
+                **self._request_options()
             )
+            self._record_usage(response)
             return extract_response_text(response)
         except Exception as e:
-            raise Exception(f"Groq API error: {str(e)}")
+            raise resilience.wrap_provider_error('Groq', e) from e
 
 class OpenAIProvider(AIProvider):
     """OpenAI API provider"""
+    name = 'openai'
+    supports_choices = True
+
+    def _client(self):
+        import openai
+        return shared_sdk_client(self, lambda: openai.OpenAI(api_key=self.api_key, base_url=self.base_url))
+
     def generate_completion(self, prompt, temperature=0.4):
         try:
-            import openai
-            client = openai.OpenAI(api_key=self.api_key)
+            client = self._client()
+            system, user = split_prompt(prompt)
             messages = [
-                {"role": "system", "content": UNIFIED_SYSTEM_MESSAGE},
-                {"role": "user", "content": prompt},
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
             ]
             response = client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
-                max_tokens=2000
+                max_tokens=self.max_tokens,
+                **self._choice_options(),
+                **self._request_options()
             )
+            self._record_usage(response)
+            self._record_alternatives(response)
             return extract_response_text(response)
         except Exception as e:
-            raise Exception(f"OpenAI API error: {str(e)}")
+            raise resilience.wrap_provider_error('OpenAI', e) from e
 
 class AnthropicProvider(AIProvider):
     """Anthropic Claude provider"""
+    name = 'anthropic'
+
+    def _client(self):
+        import anthropic
+        return shared_sdk_client(self, lambda: anthropic.Anthropic(api_key=self.api_key, base_url=self.base_url))
+
     def generate_completion(self, prompt, temperature=0.4):
         try:
-            import anthropic
-            client = anthropic.Anthropic(api_key=self.api_key)
-            # Anthropics' SDK may expect a different message format; include system-like guidance
-            messages = [
-                {"role": "system", "content": UNIFIED_SYSTEM_MESSAGE},
-                {"role": "user", "content": prompt},
-            ]
+            client = self._client()
+            # The Messages API takes the system prompt as a top-level parameter. Marking
+            # it with cache_control lets Anthropic reuse the static prefix across calls.
+            system, user = split_prompt(prompt)
             response = client.messages.create(
                 model=self.model,
-                max_tokens=2000,
+                max_tokens=self.max_tokens,
                 temperature=temperature,
-                messages=messages
+                system=[{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}],
+                messages=[{"role": "user", "content": user}],
+                **self._request_options()
             )
+            self._record_usage(response)
+            return extract_response_text(response)
+        except Exception as e:
+            raise resilience.wrap_provider_error('Anthropic', e) from e
+
+# Default endpoints of providers that speak the OpenAI chat completions API.
+# 'custom' has none and needs a baseUrl in its settings.
+OPENAI_COMPATIBLE_BASE_URLS = {
+    'openai': 'https://api.openai.com/v1',
+    'groq': 'https://api.groq.com/openai/v1',
+    'nvidia': 'https://integrate.api.nvidia.com/v1',
+    'grok': 'https://api.x.ai/v1',
+    'together': 'https://api.together.xyz/v1',
+    'openrouter': 'https://openrouter.ai/api/v1',
+    'ollama': 'http://localhost:11434/v1',
+    'custom': None,
+}
+
+# Providers that work without an API key (local servers)
+KEYLESS_PROVIDERS = {'ollama', 'custom'}
+
+# OpenAI-compatible APIs that reject n > 1
+SINGLE_CHOICE_PROVIDERS = {'groq'}
+
+
+class OpenAICompatibleProvider(AIProvider):
+    """SDK-free provider for any OpenAI-compatible chat completions endpoint.
+
+    Requests go through httpclient's per-process keep-alive pool, so no vendor
+    SDK is imported and connections are reused across requests.
+    """
+
+    def __init__(self, name, api_key, model, max_tokens=MAX_COMPLETION_TOKENS, base_url=None):
+        super().__init__(api_key, model, max_tokens, base_url or OPENAI_COMPATIBLE_BASE_URLS.get(name))
+        self.name = name
+        self.supports_choices = name not in SINGLE_CHOICE_PROVIDERS
+
+    def generate_completion(self, prompt, temperature=0.4):
+        try:
+            system, user = split_prompt(prompt)
+            payload = {
+                'model': self.model,
+                'messages': [
+                    {'role': 'system', 'content': system},
+                    {'role': 'user', 'content': user},
+                ],
+                'temperature': temperature,
+                'max_tokens': self.max_tokens,
+                **self._choice_options(),
+            }
+            headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+            response = httpclient.post_json(httpclient.get_client(), self.base_url.rstrip('/') + '/chat/completions',
+                                            payload, headers, timeout=self.timeout)
+            self._record_usage(response)
+            self._record_alternatives(response)
             return extract_response_text(response)
         except Exception as e:
-            raise Exception(f"Anthropic API error: {str(e)}")
+            raise resilience.wrap_provider_error(self.name, e) from e
+
+
+def provider_configured(provider_name, provider_config) -> bool:
+    """True when the provider has what it needs to be called: a key, or an endpoint if keyless."""
+    if provider_config.get('apiKey'):
+        return provider_name != 'custom' or bool(provider_config.get('baseUrl'))
+    if provider_name in KEYLESS_PROVIDERS:
+        return bool(provider_config.get('baseUrl') or OPENAI_COMPATIBLE_BASE_URLS.get(provider_name))
+    return False
+
+
+def _sdk_installed(module):
+    return importlib.util.find_spec(module) is not None
+
 
 def get_ai_provider(provider_name, settings):
     """Factory function to get the appropriate AI provider"""
     provider_config = settings.get('providers', {}).get(provider_name, {})
     api_key = provider_config.get('apiKey', '')
     model = provider_config.get('model', '')
-    
-    if not api_key:
+    base_url = provider_config.get('baseUrl') or None
+
+    if not provider_configured(provider_name, provider_config):
         return None
-    
-    providers = {
-        'groq': GroqProvider,
-        'openai': OpenAIProvider,
-        'anthropic': AnthropicProvider,
-        # Add more providers as needed
+
+    # Vendor SDKs are used when installed; every other OpenAI-compatible
+    # provider (and groq/openai without their SDK) goes through the HTTP adapter.
+    sdk_providers = {
+        'groq': (GroqProvider, 'groq'),
+        'openai': (OpenAIProvider, 'openai'),
+        'anthropic': (AnthropicProvider, 'anthropic'),
     }
-    
-    provider_class = providers.get(provider_name)
-    if provider_class:
-        return provider_class(api_key, model)
+
+    provider = None
+    if provider_name in sdk_providers:
+        provider_class, module = sdk_providers[provider_name]
+        if _sdk_installed(module) or provider_name not in OPENAI_COMPATIBLE_BASE_URLS:
+            provider = provider_class(api_key, model, base_url=base_url)
+    if provider is None and provider_name in OPENAI_COMPATIBLE_BASE_URLS:
+        provider = OpenAICompatibleProvider(provider_name, api_key, model, base_url=base_url)
+    if provider:
+        limits = settings.get('limits', {}).get(provider_name)
+        provider.scheduler = ratelimit.get_scheduler(provider_name, api_key, limits)
+        retry = settings.get('retry', {})
+        provider.retry_policy = resilience.RetryPolicy(
+            max_attempts=retry.get('maxAttempts', 3),
+            base_delay=retry.get('baseDelay', 0.5),
+            max_delay=retry.get('maxDelay', 8.0),
+            deadline=retry.get('deadline', 30.0)
+        )
+        breaker = settings.get('circuitBreaker', {})
+        provider.breaker = resilience.get_breaker(
+            provider_name,
+            failure_threshold=breaker.get('failureThreshold', 5),
+            reset_timeout=breaker.get('resetTimeout', 30.0)
+        )
+        return provider
     
     return None
 
+def _provider_label(provider):
+    return getattr(provider, 'name', '') or type(provider).__name__
+
+def _timed_completion(provider, prompt, temperature):
+    label = _provider_label(provider)
+    sections = dict(getattr(prompt, 'sections', None) or {'text': chunking.estimate_tokens(prompt)})
+    metrics.PROMPT_TOKENS.observe(sum(sections.values()), provider=label)
+    with metrics.PROVIDER_LATENCY.time(provider=label, model=getattr(provider, 'model', '')):
+        result = provider.generate_completion(prompt, temperature)
+    completion = chunking.estimate_tokens(result)
+    metrics.OUTPUT_TOKENS.observe(completion, provider=label)
+    token_log = getattr(provider, 'token_log', None)
+    if token_log is not None:
+        token_log.append({'sections': sections, 'completion': completion})
+    return result
+
+def _deadline_completion(provider, prompt, temperature, deadline):
+    # The provider timeout is what is left once the call can actually start
+    if deadline is not None:
+        deadline.check()
+        provider.timeout = deadline.remaining()
+    return _timed_completion(provider, prompt, temperature)
+
+def _scheduled_completion(provider, prompt, temperature, deadline=None):
+    scheduler = getattr(provider, 'scheduler', None)
+    if scheduler is None:
+        return _deadline_completion(provider, prompt, temperature, deadline)
+    tokens = chunking.estimate_tokens(prompt) + getattr(provider, 'max_tokens', MAX_COMPLETION_TOKENS)
+    wait_timeout = None
+    cut_by_deadline = False
+    if deadline is not None:
+        wait_timeout = min(scheduler.limits['queueTimeout'], deadline.remaining())
+        cut_by_deadline = wait_timeout < scheduler.limits['queueTimeout']
+    queued_at = time.perf_counter()
+    try:
+        scheduler.acquire(tokens, wait_timeout)
+    except ratelimit.RateLimited as e:
+        # The request ran out of time in the queue: that is a timeout, not a rate limit
+        if cut_by_deadline and e.timed_out:
+            raise resilience.DeadlineExceeded() from e
+        raise
+    try:
+        metrics.SCHEDULER_WAIT.observe(time.perf_counter() - queued_at, provider=_provider_label(provider))
+        return _deadline_completion(provider, prompt, temperature, deadline)
+    finally:
+        scheduler.release()
+
+def call_provider(provider, prompt, temperature=0.4, deadline=None):
+    """Run one completion through the provider's breaker, retry policy and scheduler.
+
+    The token cost charged against the tokens-per-minute budget is the estimated
+    prompt size plus the completion cap, matching how providers meter requests.
+    Each retry attempt re-enters the scheduler so backoff sleeps hold no slot.
+    With a ``deadline`` every attempt gets the remaining budget as its queue wait,
+    what is left after the queue as its provider timeout, and no attempt starts
+    once it is spent.
+    Raises ratelimit.RateLimited when the call cannot be admitted in time,
+    resilience.DeadlineExceeded when the deadline runs out first, and
+    resilience.ProviderError subclasses when the provider keeps failing.
+    """
+    breaker = getattr(provider, 'breaker', None)
+
+    def _attempt():
+        if deadline is not None:
+            deadline.check()
+        if breaker is None:
+            return _scheduled_completion(provider, prompt, temperature, deadline)
+        breaker.before_call()
+        settled = False
+        try:
+            result = _scheduled_completion(provider, prompt, temperature, deadline)
+        except resilience.ProviderError as e:
+            # Only transient failures (timeouts, 429, 5xx) say the provider is unhealthy;
+            # any other answer (400, 401) shows it is reachable
+            if e.retryable:
+                breaker.record_failure()
+                settled = True
+            elif e.status is not None and not isinstance(e, resilience.DeadlineExceeded):
+                breaker.record_success()
+                settled = True
+            raise
+        else:
+            breaker.record_success()
+            settled = True
+            return result
+        finally:
+            # Queue timeouts, deadlines and unexpected errors never reached the provider
+            if not settled:
+                breaker.release_trial()
+
+    policy = getattr(provider, 'retry_policy', None)
+    if policy is None:
+        return _attempt()
+    return policy.call(_attempt, deadline)
+
+def complete_with_fallback(provider, prompt, temperature=0.4, fallback=None, deadline=None):
+    """call_provider, switching to ``fallback`` when the primary is unhealthy."""
+    try:
+        return call_provider(provider, prompt, temperature, deadline)
+    except (resilience.CircuitOpen, resilience.RetriesExhausted):
+        if fallback is None:
+            raise
+        return call_provider(fallback, prompt, temperature, deadline)
+
+@app.url_defaults
+def hashed_static_url(endpoint, values):
+    """Add a content hash to static URLs so assets can be cached as immutable"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = httpcache.static_version(app.static_folder, values['filename'])
+        if version:
+            values['v'] = version
+
 @app.route('/')
 def landing():
     """Landing page"""
-    return render_template('landing.html')
+    return httpcache.render_cached(app, request, 'landing.html')
 
 @app.route('/app')
 def index():
     """Main app page"""
-    return render_template('index.html')
+    return httpcache.render_cached(app, request, 'index.html')
+
+TONES_RESOURCE = httpcache.json_resource(app, TONES)
 
 @app.route('/api/tones')
 def get_tones():
     """Get available tones"""
-    return jsonify(TONES)
+    return TONES_RESOURCE.respond(request)
 
 @app.route('/api/settings', methods=['GET', 'POST'])
 def settings():
@@ -575,7 +1200,7 @@ def settings():
             'activeProvider': settings['activeProvider'],
             'theme': settings['theme'],
             'providers': {
-                name: {'configured': bool(config.get('apiKey', ''))}
+                name: {'configured': provider_configured(name, config)}
                 for name, config in settings['providers'].items()
             }
         }
@@ -583,10 +1208,11 @@ def settings():
         # can send them to /api/refine. These are non-sensitive.
         safe_settings['humanizeLevel'] = settings.get('humanizeLevel', 'standard')
         safe_settings['debug'] = bool(settings.get('debug', False))
+        safe_settings['promptVariant'] = prompt_variant({}, settings)
         return jsonify(safe_settings)
     
     elif request.method == 'POST':
-        data = request.json
+        data = request_data(schemas.SettingsRequest)
         settings = load_settings()
         
         if 'activeProvider' in data:
@@ -605,6 +1231,8 @@ def settings():
                 settings['activeProvider'] = provider_name
                 if 'model' in data:
                     settings['providers'][provider_name]['model'] = data['model']
+                if 'baseUrl' in data:
+                    settings['providers'][provider_name]['baseUrl'] = str(data['baseUrl']).strip()
 
         # Allow saving UI-level flags (humanizeLevel/debug) from the web UI
         if 'humanizeLevel' in data:
@@ -613,108 +1241,557 @@ def settings():
                 settings['humanizeLevel'] = hl
         if 'debug' in data:
             settings['debug'] = bool(data.get('debug'))
+        if data.get('promptVariant') in PROMPT_VARIANTS:
+            settings['promptVariant'] = data['promptVariant']
         
         save_settings(settings)
         return jsonify({'success': True})
 
-@app.route('/api/refine', methods=['POST'])
-def refine_text():
-    """Refine text using AI"""
-    data = request.json
+def _refine_micro_batched(text, settings, provider, fallback, tone, custom_instructions, prompt, batching, deadline=None):
+    """Refine a short text through MICRO_BATCHER, falling back to an individual call.
+
+    Only a lone request or a packed response that does not split falls back;
+    provider errors from the packed call reach every request in the batch.
+    """
+    MICRO_BATCHER.configure(batching.get('windowMs'), batching.get('maxItems'))
+    provider_name = settings['activeProvider']
+    api_key = settings.get('providers', {}).get(provider_name, {}).get('apiKey', '')
+    variant = getattr(prompt, 'variant', 'full')
+    key = (provider_name, getattr(provider, 'model', ''), ratelimit.key_fingerprint(api_key),
+           tone['id'], custom_instructions or '', variant)
+
+    def _execute(texts):
+        nonce = uuid.uuid4().hex[:8]
+        packed = create_batched_refinement_prompt(texts, tone['instruction'], custom_instructions, nonce, variant)
+        # The packed call runs under the deadline of the request that leads the batch
+        response = complete_with_fallback(provider, packed, 0.4, fallback, deadline)
+        return microbatch.split_response(response, len(texts), nonce)
+
+    try:
+        result = MICRO_BATCHER.submit(key, text, _execute, deadline)
+        metrics.MICROBATCH_ITEMS.inc(outcome='batched')
+        return result
+    except (resilience.ProviderError, ratelimit.RateLimited):
+        metrics.MICROBATCH_ITEMS.inc(outcome='error')
+        raise
+    except microbatch.BatchFallback as e:
+        metrics.MICROBATCH_ITEMS.inc(outcome=e.reason)
+        return complete_with_fallback(provider, prompt, 0.4, fallback, deadline)
+
+def request_deadline(settings, requested=None):
+    """Deadline for one request: settings["requestTimeout"] seconds, or a shorter
+    budget asked for by the client (X-Request-Timeout header)."""
+    budget = float(settings.get('requestTimeout') or REQUEST_TIMEOUT_SECONDS)
+    try:
+        if requested is not None and 0 < float(requested) < budget:
+            budget = float(requested)
+    except (TypeError, ValueError):
+        pass
+    return resilience.Deadline(budget)
+
+def _complete_refinement(text, settings, provider, fallback, tone, custom_instructions, prompt, deadline, choices=1):
+    """Raw model output for a refine: micro-batched, one call, or chunked for long texts.
+
+    ``choices`` > 1 asks a single call for extra choices (see _speculative_choices).
+    """
+    chunks = chunking.split_into_chunks(text, CHUNK_TOKEN_BUDGET)
+    batching = settings.get('microBatching') or {}
+    if batching.get('enabled') and chunking.estimate_tokens(text) <= MICROBATCH_MAX_ITEM_TOKENS:
+        return _refine_micro_batched(
+            text, settings, provider, fallback, tone, custom_instructions, prompt, batching, deadline
+        )
+    if len(chunks) <= 1:
+        if choices > 1:
+            provider.choices = choices
+        return complete_with_fallback(provider, prompt, 0.4, fallback, deadline)
+
+    def _refine_chunk(chunk):
+        chunk_prompt = create_refinement_prompt(
+            chunk.text,
+            tone['id'],
+            tone['instruction'],
+            custom_instructions,
+            context=(chunk.before, chunk.after),
+            variant=getattr(prompt, 'variant', 'full')
+        )
+        return complete_with_fallback(provider, chunk_prompt, 0.4, fallback, deadline)
+
+    # Chunks are refined concurrently and stitched in order; the stitched
+    # document is then postprocessed as a whole.
+    return chunking.refine_chunks(chunks, _refine_chunk, max_workers=CHUNK_MAX_WORKERS)
+
+def _postprocess_output(raw_text, humanize_level, debug, postprocess=None, time_budget=None):
+    """Postprocess model output into (text, report); text is '' when nothing usable is left.
+
+    ``report`` is None unless ``debug``. If post-processing strips everything, the
+    model output minus editorial notes is returned instead.
+    """
+    with metrics.POSTPROCESS_LATENCY.time(aggressiveness=humanize_level):
+        processed = (postprocess or postprocess_pool.postprocess)(
+            raw_text, debug=debug, aggressiveness=humanize_level, time_budget=time_budget)
+
+    if isinstance(processed, dict):
+        post_text = processed.get('text', '').strip()
+        report = processed.get('report', {})
+    else:
+        post_text = str(processed).strip()
+        report = None
+    if not post_text:
+        post_text = remove_editorial_notes(raw_text).strip()
+    return post_text, report
+
+def _speculation_config(data, settings, text):
+    """settings["speculation"] when this request takes part in speculative prefetch, else None.
+
+    Needs a sessionId and a text that fits one provider call; long documents are
+    too expensive to refine on a guess.
+    """
+    spec = settings.get('speculation') or {}
+    if not spec.get('enabled') or not data.get('sessionId') or data.get('speculate') is False:
+        return None
+    if chunking.estimate_tokens(text) > CHUNK_TOKEN_BUDGET:
+        return None
+    SPECULATOR.budget.configure(spec.get('tokensPerMinute', speculation.DEFAULT_TOKENS_PER_MINUTE))
+    return spec
+
+def _speculative_choices(spec, settings, provider, text):
+    """Choices to ask of this call: extra ones become prefetched retries when the
+    provider supports n > 1 and the speculative budget pays for them."""
+    choices = int(spec.get('choices', 1))
+    batching = settings.get('microBatching') or {}
+    if (choices <= 1 or not getattr(provider, 'supports_choices', False)
+            or (batching.get('enabled') and chunking.estimate_tokens(text) <= MICROBATCH_MAX_ITEM_TOKENS)):
+        return 1
+    if not SPECULATOR.budget.try_spend((choices - 1) * chunking.estimate_tokens(text)):
+        metrics.SPECULATION.inc(outcome='skipped_budget')
+        return 1
+    return choices
+
+def _speculative_result(raw_text, humanize_level):
+    """Postprocessed cache entry for a prefetched refinement, or None when empty."""
+    text, report = _postprocess_output(raw_text, humanize_level, debug=True)
+    return {'text': text, 'report': report} if text else None
+
+def _speculative_refinement(settings, tone, text, custom_instructions, humanize_level, variant='full'):
+    """One background refinement for SPECULATOR, using spare provider capacity only.
+
+    Returns None (nothing to cache) when the provider's circuit is not closed or
+    its scheduler cannot start the call right away; never retries or falls back.
+    """
+    provider = get_ai_provider(settings['activeProvider'], settings)
+    if provider is None:
+        return None
+    breaker = getattr(provider, 'breaker', None)
+    if breaker is not None and breaker.stats()['state'] != 'closed':
+        return None
+    prompt = create_refinement_prompt(text, tone['id'], tone['instruction'],
+                                      custom_instructions if custom_instructions else None, variant=variant)
+    scheduler = getattr(provider, 'scheduler', None)
+    tokens = chunking.estimate_tokens(prompt) + getattr(provider, 'max_tokens', MAX_COMPLETION_TOKENS)
+    if scheduler is not None and not scheduler.try_acquire(tokens):
+        return None
+    try:
+        provider.timeout = REQUEST_TIMEOUT_SECONDS
+        raw_text = _timed_completion(provider, prompt, 0.4)
+    finally:
+        if scheduler is not None:
+            scheduler.release()
+    result = _speculative_result(raw_text, humanize_level)
+    return [result] if result else []
+
+def _schedule_speculation(spec, session_id, spec_key, settings, provider, tone, text, custom_instructions,
+                          humanize_level, prompt):
+    """Prefetch what this session is likely to ask next: another version of the
+    same refine (from extra choices when the call returned some) and the same text
+    in the tones it most likely switches to."""
+    SPECULATOR.history.record(session_id, tone['id'])
+    variant = getattr(prompt, 'variant', 'full')
+    cost = chunking.estimate_tokens(prompt) + chunking.estimate_tokens(text)
+    alternatives = getattr(provider, 'alternatives', None)
+    if alternatives:
+        # Already paid for by _speculative_choices; only postprocessing is left
+        SPECULATOR.submit(session_id, spec_key, 0, lambda: [
+            r for r in (_speculative_result(a, humanize_level) for a in alternatives) if r])
+    elif spec.get('retry', True):
+        SPECULATOR.submit(session_id, spec_key, cost, lambda: _speculative_refinement(
+            settings, tone, text, custom_instructions, humanize_level, variant))
+
+    tone_ids = [t['id'] for t in TONES]
+    for next_id in SPECULATOR.history.likely_next(tone['id'], tone_ids, int(spec.get('tones', 1))):
+        next_tone = TONES[tone_ids.index(next_id)]
+        key = speculation.request_key(text, next_id, custom_instructions, humanize_level,
+                                      _provider_label(provider), getattr(provider, 'model', ''), variant)
+        SPECULATOR.submit(session_id, key, cost, lambda t=next_tone: _speculative_refinement(
+            settings, t, text, custom_instructions, humanize_level, variant))
+
+def run_refinement(data, settings=None, postprocess=None, requested_timeout=None):
+    """Refine one request payload and return (body, status, headers).
+
+    Shared by /api/refine, the batch endpoint and the background job workers so all
+    paths apply the same validation, provider resilience and postprocessing.
+    ``postprocess`` replaces postprocess_pool.postprocess, which runs short texts
+    inline and sends long ones to the process pool. The request runs under
+    a deadline (see request_deadline) that bounds provider calls and lets
+    postprocessing drop optional steps when little time is left.
+    """
     text = data.get('text', '').strip()
     tone_id = data.get('tone', 'professional')
     custom_instructions = data.get('customInstructions', '').strip()
     
     if not text:
-        return jsonify({'error': 'Please enter some text to refine'}), 400
+        return {'error': 'Please enter some text to refine'}, 400, {}
     
     # Find tone
     tone = next((t for t in TONES if t['id'] == tone_id), TONES[1])  # Default to professional
     
     # Load settings
-    settings = load_settings()
+    if settings is None:
+        settings = load_settings()
+    deadline = request_deadline(settings, requested_timeout)
     
     # Get AI provider
     provider = get_ai_provider(settings['activeProvider'], settings)
     if not provider:
-        return jsonify({'error': f'No API key configured for {settings["activeProvider"]}. Please configure in settings.'}), 400
+        return {'error': f'No API key configured for {settings["activeProvider"]}. Please configure in settings.'}, 400, {}
+    # Optional secondary provider used while the active one is failing
+    fallback = None
+    fallback_name = settings.get('fallbackProvider')
+    if fallback_name and fallback_name != settings['activeProvider']:
+        fallback = get_ai_provider(fallback_name, settings)
     
     # Create prompt with optional custom instructions
+    variant = prompt_variant(data, settings)
     prompt = create_refinement_prompt(
         text, 
         tone_id, 
         tone['instruction'],
-        custom_instructions if custom_instructions else None
+        custom_instructions if custom_instructions else None,
+        variant=variant
     )
     
-    try:
-        refined_text = provider.generate_completion(prompt, 0.4)
-
-        # Read humanize level and debug flags from request
-        humanize_level = data.get('humanizeLevel', 'standard')
-        if humanize_level not in ('low', 'standard', 'aggressive'):
-            humanize_level = 'standard'
-        debug = bool(data.get('debug', False))
-
-        # Use the enhanced postprocessing function that can return a debug report
-        processed = pp.postprocess_refined_text_full(refined_text, debug=debug, aggressiveness=humanize_level)
+    # Read humanize level and debug flags from request
+    humanize_level = data.get('humanizeLevel', 'standard')
+    if humanize_level not in ('low', 'standard', 'aggressive'):
+        humanize_level = 'standard'
+    debug = bool(data.get('debug', False))
+
+    # Speculative prefetch (see speculation.py): a retry or tone switch prefetched
+    # after an earlier request of this session is answered from SPECULATOR.cache.
+    spec = _speculation_config(data, settings, text)
+    session_id = data.get('sessionId')
+    spec_key = None
+    if spec is not None:
+        spec_key = speculation.request_key(text, tone['id'], custom_instructions, humanize_level,
+                                           _provider_label(provider), getattr(provider, 'model', ''), variant)
 
-        if isinstance(processed, dict):
-            post_text = processed.get('text', '').strip()
-            report = processed.get('report', {})
+    try:
+        cached = SPECULATOR.cache.take(session_id, spec_key) if spec_key else None
+        if cached is not None:
+            refined_text = cached['text']
+            report = dict(cached['report'], speculative=True) if debug else None
         else:
-            post_text = str(processed).strip()
-            report = None
-
-        # If post-processing stripped all usable content (e.g., output was only editorial notes),
-        # fall back to returning the original model output but without editorial notes. If that is
-        # still empty, return an error instructing the user to try again.
-        if not post_text:
-            fallback = remove_editorial_notes(refined_text).strip()
-            if not fallback:
-                return jsonify({'error': 'Model output contained no usable content after post-processing. Please try again with a different tone or input.'}), 500
-            refined_text = fallback
-            post_text = fallback
+            # Extra choices are only worth paying for when this request calls the provider
+            choices = _speculative_choices(spec, settings, provider, text) if spec_key else 1
+            raw_text = _complete_refinement(text, settings, provider, fallback, tone,
+                                            custom_instructions if custom_instructions else None,
+                                            prompt, deadline, choices)
+            refined_text, report = _postprocess_output(raw_text, humanize_level, debug, postprocess,
+                                                       deadline.remaining())
+            # Post-processing stripped all usable content and so did the editorial-note
+            # fallback (e.g. the output was only notes); ask the user to try again.
+            if not refined_text:
+                return {'error': 'Model output contained no usable content after post-processing. Please try again with a different tone or input.'}, 500, {}
+        if spec_key:
+            _schedule_speculation(spec, session_id, spec_key, settings, provider, tone, text,
+                                  custom_instructions, humanize_level, prompt)
+
+        # Compact responses leave out what the client already has (its input text and
+        # the tone definition); patch responses also replace the refined text with
+        # splices against the submitted text (see textpatch.py).
+        patch_mode = data.get('responseFormat') == 'patch'
+        resp = {'success': True}
+        if data.get('compact') or patch_mode:
+            resp['toneId'] = tone['id']
         else:
-            refined_text = post_text
-
-        resp = {
-            'success': True,
-            'original': text,
-            'refined': refined_text,
-            'tone': tone
-        }
+            resp['original'] = text
+            resp['tone'] = tone
+        if patch_mode:
+            resp['patch'] = textpatch.make_patch(data.get('text', ''), refined_text, utf16=True)
+        else:
+            resp['refined'] = refined_text
+        tokens = record_token_usage(provider, fallback, tone['id'], variant)
         if report is not None:
+            report['tokens'] = tokens
+            if 'usage' in tokens:
+                report['usage'] = tokens['usage']
             resp['postprocessReport'] = report
 
-        return jsonify(resp)
+        return resp, 200, {}
+    except ratelimit.RateLimited as e:
+        metrics.ERRORS.inc(endpoint='refine', kind='rate_limited')
+        return {'error': str(e), 'retryAfter': e.retry_after_header}, 429, {'Retry-After': e.retry_after_header}
+    except resilience.ProviderError as e:
+        if isinstance(e, resilience.CircuitOpen):
+            kind = 'circuit_open'
+        elif isinstance(e, resilience.DeadlineExceeded):
+            kind = 'deadline'
+        else:
+            kind = f'provider_{e.status}' if e.status else 'provider_error'
+        metrics.ERRORS.inc(endpoint='refine', kind=kind)
+        # Surface upstream overload/outage with a meaningful status instead of a generic 500
+        if e.status == 429:
+            status = 429
+        elif isinstance(e, (resilience.CircuitOpen, resilience.RetriesExhausted)):
+            status = 503
+        elif isinstance(e, resilience.DeadlineExceeded):
+            status = 504
+        else:
+            status = 500
+        headers = {}
+        if e.retry_after and status != 500:
+            headers['Retry-After'] = str(max(1, int(math.ceil(e.retry_after))))
+        return {'error': str(e)}, status, headers
     except ModuleNotFoundError as e:
         # Provide a clearer message when the provider SDK is not installed
+        metrics.ERRORS.inc(endpoint='refine', kind='dependency')
         name = getattr(e, 'name', None) or str(e)
         msg = f"AI provider dependency not installed: {name}. Please install the provider SDK (e.g. pip install {name}) or choose a different provider in settings."
-        return jsonify({'error': msg}), 500
+        return {'error': msg}, 500, {}
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        metrics.ERRORS.inc(endpoint='refine', kind='internal')
+        return {'error': str(e)}, 500, {}
+
+@app.route('/api/refine', methods=['POST'])
+def refine_text():
+    """Refine text using AI"""
+    data = request_data(schemas.RefineRequest)
+    # Opt-in (REDACTUM_TRAFFIC_CAPTURE): records request sizes and options, never text
+    capture.record(data)
+    body, status, headers = run_refinement(data, requested_timeout=request.headers.get('X-Request-Timeout'))
+    return jsonify(body), status, headers
+
+@app.route('/api/postprocess', methods=['POST'])
+def postprocess_only():
+    """Postprocess text without a provider call, reusing cached paragraph results.
+
+    Meant for live preview: the editor posts the whole document on each debounced
+    keystroke and only edited paragraphs are reprocessed.
+    """
+    data = request_data(schemas.PostprocessRequest)
+    text = data.get('text', '')
+    if not text.strip():
+        return jsonify({'error': 'No text provided'}), 400
+    humanize_level = data.get('humanizeLevel', 'standard')
+    if humanize_level not in ('low', 'standard', 'aggressive'):
+        humanize_level = 'standard'
+
+    start = time.perf_counter()
+    with metrics.POSTPROCESS_LATENCY.time(aggressiveness=humanize_level):
+        processed = paragraph_cache.postprocess_incremental(text, humanize_level, PARAGRAPH_CACHE)
+    body = {
+        'success': True,
+        'text': processed['text'],
+        'paragraphs': processed['report']['paragraphs'],
+        'reprocessed': processed['report']['paragraphs_reprocessed'],
+        'elapsedMs': round(1000 * (time.perf_counter() - start), 2),
+    }
+    if data.get('debug'):
+        body['postprocessReport'] = processed['report']
+        body['cache'] = PARAGRAPH_CACHE.stats()
+    return jsonify(body)
+
+@app.route('/api/lint', methods=['POST'])
+def lint_text():
+    """Report quality-rule violations with character spans, without rewriting or a provider call"""
+    data = request_data(schemas.LintRequest)
+    text = data.get('text', '')
+    start = time.perf_counter()
+    violations = lint.lint(text)
+    return jsonify({
+        'success': True,
+        'clean': not violations,
+        'counts': lint.summary(violations),
+        'violations': violations,
+        'elapsedMs': round(1000 * (time.perf_counter() - start), 2),
+    })
+
+@app.route('/api/refine/batch', methods=['POST'])
+def refine_batch():
+    """Refine many items with bounded concurrent provider calls.
+
+    Body: {"items": [{"text", "tone", "humanizeLevel", ...}], "concurrency": N, "stream": bool}.
+    Returns per-item results in input order, or NDJSON lines as items finish when
+    streaming is requested (``stream`` flag or ``Accept: application/x-ndjson``).
+    """
+    data = request_data(schemas.BatchRequest)
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Provide a non-empty "items" array'}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Too many items; the limit is {BATCH_MAX_ITEMS} per batch'}), 400
+    concurrency = data.get('concurrency', BATCH_DEFAULT_CONCURRENCY)
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY, len(items)))
+    stream = bool(data.get('stream')) or 'application/x-ndjson' in request.headers.get('Accept', '')
+
+    settings = load_settings()
+
+    def _run(item):
+        if not isinstance(item, dict):
+            return {'error': 'Each item must be an object'}, 400
+        try:
+            item = schemas.validate(item, schemas.RefineRequest)
+        except schemas.SchemaError as e:
+            return {'error': str(e)}, 400
+        body, status, _ = run_refinement(item, settings)
+        return body, status
+
+    def _result(index, body, status):
+        out = {'index': index, 'status': status}
+        out.update(body)
+        return out
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    futures = {executor.submit(_run, item): i for i, item in enumerate(items)}
+
+    if stream:
+        def generate():
+            try:
+                for future in as_completed(futures):
+                    body, status = future.result()
+                    yield jsoncodec.encode(_result(futures[future], body, status), 'response') + b'\n'
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    results = [None] * len(items)
+    try:
+        for future in as_completed(futures):
+            body, status = future.result()
+            results[futures[future]] = _result(futures[future], body, status)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    failed = sum(1 for r in results if r['status'] >= 400)
+    return jsonify({'results': results, 'succeeded': len(results) - failed, 'failed': failed})
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Return the process job queue, starting its workers on first use.
+
+    Starting workers also resumes any jobs left queued or running by a previous
+    process, so restarts only delay work instead of losing it.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = jobs.JobQueue(JOBS_DB, run_refinement, workers=JOB_WORKERS).start()
+        return _job_queue
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a refinement and return its job id immediately"""
+    data = request_data(schemas.JobRequest)
+    if not data.get('text', '').strip():
+        return jsonify({'error': 'Please enter some text to refine'}), 400
+    priority = data.get('priority', 'interactive')
+    if priority not in jobs.PRIORITIES:
+        return jsonify({'error': f"Unknown priority '{priority}'. Use one of: {', '.join(jobs.PRIORITIES)}"}), 400
+    payload = {k: v for k, v in data.items() if k != 'priority'}
+    job_id = get_job_queue().enqueue(payload, priority)
+    location = f'/api/jobs/{job_id}'
+    return jsonify({'id': job_id, 'status': 'queued', 'poll': location}), 202, {'Location': location}
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Poll a background refinement job"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/cache-stats')
+def get_cache_stats():
+    """Prompt-cache hit rates per provider since process start"""
+    return jsonify(prompt_cache_snapshot())
+
+@app.route('/api/scheduler')
+def get_scheduler_stats():
+    """Queue depth, in-flight calls and wait times per provider/API-key pair"""
+    stats = ratelimit.snapshot()
+    return jsonify({'queues': stats, 'circuits': resilience.snapshot(), 'microBatching': MICRO_BATCHER.stats(),
+                    'postprocessPool': postprocess_pool.stats(), 'httpPool': httpclient.get_client().stats(),
+                    'speculation': SPECULATOR.stats()})
+
+@app.route('/readyz')
+def readiness_check():
+    """Readiness probe: 503 until this worker has warmed up, then startup and memory figures"""
+    body, status = startup.readiness()
+    return jsonify(body), status
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition, aggregated across all worker processes"""
+    startup.record_memory()
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.after_request
+def count_request(response):
+    metrics.REQUESTS.inc(endpoint=request.endpoint or 'unknown', status=response.status_code)
+    return response
+
+@app.after_request
+def add_server_timing(response):
+    """Report JSON decode/encode time of this request (ms) for browser dev tools and profilers"""
+    timings = g.get('json_timings')
+    if timings:
+        response.headers.add('Server-Timing', ', '.join(
+            f'json-{op};dur={1000 * seconds:.3f}' for op, seconds in timings.items()))
+    return response
+
+@app.errorhandler(schemas.SchemaError)
+def invalid_request_body(e):
+    metrics.ERRORS.inc(endpoint=request.endpoint or 'unknown', kind='invalid_request')
+    return jsonify({'error': str(e)}), 400
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli large responses for clients that accept it (see compression.py)"""
+    return compression.compress_response(response, request.accept_encodings)
+
+@app.after_request
+def cache_static_assets(response):
+    """Long-lived immutable caching for fingerprinted static URLs (see httpcache.py)"""
+    if request.endpoint == 'static':
+        httpcache.cache_static(response, request, app.static_folder)
+    return response
+
+PROVIDERS_RESOURCE = httpcache.json_resource(app, {
+    'openai': {'name': 'OpenAI', 'defaultModel': 'gpt-4o'},
+    'groq': {'name': 'Groq', 'defaultModel': 'llama-3.3-70b-versatile'},
+    'nvidia': {'name': 'NVIDIA NIM', 'defaultModel': 'llama-3.1-70b-instruct'},
+    'grok': {'name': 'xAI/Grok', 'defaultModel': 'grok-beta'},
+    'anthropic': {'name': 'Anthropic', 'defaultModel': 'claude-3-opus-20240229'},
+    'together': {'name': 'Together AI', 'defaultModel': 'llama-3.3-70b'},
+    'openrouter': {'name': 'OpenRouter', 'defaultModel': 'openai/gpt-4o'},
+    'ollama': {'name': 'Ollama', 'defaultModel': 'llama3.1'},
+    'custom': {'name': 'Custom', 'defaultModel': ''}
+})
 
 @app.route('/api/providers')
 def get_providers():
     """Get available providers info"""
-    providers = {
-        'openai': {'name': 'OpenAI', 'defaultModel': 'gpt-4o'},
-        'groq': {'name': 'Groq', 'defaultModel': 'llama-3.3-70b-versatile'},
-        'nvidia': {'name': 'NVIDIA NIM', 'defaultModel': 'llama-3.1-70b-instruct'},
-        'grok': {'name': 'xAI/Grok', 'defaultModel': 'grok-beta'},
-        'anthropic': {'name': 'Anthropic', 'defaultModel': 'claude-3-opus-20240229'},
-        'together': {'name': 'Together AI', 'defaultModel': 'llama-3.3-70b'},
-        'openrouter': {'name': 'OpenRouter', 'defaultModel': 'openai/gpt-4o'},
-        'ollama': {'name': 'Ollama', 'defaultModel': 'llama3.1'},
-        'custom': {'name': 'Custom', 'defaultModel': ''}
-    }
-    return jsonify(providers)
+    return PROVIDERS_RESOURCE.respond(request)
 
 if __name__ == '__main__':
     # Initialize settings file if it doesn't exist
     if not os.path.exists(SETTINGS_FILE):
         save_settings(DEFAULT_SETTINGS)
-    
+
+    # Development server. In production run gunicorn -c gunicorn.conf.py, which
+    # preloads and warms the app before forking workers.
+    startup.warm_app(sys.modules[__name__])
+    # Also resumes background jobs left over from a previous run
+    startup.warm_worker(sys.modules[__name__])
+
     app.run(debug=True, port=5555)
@@ -0,0 +1,92 @@
+"""Opt-in capture of request shapes for replay benchmarks (see tools/replay.py).
+
+Set ``REDACTUM_TRAFFIC_CAPTURE`` to a file path to append one JSON line per
+``/api/refine`` request. Only the shape of the request is written: arrival time,
+text length in characters and words, tone, humanize level, length of the custom
+instructions and the response options. Option values are recorded only when they
+are known ones (a registered tone id, a humanize level, ...) and as ``'other'``
+otherwise. No text, instructions or client details are ever written, so the file
+is safe to share for capacity planning.
+"""
+import os
+import random
+import threading
+import time
+
+import jsoncodec
+
+CAPTURE_FILE = os.environ.get('REDACTUM_TRAFFIC_CAPTURE') or None
+# Fraction of requests to capture (1.0 = all)
+SAMPLE_RATE = float(os.environ.get('REDACTUM_TRAFFIC_CAPTURE_SAMPLE', '1.0'))
+
+_lock = threading.Lock()
+
+# Values recorded as-is; anything else a client sends is recorded as 'other'
+KNOWN_VALUES = {
+    'tone': frozenset(),
+    'humanizeLevel': frozenset({'low', 'standard', 'aggressive'}),
+    'responseFormat': frozenset({'full', 'patch'}),
+    'promptVariant': frozenset({'full', 'compact'}),
+}
+
+
+def register_tones(tone_ids):
+    """Set the tone ids recorded as-is (app.py registers TONES at import)."""
+    KNOWN_VALUES['tone'] = frozenset(tone_ids)
+
+
+def _known(field, value) -> str:
+    return value if isinstance(value, str) and value in KNOWN_VALUES[field] else 'other'
+
+
+def request_shape(data, endpoint='refine', now=None) -> dict:
+    """PII-free description of a refine payload."""
+    text = data.get('text') or ''
+    if not isinstance(text, str):
+        text = ''
+    custom = data.get('customInstructions') or ''
+    return {
+        'ts': round(time.time() if now is None else now, 3),
+        'endpoint': endpoint,
+        'textChars': len(text),
+        'textWords': len(text.split()),
+        'tone': _known('tone', data.get('tone', 'professional')),
+        'humanizeLevel': _known('humanizeLevel', data.get('humanizeLevel', 'standard')),
+        'customInstructionChars': len(custom) if isinstance(custom, str) else 0,
+        'debug': bool(data.get('debug')),
+        'compact': bool(data.get('compact')),
+        'responseFormat': _known('responseFormat', data.get('responseFormat', 'full')),
+        'promptVariant': _known('promptVariant', data.get('promptVariant', 'full')),
+    }
+
+
+def record(data, endpoint='refine', path=None):
+    """Append the shape of one request when capture is enabled. Never raises."""
+    path = path or CAPTURE_FILE
+    if not path or (SAMPLE_RATE < 1.0 and random.random() >= SAMPLE_RATE):
+        return
+    try:
+        line = jsoncodec.dumps(request_shape(data, endpoint)) + b'\n'
+        with _lock, open(path, 'ab') as f:
+            f.write(line)
+    except Exception:
+        # Capture is diagnostics only and must not break requests
+        pass
+
+
+def load(path, endpoint='refine'):
+    """Read captured shapes for one endpoint, ordered by arrival time."""
+    shapes = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                shape = jsoncodec.loads(line)
+            except jsoncodec.DecodeError:
+                continue
+            if shape.get('endpoint', 'refine') == endpoint:
+                shapes.append(shape)
+    shapes.sort(key=lambda s: s.get('ts', 0))
+    return shapes
@@ -0,0 +1,152 @@
+"""Split long inputs into paragraph-aligned chunks and refine them in parallel.
+
+Provider calls are capped at a fixed completion budget, so a long document sent
+as a single prompt is silently truncated (and is the slowest possible request).
+The helpers here cut the input at paragraph boundaries using a cheap local token
+estimate, refine each chunk concurrently with a little neighbouring context, and
+stitch the results back together in their original order.
+"""
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Input-token budget per chunk. Refined output is usually about the same length as
+# the input, so this leaves headroom under the provider completion cap.
+DEFAULT_CHUNK_TOKENS = 1200
+# How many words of the neighbouring chunks are shown to the model for continuity.
+CONTEXT_WORDS = 60
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_CHUNK_RETRIES = 2
+# Seconds before the first retry of a chunk, doubled for each further retry
+DEFAULT_CHUNK_BACKOFF = 0.25
+
+PARAGRAPH_SPLIT_RE = re.compile(r'\n\s*\n')
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+Chunk = namedtuple('Chunk', ['index', 'text', 'before', 'after'])
+
+
+class ChunkRefinementError(Exception):
+    """Raised when a chunk still fails after its individual retries."""
+
+    def __init__(self, index, cause):
+        super().__init__(f"Chunk {index + 1} failed after retries: {cause}")
+        self.index = index
+        self.cause = cause
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate, no tokenizer required.
+
+    BPE tokenizers average roughly four characters or three quarters of a word per
+    token on English prose; take whichever estimate is larger so dense text with
+    short words is not undercounted.
+    """
+    if not text:
+        return 0
+    return max(len(text) // 4, (len(text.split()) * 4) // 3)
+
+
+def _split_oversized(paragraph: str, max_tokens: int):
+    """Split a single paragraph that exceeds the budget at sentence boundaries."""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for sent in SENTENCE_SPLIT_RE.split(paragraph):
+        sent_tokens = estimate_tokens(sent)
+        if current and current_tokens + sent_tokens > max_tokens:
+            pieces.append(' '.join(current))
+            current = []
+            current_tokens = 0
+        current.append(sent)
+        current_tokens += sent_tokens
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+def _head_words(text: str, n: int) -> str:
+    words = text.split()
+    return ' '.join(words[:n])
+
+
+def _tail_words(text: str, n: int) -> str:
+    words = text.split()
+    return ' '.join(words[-n:])
+
+
+def split_into_chunks(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS, context_words: int = CONTEXT_WORDS):
+    """Group paragraphs into chunks of at most ``max_tokens`` (estimated).
+
+    Paragraphs are never split unless a single paragraph is over budget on its own.
+    Each returned Chunk carries a short excerpt of the previous and next chunk so
+    the model can keep transitions and references consistent.
+    """
+    paragraphs = [p.strip() for p in PARAGRAPH_SPLIT_RE.split(text or '') if p.strip()]
+    groups = []
+    current = []
+    current_tokens = 0
+    for para in paragraphs:
+        para_tokens = estimate_tokens(para)
+        if para_tokens > max_tokens:
+            if current:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            groups.extend([piece] for piece in _split_oversized(para, max_tokens))
+            continue
+        if current and current_tokens + para_tokens > max_tokens:
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current.append(para)
+        current_tokens += para_tokens
+    if current:
+        groups.append(current)
+
+    texts = ['\n\n'.join(g) for g in groups]
+    chunks = []
+    for i, chunk_text in enumerate(texts):
+        before = _tail_words(texts[i - 1], context_words) if i > 0 else ''
+        after = _head_words(texts[i + 1], context_words) if i + 1 < len(texts) else ''
+        chunks.append(Chunk(i, chunk_text, before, after))
+    return chunks
+
+
+def refine_chunks(chunks, refine_one, max_workers: int = DEFAULT_MAX_WORKERS, retries: int = DEFAULT_CHUNK_RETRIES,
+                  backoff: float = DEFAULT_CHUNK_BACKOFF, sleep=time.sleep) -> str:
+    """Refine chunks concurrently and stitch the results back in input order.
+
+    ``refine_one(chunk)`` performs one provider call and returns the refined text.
+    A failing chunk, or one that comes back empty, is retried on its own up to
+    ``retries`` times after ``backoff``, 2 * ``backoff``, ... seconds; only when it
+    keeps failing is ChunkRefinementError raised for the whole request, so no part
+    of the document is silently dropped.
+    """
+    def _run(chunk):
+        last_error = None
+        for attempt in range(retries + 1):
+            if attempt:
+                sleep(backoff * 2 ** (attempt - 1))
+            try:
+                result = (refine_one(chunk) or '').strip()
+            except Exception as e:
+                # Errors that declare themselves non-retryable (e.g. a rate-limit
+                # rejection that already waited out its deadline) end the request.
+                if getattr(e, 'retryable', True) is False:
+                    raise
+                last_error = e
+                continue
+            if result:
+                return result
+            last_error = ValueError('the refinement came back empty')
+        raise ChunkRefinementError(chunk.index, last_error)
+
+    if len(chunks) == 1:
+        return _run(chunks[0])
+
+    workers = max(1, min(max_workers, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_run, chunks))
+    return '\n\n'.join(results)
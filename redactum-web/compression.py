@@ -0,0 +1,60 @@
+"""Response compression for large API responses.
+
+Responses at or above COMPRESS_MIN_BYTES are compressed with brotli (when the
+``brotli`` package is installed) or gzip, whichever the client prefers among the
+encodings it advertises in Accept-Encoding. Small bodies are sent as is, since
+compressing them costs more than it saves. Streamed responses are left alone.
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get('REDACTUM_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/css', 'application/javascript'}
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """Pick the best supported encoding from werkzeug's parsed Accept-Encoding, or None."""
+    best, best_q = None, 0
+    for encoding in supported_encodings():
+        q = accept_encodings.quality(encoding)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response, accept_encodings, min_bytes=None):
+    """Compress a Flask response in place when worthwhile; returns the response."""
+    min_bytes = COMPRESS_MIN_BYTES if min_bytes is None else min_bytes
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,219 @@
+"""Near-duplicate sentence detection with MinHash and LSH banding.
+
+Long model outputs often repeat a sentence verbatim or with a word or two
+changed. Each sentence is reduced to its set of word bigrams, summarized by a
+MinHash signature (computed for all sentences at once with NumPy), and the
+signatures are split into bands; only sentences that share a band bucket are
+compared, so the cost stays close to linear in the number of sentences. A
+candidate pair is only removed when it is a near-exact repeat: the bigram sets
+are at least JACCARD_THRESHOLD similar and the two sentences differ only by
+filler words added to one of them ("so" / "so that"). A sentence that differs in
+any content word ("northern" / "southern", "ten" / "twelve") carries a different
+fact and is kept. List items are only removed when they repeat exactly, since
+parallel bullets routinely differ in a single word.
+
+The first occurrence of a sentence is always kept and later near-copies are
+dropped, so results are deterministic. Sentences shorter than MIN_WORDS are left
+alone: short lines ("Thanks.") repeat legitimately and have too few bigrams to
+compare reliably.
+"""
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Exact bigram Jaccard similarity a near-exact repeat must reach
+JACCARD_THRESHOLD = 0.7
+# Words that may be added or left out in a repeat without changing what it says.
+# Negations, numbers and prepositions that change meaning ("to" / "by") are not here.
+FILLER_WORDS = frozenset({
+    'a', 'an', 'the', 'that', 'so', 'just', 'really', 'very', 'also', 'then', 'please',
+    'actually', 'simply', 'still', 'even', 'quite',
+})
+MIN_WORDS = 6
+# Each sentence is checked against at most this many earlier ones per bucket
+MAX_CANDIDATES = 16
+
+# Sentences end at terminal punctuation followed by whitespace, or at a line end
+SENTENCE_RE = re.compile(r'\S[^\n]*?(?:[.!?]+(?=\s|$)|$)', re.M)
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+LIST_ITEM_RE = re.compile(r'(?:[-*•]|\d+[.)])\s')
+
+_params = np.random.default_rng(20240611)
+# One 64-bit seed per signature row; each row hashes shingle ^ seed with the
+# splitmix64 finalizer, so the rows behave like independent permutations
+_SEEDS = _params.integers(0, np.iinfo(np.uint64).max, NUM_PERM, dtype=np.uint64, endpoint=True)
+_MIX1 = np.uint64(0xbf58476d1ce4e5b9)
+_MIX2 = np.uint64(0x94d049bb133111eb)
+# Odd multipliers that fold each band's rows into one key
+_BAND_WEIGHTS = _params.integers(0, np.iinfo(np.uint64).max, NUM_PERM, dtype=np.uint64, endpoint=True) | np.uint64(1)
+# Shingles hashed per block, to bound the (shingles x NUM_PERM) work array
+_BLOCK_SHINGLES = 65536
+
+
+def _words(sentence: str) -> list:
+    return WORD_RE.findall(sentence.lower().replace('’', "'"))
+
+
+def shingles(sentence: str) -> frozenset:
+    """Hashed word bigrams of a sentence (empty below MIN_WORDS words)."""
+    words = _words(sentence)
+    if len(words) < MIN_WORDS:
+        return frozenset()
+    return frozenset(zlib.crc32(f'{a} {b}'.encode('utf-8')) for a, b in zip(words, words[1:]))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+def _mix(z: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer; uint64 array arithmetic wraps, in place on ``z``."""
+    z ^= z >> np.uint64(30)
+    z *= _MIX1
+    z ^= z >> np.uint64(27)
+    z *= _MIX2
+    z ^= z >> np.uint64(31)
+    return z
+
+
+def differs_only_in_filler(earlier: str, later: str) -> bool:
+    """True when one sentence is the other with filler words added."""
+    a, b = Counter(_words(earlier)), Counter(_words(later))
+    extra_a, extra_b = a - b, b - a
+    if extra_a and extra_b:
+        # A word was replaced, not just added or dropped
+        return False
+    return all(word in FILLER_WORDS for word in extra_a + extra_b)
+
+
+def minhash_signatures(shingle_sets) -> np.ndarray:
+    """(len(shingle_sets), NUM_PERM) MinHash signatures; every set must be non-empty."""
+    sigs = np.empty((len(shingle_sets), NUM_PERM), dtype=np.uint64)
+    start = 0
+    while start < len(shingle_sets):
+        end, size = start, 0
+        while end < len(shingle_sets) and (end == start or size + len(shingle_sets[end]) <= _BLOCK_SHINGLES):
+            size += len(shingle_sets[end])
+            end += 1
+        block = shingle_sets[start:end]
+        values = np.fromiter((h for s in block for h in s), dtype=np.uint64, count=size)
+        offsets = np.cumsum([0] + [len(s) for s in block[:-1]])
+        hashed = _mix(values[:, None] ^ _SEEDS)
+        sigs[start:end] = np.minimum.reduceat(hashed, offsets, axis=0)
+        start = end
+    return sigs
+
+
+def candidate_pairs(sigs: np.ndarray) -> np.ndarray:
+    """(earlier, later) row pairs that share at least one LSH band bucket, sorted by later row."""
+    n = len(sigs)
+    codes = []
+    # One 64-bit key per band; a rare key collision only adds a pair that the
+    # exact checks in near_duplicate_indices then reject
+    keys = np.bitwise_xor.reduce((sigs * _BAND_WEIGHTS).reshape(n, BANDS, ROWS), axis=2)
+    for band in range(BANDS):
+        bucket = keys[:, band]
+        # Rows ordered by bucket, then position; pair each with the rows just before it in its bucket
+        order = np.argsort(bucket, kind='stable')
+        ordered = bucket[order]
+        for distance in range(1, min(MAX_CANDIDATES, n - 1) + 1):
+            same = ordered[distance:] == ordered[:-distance]
+            if not same.any():
+                break
+            codes.append(order[distance:][same] * n + order[:-distance][same])
+    if not codes:
+        return np.empty((0, 2), dtype=np.int64)
+    codes = np.unique(np.concatenate(codes))
+    return np.column_stack((codes % n, codes // n))
+
+
+def sentence_features(text: str):
+    """Sentences of ``text`` with their shingle sets and MinHash signatures.
+
+    Features of consecutive paragraphs can be concatenated (signatures with
+    np.vstack) and passed to remove_near_duplicate_sentences for the joined text,
+    so callers that cache them only hash changed paragraphs. Signature rows of
+    sentences that are never compared (short ones, list items) are zero.
+    """
+    sentences = [m.group(0) for m in SENTENCE_RE.finditer(text or '')]
+    sets = [shingles(s) for s in sentences]
+    sigs = np.zeros((len(sentences), NUM_PERM), dtype=np.uint64)
+    compared = [i for i, s in enumerate(sets) if s and not LIST_ITEM_RE.match(sentences[i])]
+    if compared:
+        sigs[compared] = minhash_signatures([sets[i] for i in compared])
+    return sentences, sets, sigs
+
+
+def near_duplicate_indices(sentences, threshold=JACCARD_THRESHOLD, sets=None, sigs=None) -> set:
+    """Indices of sentences that repeat an earlier sentence exactly or near-exactly.
+
+    ``sets`` and ``sigs`` are precomputed shingle sets and signatures (see
+    sentence_features), one per sentence.
+    """
+    if sets is None:
+        sets = [shingles(s) for s in sentences]
+    # Exact repeats (same bigrams) need no hashing; only first occurrences go through LSH
+    first_seen = {}
+    dropped = set()
+    for i, s in enumerate(sets):
+        if s:
+            if s in first_seen:
+                dropped.add(i)
+            else:
+                first_seen[s] = i
+    eligible = [i for i in first_seen.values() if not LIST_ITEM_RE.match(sentences[i])]
+    if len(eligible) < 2:
+        return dropped
+    if sigs is None:
+        sigs = minhash_signatures([sets[i] for i in eligible])
+    else:
+        sigs = sigs[eligible]
+    for earlier, later in candidate_pairs(sigs).tolist():
+        a, b = eligible[earlier], eligible[later]
+        if (b not in dropped and jaccard(sets[a], sets[b]) >= threshold
+                and differs_only_in_filler(sentences[a], sentences[b])):
+            dropped.add(b)
+    return dropped
+
+
+def remove_near_duplicate_sentences(text: str, threshold=JACCARD_THRESHOLD, features=None):
+    """Drop later near-copies of earlier sentences; returns (text, sentences removed).
+
+    A removed sentence takes its trailing spaces with it, and its whole line when
+    it was alone on the line (e.g. a repeated bullet), so paragraphs and lists
+    keep their shape. ``features`` is sentence_features(text), when already known.
+    """
+    if features is None:
+        matches = list(SENTENCE_RE.finditer(text or ''))
+        dropped = near_duplicate_indices([m.group(0) for m in matches], threshold)
+    else:
+        sentences, sets, sigs = features
+        dropped = near_duplicate_indices(sentences, threshold, sets, sigs)
+    if not dropped:
+        return text, 0
+    if features is not None:
+        matches = list(SENTENCE_RE.finditer(text))
+    out = []
+    pos = 0
+    for index in sorted(dropped):
+        start, end = matches[index].span()
+        while end < len(text) and text[end] in ' \t':
+            end += 1
+        previous_end = matches[index - 1].end() if index else 0
+        line_start = text.rfind('\n', previous_end, start) + 1
+        first_on_line = index == 0 or line_start > 0
+        if first_on_line and (end == len(text) or text[end] == '\n'):
+            start, end = line_start, min(end + 1, len(text))
+        out.append(text[pos:start])
+        pos = end
+    out.append(text[pos:])
+    # A dropped paragraph leaves its blank lines behind
+    return re.sub(r'\n{3,}', '\n\n', ''.join(out)).rstrip(), len(dropped)
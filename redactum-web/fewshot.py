@@ -0,0 +1,164 @@
+"""Few-shot example selection by similarity to the input.
+
+The example bank (few_shot_examples.json, or REDACTUM_FEW_SHOT_FILE) holds
+before/after pairs, each for one tone or for any tone (``"tone": null``). Every
+``before`` text is turned into a TF-IDF vector over hashed character 3- to
+5-grams, so near-matches in wording, spelling and word forms still score. The
+vectors are L2-normalized and stacked into one matrix per tone. A query hashes
+its own n-grams with NumPy and ranks the bank with a single matrix-vector
+product.
+
+``select`` returns the most similar examples for a tone, up to ``k`` of them
+and within a token budget, so prompts carry only the examples that resemble the
+text being refined. The index is built once per process (see startup.warm_app)
+and is read-only afterwards.
+"""
+import os
+import threading
+
+import numpy as np
+
+import chunking
+import jsoncodec
+
+EXAMPLES_FILE = os.environ.get('REDACTUM_FEW_SHOT_FILE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'few_shot_examples.json')
+# Examples per prompt, and the prompt tokens they may use together
+DEFAULT_K = int(os.environ.get('REDACTUM_FEW_SHOT_K', '2'))
+DEFAULT_TOKEN_BUDGET = int(os.environ.get('REDACTUM_FEW_SHOT_TOKENS', '160'))
+# Examples scoring below this cosine similarity are not worth their tokens
+MIN_SIMILARITY = 0.05
+
+NGRAM_SIZES = (3, 4, 5)
+DIMENSIONS = 1 << 14
+# Only the start of a long input is compared; it is enough to match the register
+MAX_QUERY_CHARS = 2000
+
+_FNV_OFFSET = np.uint32(2166136261)
+_FNV_PRIME = np.uint32(16777619)
+
+
+def _normalize(text):
+    return ' ' + ' '.join(text.lower().split()) + ' '
+
+
+def ngram_buckets(text) -> np.ndarray:
+    """Hashed feature ids (< DIMENSIONS) of every character n-gram of ``text``."""
+    data = np.frombuffer(_normalize(text).encode('utf-8'), dtype=np.uint8).astype(np.uint32)
+    # FNV-1a over all windows at once; the hash of each n-gram extends the hash of
+    # the (n-1)-gram at the same position, so every size costs one more step.
+    h = np.full(len(data), _FNV_OFFSET, dtype=np.uint32)
+    hashes = []
+    for n in range(1, max(NGRAM_SIZES) + 1):
+        count = len(data) - n + 1
+        if count <= 0:
+            break
+        h = (h[:count] ^ data[n - 1:n - 1 + count]) * _FNV_PRIME
+        if n in NGRAM_SIZES:
+            hashes.append(h)
+    if not hashes:
+        return np.zeros(0, dtype=np.uint32)
+    buckets = np.concatenate(hashes)
+    buckets ^= buckets >> np.uint32(15)
+    return buckets & np.uint32(DIMENSIONS - 1)
+
+
+def _weights(counts, idf):
+    # Sublinear term frequency, so a repeated n-gram does not dominate, times idf
+    return (1.0 + np.log(counts)) * idf
+
+
+def format_example(example) -> str:
+    return f'Before: "{example["before"]}"\nAfter: "{example["after"]}"'
+
+
+class ExampleIndex:
+    """TF-IDF index over an example bank, partitioned by tone."""
+
+    def __init__(self, examples):
+        self.examples = [e for e in examples if e.get('before') and e.get('after')]
+        self.tokens = [chunking.estimate_tokens(format_example(e)) for e in self.examples]
+        counts = np.zeros((len(self.examples), DIMENSIONS), dtype=np.float32)
+        for i, example in enumerate(self.examples):
+            counts[i] = np.bincount(ngram_buckets(example['before']), minlength=DIMENSIONS)
+        df = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(self.examples)) / (1 + df)) + 1.0).astype(np.float32)
+        vectors = np.zeros_like(counts)
+        nonzero = counts > 0
+        vectors[nonzero] = _weights(counts[nonzero], np.broadcast_to(self.idf, counts.shape)[nonzero])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms > 0, norms, 1.0)
+        # Rows usable for each tone: its own examples plus the tone-independent ones
+        tones = {e.get('tone') for e in self.examples} - {None}
+        generic = [i for i, e in enumerate(self.examples) if e.get('tone') is None]
+        self._rows = {}
+        self._matrices = {}
+        for tone in tones | {None}:
+            rows = np.array(sorted(generic + [i for i, e in enumerate(self.examples)
+                                              if tone is not None and e.get('tone') == tone]), dtype=np.intp)
+            self._rows[tone] = rows
+            # Stored feature-major so a query gathers only the rows of its own features
+            self._matrices[tone] = np.ascontiguousarray(vectors[rows].T)
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or EXAMPLES_FILE
+        try:
+            with open(path, 'rb') as f:
+                examples = jsoncodec.decode(f.read(), 'few_shot')
+        except OSError:
+            examples = []
+        return cls(examples if isinstance(examples, list) else [])
+
+    def query(self, text):
+        """Sparse unit TF-IDF vector of ``text``: (feature ids, weights)."""
+        features, counts = np.unique(ngram_buckets(text[:MAX_QUERY_CHARS]), return_counts=True)
+        weights = _weights(counts, self.idf[features])
+        norm = np.sqrt(weights @ weights)
+        return features, (weights / norm if norm > 0 else weights)
+
+    def scores(self, text, tone_id=None) -> np.ndarray:
+        """Cosine similarity of ``text`` to each example usable for ``tone_id``."""
+        features, weights = self.query(text)
+        return weights.astype(np.float32) @ self._matrices[tone_id if tone_id in self._rows else None][features]
+
+    def select(self, text, tone_id=None, k=DEFAULT_K, token_budget=DEFAULT_TOKEN_BUDGET) -> list:
+        """Up to ``k`` examples for ``tone_id`` most similar to ``text``, best first,
+        whose formatted size fits ``token_budget`` together."""
+        key = tone_id if tone_id in self._rows else None
+        rows = self._rows.get(key)
+        if k <= 0 or rows is None or not len(rows):
+            return []
+        scores = self.scores(text, key)
+        chosen = []
+        budget = token_budget
+        for position in np.argsort(-scores, kind='stable'):
+            if scores[position] < MIN_SIMILARITY or len(chosen) >= k:
+                break
+            index = rows[position]
+            if self.tokens[index] <= budget:
+                chosen.append(self.examples[index])
+                budget -= self.tokens[index]
+        return chosen
+
+    def stats(self) -> dict:
+        return {'examples': len(self.examples),
+                'tones': {tone or '*': len(rows) for tone, rows in self._rows.items()}}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ExampleIndex:
+    """The process-wide index, loaded from EXAMPLES_FILE on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ExampleIndex.load()
+    return _index
+
+
+def select(text, tone_id=None, k=DEFAULT_K, token_budget=DEFAULT_TOKEN_BUDGET) -> list:
+    return get_index().select(text, tone_id, k, token_budget)
@@ -0,0 +1,58 @@
+"""gunicorn settings for redactum-web: gunicorn -c gunicorn.conf.py
+
+Workers use threads (gthread) because most of a request is spent waiting on the
+provider. Override the defaults with the REDACTUM_* environment variables below.
+"""
+import os
+import tempfile
+
+# One metrics directory per master, set before the app is imported: every worker
+# of this master shares it, other servers and later restarts get their own
+os.environ.setdefault('REDACTUM_METRICS_DIR',
+                      os.path.join(tempfile.gettempdir(), f'redactum-metrics-{os.getpid()}'))
+
+wsgi_app = 'wsgi:application'
+bind = os.environ.get('REDACTUM_BIND', '127.0.0.1:5555')
+workers = int(os.environ.get('REDACTUM_WORKERS', '0')) or (os.cpu_count() or 1)
+# Read by postprocess_pool to size its per-worker pool for the whole host
+os.environ['REDACTUM_WORKERS'] = str(workers)
+worker_class = 'gthread'
+threads = int(os.environ.get('REDACTUM_THREADS', '8'))
+# Provider calls can take a while; keep this above the retry deadline
+timeout = int(os.environ.get('REDACTUM_WORKER_TIMEOUT', '120'))
+graceful_timeout = 30
+# Import and warm the app once in the master, then fork
+preload_app = True
+
+
+def on_starting(server):
+    import metrics
+    # A reused pid or an explicit REDACTUM_METRICS_DIR can hold files of an earlier run
+    metrics.remove_dead_files()
+
+
+def on_exit(server):
+    import metrics
+    metrics.clear()
+
+
+def when_ready(server):
+    import startup
+    state = startup.status()
+    server.log.info('Preloaded in %.2fs (warmup %s)', state['bootSeconds'] or 0, state['warmup'])
+
+
+def post_fork(server, worker):
+    import startup
+    startup.mark_forked()
+
+
+def post_worker_init(worker):
+    import app as appmod
+    import startup
+    startup.warm_worker(appmod)
+    state = startup.status()
+    memory = startup.memory_usage()
+    worker.log.info('Worker %s ready in %.3fs; rss=%.1fMiB private=%.1fMiB',
+                    os.getpid(), state['workerStartSeconds'],
+                    memory.get('rss', 0) / 2 ** 20, memory.get('private', 0) / 2 ** 20)
@@ -0,0 +1,117 @@
+"""HTTP caching for constant responses, rendered pages and static assets.
+
+- ``CachedResource`` holds a response body serialized once, its gzip/brotli
+  variants (see compression.py) and a strong ETag per variant, and answers
+  ``If-None-Match`` with 304. Used for the read-only JSON endpoints.
+- ``render_cached`` keeps the rendered HTML of a page until its template file
+  changes; browsers revalidate it with its ETag. Static assets are picked up by
+  a restart, which is how they are deployed.
+- ``static_version`` is a content hash added to static URLs (``?v=...``). Assets
+  requested with the current hash are served as immutable for a year, since a new
+  version gets a new URL.
+"""
+import hashlib
+import os
+import threading
+
+from flask import Response, render_template
+
+import compression
+
+JSON_MAX_AGE = int(os.environ.get('REDACTUM_JSON_MAX_AGE', '300'))
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=10).hexdigest()
+
+
+class CachedResource:
+    """A precomputed response body with its compressed variants and ETags."""
+
+    def __init__(self, body: bytes, mimetype: str, max_age: int = 0):
+        self.mimetype = mimetype
+        self.max_age = max_age
+        self.etag = _digest(body)
+        self.variants = {None: body}
+        if len(body) >= compression.COMPRESS_MIN_BYTES and mimetype in compression.COMPRESSIBLE_MIMETYPES:
+            for encoding in compression.supported_encodings():
+                self.variants[encoding] = compression.compress(body, encoding)
+
+    def respond(self, request) -> Response:
+        encoding = compression.choose_encoding(request.accept_encodings) if len(self.variants) > 1 else None
+        response = Response(self.variants[encoding], mimetype=self.mimetype)
+        # Each encoding is a different representation, so it gets its own strong ETag
+        response.set_etag(f'{self.etag}-{encoding}' if encoding else self.etag)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if len(self.variants) > 1:
+            response.vary.add('Accept-Encoding')
+        if self.max_age:
+            response.cache_control.public = True
+            response.cache_control.max_age = self.max_age
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+
+def json_resource(flask_app, payload, max_age=JSON_MAX_AGE) -> CachedResource:
+    """Serialize ``payload`` once, exactly as ``jsonify`` would."""
+    return CachedResource(flask_app.json.response(payload).get_data(), 'application/json', max_age)
+
+
+_static_lock = threading.Lock()
+_static_versions = {}
+
+
+def static_version(static_folder, filename):
+    """Short content hash of a static file (recomputed when its mtime or size changes)."""
+    path = os.path.join(static_folder, filename)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _static_lock:
+        cached = _static_versions.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    with open(path, 'rb') as f:
+        version = _digest(f.read())[:12]
+    with _static_lock:
+        _static_versions[path] = (stamp, version)
+    return version
+
+
+def cache_static(response, request, static_folder):
+    """Mark a static response immutable when it was requested with its current content hash."""
+    filename = (request.view_args or {}).get('filename')
+    version = request.args.get('v')
+    if response.status_code == 200 and version and version == static_version(static_folder, filename):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+_pages_lock = threading.Lock()
+_pages = {}
+
+
+def render_cached(flask_app, request, name):
+    """Serve a context-free template from a render cache that is refreshed when its source changes."""
+    key = (name, request.script_root)
+    with _pages_lock:
+        entry = _pages.get(name)
+    if entry is None or entry['key'] != key or not entry['template'].is_up_to_date:
+        template = flask_app.jinja_env.get_template(name)
+        if not template.is_up_to_date:
+            # Jinja only re-reads changed templates itself in auto-reload (debug) mode
+            flask_app.jinja_env.cache.clear()
+            template = flask_app.jinja_env.get_template(name)
+        html = render_template(template).encode('utf-8')
+        entry = {'key': key, 'template': template, 'resource': CachedResource(html, 'text/html')}
+        with _pages_lock:
+            _pages[name] = entry
+    return entry['resource'].respond(request)
@@ -0,0 +1,180 @@
+"""Pooled keep-alive HTTP client for JSON APIs, without provider SDKs.
+
+``get_client()`` returns one client per process. It uses httpx when installed
+(with HTTP/2 when the ``h2`` package is also present) and otherwise a small pool
+of persistent ``http.client`` connections per host, so repeated provider calls
+skip the TCP and TLS handshakes either way.
+
+Error responses raise HTTPStatusError, which carries ``status_code`` and
+``response.headers`` the way SDK exceptions do, so resilience.wrap_provider_error
+classifies them (retryable 429/5xx, Retry-After) without special cases.
+"""
+import http.client
+import os
+import ssl
+import threading
+from urllib.parse import urlsplit
+
+import jsoncodec
+
+DEFAULT_TIMEOUT = 60.0
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get('REDACTUM_HTTP_POOL_SIZE', '16'))
+
+# Failures that mean a pooled keep-alive connection was closed by the server
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+class Response:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return jsoncodec.decode(self.content, 'provider') if self.content else {}
+
+
+class HTTPStatusError(Exception):
+    """The server answered with a 4xx/5xx status."""
+
+    def __init__(self, response):
+        try:
+            detail = response.json().get('error', {})
+            message = detail.get('message') if isinstance(detail, dict) else str(detail)
+        except jsoncodec.DecodeError + (AttributeError,):
+            message = None
+        super().__init__(f"HTTP {response.status_code}: {message or response.content[:200]!r}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent http.client connections, per (scheme, host, port)."""
+
+    def __init__(self, max_per_host=MAX_CONNECTIONS_PER_HOST):
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._ssl_context = ssl.create_default_context()
+        self.created = 0
+        self.reused = 0
+
+    def _acquire(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            self.created += 1
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, body=None, headers=None, timeout=None) -> Response:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                raw = conn.getresponse()
+                content = raw.read()
+            except _STALE_ERRORS:
+                conn.close()
+                if reused:
+                    # The server closed an idle keep-alive connection; retry on a new one
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            response = Response(raw.status, {k.lower(): v for k, v in raw.getheaders()}, content)
+            if raw.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'transport': 'http.client', 'created': self.created, 'reused': self.reused,
+                    'idle': sum(len(v) for v in self._idle.values())}
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class HttpxPool:
+    """Same interface backed by httpx, using HTTP/2 when h2 is installed."""
+
+    def __init__(self, httpx, max_per_host=MAX_CONNECTIONS_PER_HOST):
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        self.http2 = http2
+        self._httpx = httpx
+        self._client = httpx.Client(http2=http2, limits=httpx.Limits(max_keepalive_connections=max_per_host))
+
+    def request(self, method, url, body=None, headers=None, timeout=None) -> Response:
+        raw = self._client.request(method, url, content=body, headers=headers,
+                                   timeout=DEFAULT_TIMEOUT if timeout is None else timeout)
+        return Response(raw.status_code, {k.lower(): v for k, v in raw.headers.items()}, raw.content)
+
+    def stats(self) -> dict:
+        return {'transport': 'httpx', 'http2': self.http2}
+
+    def close(self):
+        self._client.close()
+
+
+def post_json(pool, url, payload, headers=None, timeout=None) -> dict:
+    """POST a JSON body and return the decoded JSON response; raises HTTPStatusError on 4xx/5xx."""
+    all_headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+    all_headers.update(headers or {})
+    response = pool.request('POST', url, jsoncodec.encode(payload, 'provider'), all_headers, timeout)
+    if response.status_code >= 400:
+        raise HTTPStatusError(response)
+    return response.json()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """This process's pool (recreated after a fork so sockets are never shared)."""
+    global _client, _client_pid
+    pid = os.getpid()
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            try:
+                import httpx
+                _client = HttpxPool(httpx)
+            except ImportError:
+                _client = ConnectionPool()
+            _client_pid = pid
+        return _client
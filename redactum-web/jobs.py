@@ -0,0 +1,219 @@
+"""Durable background job queue for refinement requests, backed by SQLite.
+
+``POST /api/jobs`` stores the request and returns immediately; worker threads
+claim jobs in priority order (interactive before bulk, then oldest first), run
+them and store the response for ``GET /api/jobs/<id>``.
+
+Delivery is at-least-once: a claimed job holds a lease, and a job whose worker
+died (crash, restart) becomes claimable again once its lease expires. A result is
+only recorded while the worker still holds its lease, so a worker that outlived
+its lease cannot overwrite a newer attempt. Transient failures (429/503 from the
+refine path) are re-queued with backoff, and jobs whose workers keep dying are
+failed, once ``max_attempts`` is reached.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+import jsoncodec
+
+PRIORITIES = {'interactive': 0, 'default': 5, 'bulk': 10}
+RETRYABLE_STATUSES = (429, 503)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    http_status INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, created_at);
+"""
+
+
+class JobQueue:
+    """SQLite-backed priority queue plus a pool of worker threads.
+
+    ``handler(payload)`` must return ``(body, http_status, headers)``, the same
+    shape as app.run_refinement.
+    """
+
+    def __init__(self, path, handler, workers=2, lease_seconds=300.0, max_attempts=5,
+                 poll_interval=1.0, clock=time.time):
+        self.path = path
+        self.handler = handler
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # One short-lived connection per operation keeps this safe across threads
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return closing(conn)
+
+    def enqueue(self, payload, priority='default') -> str:
+        job_id = uuid.uuid4().hex
+        now = self.clock()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, priority, status, payload, available_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, PRIORITIES.get(priority, PRIORITIES['default']), 'queued', jsoncodec.encode(payload, 'jobs').decode('utf-8'), now, now, now))
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            'id': row['id'],
+            'status': row['status'],
+            'priority': next((k for k, v in PRIORITIES.items() if v == row['priority']), row['priority']),
+            'attempts': row['attempts'],
+            'createdAt': row['created_at'],
+            'updatedAt': row['updated_at'],
+        }
+        if row['result'] is not None:
+            job['httpStatus'] = row['http_status']
+            job['result'] = jsoncodec.decode(row['result'], 'jobs')
+        return job
+
+    def claim(self):
+        """Atomically claim the next runnable job. Returns (id, payload, lease) or None.
+
+        ``lease`` identifies this claim and must be passed back to ``complete``.
+        """
+        now = self.clock()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Expired leases with no attempts left: the job keeps killing its worker
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', result = ?, http_status = 500, lease_until = NULL, "
+                    "updated_at = ? WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (jsoncodec.encode({'error': 'Job did not finish within its lease'}, 'jobs').decode('utf-8'),
+                     now, now, self.max_attempts))
+                row = conn.execute(
+                    "SELECT id, payload FROM jobs "
+                    "WHERE (status = 'queued' AND available_at <= ?) "
+                    "   OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY priority, created_at LIMIT 1", (now, now)).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+                lease = now + self.lease_seconds
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                    "WHERE id = ?", (lease, now, row['id']))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return row['id'], jsoncodec.decode(row['payload'], 'jobs'), lease
+
+    def complete(self, job_id, lease, body, http_status, retry_after=None) -> bool:
+        """Record a handler result, re-queueing transient failures while attempts remain.
+
+        Returns False, recording nothing, when the claim identified by ``lease`` is
+        no longer current (its lease expired and the job was claimed again or failed).
+        """
+        now = self.clock()
+        held = "WHERE id = ? AND status = 'running' AND lease_until = ?"
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT attempts FROM jobs ' + held, (job_id, lease)).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return False
+                attempts = row['attempts']
+                if http_status in RETRYABLE_STATUSES and attempts < self.max_attempts:
+                    delay = retry_after if retry_after is not None else min(60.0, 2.0 ** attempts)
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', lease_until = NULL, available_at = ?, updated_at = ? " + held,
+                        (now + delay, now, job_id, lease))
+                else:
+                    status = 'done' if 200 <= http_status < 300 else 'failed'
+                    conn.execute(
+                        'UPDATE jobs SET status = ?, result = ?, http_status = ?, lease_until = NULL, updated_at = ? ' + held,
+                        (status, jsoncodec.encode(body, 'jobs').decode('utf-8'), http_status, now, job_id, lease))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return True
+
+    def run_once(self) -> bool:
+        """Claim and run one job. Returns False when nothing was runnable."""
+        claimed = self.claim()
+        if claimed is None:
+            return False
+        job_id, payload, lease = claimed
+        try:
+            body, http_status, headers = self.handler(payload)
+        except Exception as e:
+            body, http_status, headers = {'error': str(e)}, 500, {}
+        retry_after = None
+        if headers and headers.get('Retry-After'):
+            try:
+                retry_after = float(headers['Retry-After'])
+            except ValueError:
+                pass
+        self.complete(job_id, lease, body, http_status, retry_after)
+        return True
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except sqlite3.Error:
+                pass
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self):
+        if self._threads:
+            return self
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f'redactum-job-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['n'] for row in rows}
+
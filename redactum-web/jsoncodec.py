@@ -0,0 +1,83 @@
+"""JSON encoding and decoding through the fastest installed codec.
+
+Uses orjson, or else msgspec, when installed (``pip install orjson``), and the
+standard library otherwise. ``REDACTUM_JSON_CODEC`` (orjson, msgspec or json)
+forces a choice. All three produce compact UTF-8 output; key order is insertion
+order.
+
+``encode``/``decode`` also time themselves into the
+``redactum_json_codec_seconds`` histogram, labelled by operation and call site
+(request, response, telemetry, settings, jobs, provider). When a ``timings``
+dict is passed, the seconds are added to it too (see the Server-Timing header
+set in app.py).
+"""
+import json
+import os
+import time
+
+import metrics
+
+
+def _load_backend(preferred):
+    order = ['orjson', 'msgspec', 'json']
+    if preferred in order:
+        order.remove(preferred)
+        order.insert(0, preferred)
+    for name in order:
+        if name == 'json':
+            return name, None
+        try:
+            return name, __import__(name)
+        except ImportError:
+            continue
+
+
+BACKEND, _lib = _load_backend(os.environ.get('REDACTUM_JSON_CODEC', '').strip().lower())
+if BACKEND == 'msgspec':
+    import msgspec.json  # noqa: F401  (submodule is not imported by the package)
+
+# Raised by decode for malformed input, whichever backend is in use
+DecodeError = (ValueError, getattr(_lib, 'DecodeError', ValueError))
+
+
+def dumps(obj, default=None, indent=False) -> bytes:
+    """Serialize to UTF-8 JSON bytes; ``default`` converts otherwise unsupported objects."""
+    if BACKEND == 'orjson':
+        option = _lib.OPT_NON_STR_KEYS | (_lib.OPT_INDENT_2 if indent else 0)
+        return _lib.dumps(obj, default=default, option=option)
+    if BACKEND == 'msgspec':
+        data = _lib.json.encode(obj, enc_hook=default)
+        return _lib.json.format(data, indent=2) if indent else data
+    if indent:
+        return json.dumps(obj, default=default, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON from bytes or str."""
+    if BACKEND == 'orjson':
+        return _lib.loads(data)
+    if BACKEND == 'msgspec':
+        return _lib.json.decode(data)
+    return json.loads(data)
+
+
+def _observe(op, site, seconds, timings):
+    metrics.JSON_CODEC_SECONDS.observe(seconds, op=op, site=site)
+    if timings is not None:
+        timings[op] = timings.get(op, 0.0) + seconds
+
+
+def encode(obj, site='other', default=None, indent=False, timings=None) -> bytes:
+    start = time.perf_counter()
+    data = dumps(obj, default=default, indent=indent)
+    _observe('encode', site, time.perf_counter() - start, timings)
+    return data
+
+
+def decode(data, site='other', timings=None):
+    start = time.perf_counter()
+    try:
+        return loads(data)
+    finally:
+        _observe('decode', site, time.perf_counter() - start, timings)
@@ -0,0 +1,140 @@
+"""Rule checks without rewriting: every violation with its rule id and span.
+
+``lint(text)`` reports what postprocess.py would change, without changing it and
+without calling a provider. Use it to gate publishing or to skip a refine for
+text that already meets the rules. All rules share one compiled pattern, so the
+text is scanned once; the em-dash and "not just" budgets are applied to the
+matches afterwards.
+
+Rules (ids as reported):
+
+- banned_word: a word from postprocess.BANNED_WORDS_REPLACEMENTS
+- clarifying_phrase: "To clarify", "In summary", "In other words"
+- editorial_note: "Note:"/"Edited:" lines, "I changed ..." remarks and short
+  "note that ..." asides, as removed by postprocess.remove_editorial_notes
+- emoji_bullet: an emoji at the start of a line or list item
+- three_item_list: a bullet list of exactly three items
+- em_dash_budget: em dashes beyond one per 500 words
+- parallel_structure: "not just" after the first one in the text
+"""
+import re
+
+import postprocess as pp
+
+RULES = {
+    'banned_word': 'Banned word; use a plain, specific alternative',
+    'clarifying_phrase': 'Formulaic clarifying phrase',
+    'editorial_note': 'Editorial note or change log in the output',
+    'emoji_bullet': 'Emoji at the start of a line or list item',
+    'three_item_list': 'Three-item list; vary list lengths (2-5 items)',
+    'em_dash_budget': 'More than one em dash per 500 words',
+    'parallel_structure': 'More than one "Not just X, but Y" construction',
+}
+
+WORDS_PER_EM_DASH = 500
+
+# Arrows, technical and geometric symbols, dingbats and pictographs (box drawing excluded)
+_EMOJI = '\u2190-\u21ff\u2300-\u23ff\u2460-\u24ff\u25a0-\u27bf\u2900-\u297f\u2b00-\u2bff\U0001f000-\U0001faff'
+_BULLET = '-*•'
+_BANNED_WORDS = sorted((word for word, _ in pp.BANNED_WORDS_REPLACEMENTS), key=len, reverse=True)
+_CLARIFYING = ('to clarify', 'in summary', 'in other words')
+# First letters of every word-level rule; other word starts are skipped at once
+_WORD_STARTS = ''.join(sorted({w[0] for w in _BANNED_WORDS + list(_CLARIFYING) + ['i', 'note', 'not']}))
+
+
+def _alternation(phrases):
+    return '|'.join(re.escape(p).replace('\\ ', '\\s+') for p in phrases)
+
+
+# Alternatives are grouped behind cheap guards (a line start, a word start with a
+# possible first letter, an em dash) so most positions are rejected by one test.
+# Line-level rules come first so they win at a line start. The bullet alternative
+# is zero-width: it only marks list lines, and the rest of the line is still
+# scanned by the other alternatives.
+PATTERN = re.compile(rf"""
+    ^(?:
+        (?P<note_line>[ \t]*\[?(?:note|nb|edit(?:ed)?)\b\]?[^\n]*)
+      | (?P<bullet>(?=[ \t]*[{_BULLET}][ \t]))
+      | [ \t]*(?:[{_BULLET}][ \t]*)?(?P<emoji>[{_EMOJI}][{_EMOJI}\ufe0f\u200d]*)
+    )
+  | \b(?=[{_WORD_STARTS}])(?:
+        (?P<banned_word>(?:{_alternation(_BANNED_WORDS)})\b)
+      | (?P<clarifying_phrase>(?:{_alternation(_CLARIFYING)})\b)
+      | (?P<change_note>I\s+(?:did|made|changed|updated|added|removed|fixed|replaced|corrected)\b[^.?!\n]*[.?!]?)
+      | (?P<note_that>note\s+that\b(?:\s*[,;:\-—])?[^.?!\n]*[.?!]?)
+      | (?P<not_just>not\s+just\b)
+    )
+  | (?P<em_dash>—)
+""", re.I | re.M | re.X)
+
+# Same test as postprocess.remove_editorial_notes applies to a "Note:" line
+_NOTE_VERB_RE = re.compile(r'\b(i|we|i\s+have|i\s+was|i\s+removed|removed|edited|updated|changed|fixed|added|replaced)\b',
+                           re.I)
+
+
+def _violation(rule, text, start, end) -> dict:
+    return {'rule': rule, 'start': start, 'end': end, 'match': text[start:end], 'message': RULES[rule]}
+
+
+def lint(text) -> list:
+    """Every rule violation in ``text``, ordered by position.
+
+    Each is a dict with ``rule``, ``start`` and ``end`` (character offsets into
+    ``text``, end exclusive), the matched ``match`` and a short ``message``.
+    """
+    if not text:
+        return []
+    violations = []
+    em_dashes = []
+    not_just = []
+    # Bullet list runs: [first line start, last line end, items]
+    run = None
+
+    def close_run():
+        if run is not None and run[2] == 3:
+            violations.append(_violation('three_item_list', text, run[0], run[1]))
+
+    for m in PATTERN.finditer(text):
+        kind = m.lastgroup
+        start, end = m.span(kind)
+        if kind == 'bullet':
+            line_end = text.find('\n', start)
+            line_end = len(text) if line_end < 0 else line_end
+            if run is not None and run[1] + 1 == start:
+                run[1] = line_end
+                run[2] += 1
+            else:
+                close_run()
+                run = [start, line_end, 1]
+        elif kind == 'note_line':
+            line = m.group(kind).strip()
+            if _NOTE_VERB_RE.search(line) or len(line.split()) <= 6:
+                violations.append(_violation('editorial_note', text, start, end))
+        elif kind == 'change_note':
+            violations.append(_violation('editorial_note', text, start, end))
+        elif kind == 'note_that':
+            if len(m.group(kind).split()) <= 12:
+                violations.append(_violation('editorial_note', text, start, end))
+        elif kind == 'emoji':
+            violations.append(_violation('emoji_bullet', text, start, end))
+        elif kind == 'em_dash':
+            em_dashes.append(start)
+        elif kind == 'not_just':
+            not_just.append((start, end))
+        else:
+            violations.append(_violation(kind, text, start, end))
+    close_run()
+
+    allowed = max(1, len(text.split()) // WORDS_PER_EM_DASH)
+    violations.extend(_violation('em_dash_budget', text, i, i + 1) for i in em_dashes[allowed:])
+    violations.extend(_violation('parallel_structure', text, s, e) for s, e in not_just[1:])
+    violations.sort(key=lambda v: (v['start'], v['end']))
+    return violations
+
+
+def summary(violations) -> dict:
+    """Violation counts per rule id."""
+    counts = {}
+    for violation in violations:
+        counts[violation['rule']] = counts.get(violation['rule'], 0) + 1
+    return counts
@@ -0,0 +1,367 @@
+"""Prometheus-style metrics that aggregate across forked worker processes.
+
+Every process writes its samples into its own memory-mapped file
+(``<METRICS_DIR>/values_<pid>.db``); ``render()`` reads all files in the
+directory and sums them, so a scrape hitting any worker reports totals for the
+whole server. Recording is a dict lookup plus an in-place ``struct.pack_into``
+on the mmap, cheap enough for the request hot path.
+
+The directory is ``REDACTUM_METRICS_DIR``, or else a temp directory named after
+the process that imports this module. gunicorn.conf.py sets the variable from
+the master's pid before the app is loaded, so all workers of one master share a
+directory and other servers and later restarts do not. Counters of workers that
+exited stay in the totals, as they should; ``remove_dead_files()`` drops files
+left by processes from before the master started, and ``clear()`` removes them all.
+"""
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+def default_dir(pid=None) -> str:
+    return os.path.join(tempfile.gettempdir(), f'redactum-metrics-{pid or os.getpid()}')
+
+
+METRICS_DIR = os.environ.get('REDACTUM_METRICS_DIR') or default_dir()
+
+_INITIAL_SIZE = 1 << 16
+_HEADER = 8
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+def _entry_bytes(key: str, value: float) -> bytes:
+    encoded = key.encode('utf-8')
+    # Pad so the float64 value that follows the key is 8-byte aligned
+    padded = len(encoded) + (8 - (len(encoded) + 4) % 8)
+    return struct.pack(f'i{padded}sd', len(encoded), encoded, value)
+
+
+def _read_entries(data: bytes):
+    """Yield (key, value) pairs from the contents of a store file."""
+    if len(data) < _HEADER:
+        return
+    used = struct.unpack_from('i', data, 0)[0]
+    pos = _HEADER
+    while pos < used:
+        key_len = struct.unpack_from('i', data, pos)[0]
+        key = data[pos + 4:pos + 4 + key_len].decode('utf-8')
+        padded = key_len + (8 - (key_len + 4) % 8)
+        pos += 4 + padded
+        yield key, struct.unpack_from('d', data, pos)[0]
+        pos += 8
+
+
+class MmapStore:
+    """Append-only key -> float64 store in a memory-mapped file (one writer process)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._positions = {}
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size < _INITIAL_SIZE:
+                os.ftruncate(fd, _INITIAL_SIZE)
+                size = _INITIAL_SIZE
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._used = struct.unpack_from('i', self._mm, 0)[0] or _HEADER
+        if self._used == _HEADER:
+            struct.pack_into('i', self._mm, 0, _HEADER)
+        pos = _HEADER
+        for key, _ in _read_entries(self._mm[:self._used]):
+            key_len = len(key.encode('utf-8'))
+            pos += 4 + key_len + (8 - (key_len + 4) % 8)
+            self._positions[key] = pos
+            pos += 8
+
+    def _grow(self, needed):
+        size = len(self._mm)
+        while size < needed:
+            size *= 2
+        self._mm.flush()
+        self._mm.close()
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def _position(self, key):
+        pos = self._positions.get(key)
+        if pos is None:
+            entry = _entry_bytes(key, 0.0)
+            if self._used + len(entry) > len(self._mm):
+                self._grow(self._used + len(entry))
+            self._mm[self._used:self._used + len(entry)] = entry
+            self._used += len(entry)
+            # Publish the entry only after it is fully written
+            struct.pack_into('i', self._mm, 0, self._used)
+            pos = self._positions[key] = self._used - 8
+        return pos
+
+    def inc(self, key, amount):
+        with self._lock:
+            pos = self._position(key)
+            struct.pack_into('d', self._mm, pos, struct.unpack_from('d', self._mm, pos)[0] + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            struct.pack_into('d', self._mm, self._position(key), value)
+
+
+_store_lock = threading.Lock()
+_store = None
+_store_pid = None
+
+
+def _get_store() -> MmapStore:
+    """Return this process's store, reopening it after a fork."""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        with _store_lock:
+            if _store_pid != pid:
+                os.makedirs(METRICS_DIR, exist_ok=True)
+                _store = MmapStore(os.path.join(METRICS_DIR, f'values_{pid}.db'))
+                _store_pid = pid
+    return _store
+
+
+def _sample_key(sample_name, labels) -> str:
+    return json.dumps([sample_name, labels], separators=(',', ':'))
+
+
+REGISTRY = []
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        REGISTRY.append(self)
+
+    def _label_pairs(self, labels):
+        return [[n, str(labels.get(n, ''))] for n in self.labelnames]
+
+    def _child_keys(self, labels):
+        values = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        keys = self._children.get(values)
+        if keys is None:
+            keys = self._children[values] = self._build_keys(self._label_pairs(labels))
+        return keys
+
+    def _build_keys(self, pairs):
+        return _sample_key(self.name, pairs)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        _get_store().inc(self._child_keys(labels), amount)
+
+
+class Gauge(_Metric):
+    """Gauge summed over live processes (samples of exited workers are ignored)."""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        _get_store().set(self._child_keys(labels), value)
+
+    def inc(self, amount=1, **labels):
+        _get_store().inc(self._child_keys(labels), amount)
+
+    def dec(self, amount=1, **labels):
+        _get_store().inc(self._child_keys(labels), -amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _build_keys(self, pairs):
+        bucket_keys = [
+            _sample_key(self.name + '_bucket', pairs + [['le', _format_le(b)]])
+            for b in self.buckets + (float('inf'),)
+        ]
+        return (bucket_keys, _sample_key(self.name + '_sum', pairs), _sample_key(self.name + '_count', pairs))
+
+    def observe(self, value, **labels):
+        bucket_keys, sum_key, count_key = self._child_keys(labels)
+        store = _get_store()
+        # Buckets are stored non-cumulatively and accumulated at render time
+        store.inc(bucket_keys[bisect.bisect_left(self.buckets, value)], 1)
+        store.inc(sum_key, value)
+        store.inc(count_key, 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+def _format_le(bound) -> str:
+    if bound == float('inf'):
+        return '+Inf'
+    return repr(float(bound))
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_files():
+    """(pid, path) of every process file in METRICS_DIR."""
+    files = []
+    for path in glob.glob(os.path.join(METRICS_DIR, 'values_*.db')):
+        try:
+            files.append((int(os.path.basename(path)[len('values_'):-len('.db')]), path))
+        except ValueError:
+            continue
+    return files
+
+
+def remove_dead_files() -> int:
+    """Delete files of processes that are no longer running; call before forking workers."""
+    removed = 0
+    for pid, path in _process_files():
+        if pid != os.getpid() and not _pid_alive(pid):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def clear():
+    """Delete every process file and the directory itself (on server exit)."""
+    for _, path in _process_files():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    try:
+        os.rmdir(METRICS_DIR)
+    except OSError:
+        pass
+
+
+def collect() -> dict:
+    """Sum samples from every process file. Returns {(sample_name, labels_tuple): value}."""
+    gauges = {m.name for m in REGISTRY if m.kind == 'gauge'}
+    totals = {}
+    for pid, path in _process_files():
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        alive = None
+        for key, value in _read_entries(data):
+            sample_name, labels = json.loads(key)
+            if sample_name in gauges:
+                if alive is None:
+                    alive = _pid_alive(pid)
+                if not alive:
+                    continue
+            ident = (sample_name, tuple(tuple(p) for p in labels))
+            totals[ident] = totals.get(ident, 0.0) + value
+    return totals
+
+
+def _format_value(value) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    inner = ','.join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in labels)
+    return '{' + inner + '}'
+
+
+def render() -> str:
+    """Render all registered metrics in the Prometheus text exposition format."""
+    totals = collect()
+    by_name = {}
+    for (sample_name, labels), value in totals.items():
+        by_name.setdefault(sample_name, []).append((labels, value))
+
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        if metric.kind != 'histogram':
+            for labels, value in sorted(by_name.get(metric.name, [])):
+                lines.append(f'{metric.name}{_format_labels(labels)} {_format_value(value)}')
+            continue
+        # Group bucket samples by their non-le labels and emit cumulative counts
+        series = {}
+        for labels, value in by_name.get(metric.name + '_bucket', []):
+            base = tuple(p for p in labels if p[0] != 'le')
+            le = dict(labels)['le']
+            series.setdefault(base, {})[le] = value
+        for base in sorted(series):
+            cumulative = 0.0
+            for bound in metric.buckets + (float('inf'),):
+                le = _format_le(bound)
+                cumulative += series[base].get(le, 0.0)
+                lines.append(f'{metric.name}_bucket{_format_labels(base + (("le", le),))} {_format_value(cumulative)}')
+            for suffix in ('_sum', '_count'):
+                value = totals.get((metric.name + suffix, base), 0.0)
+                lines.append(f'{metric.name}{suffix}{_format_labels(base)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# Metric definitions shared by the web app. Defined here so every worker registers
+# the same set regardless of which code paths it has exercised.
+PROVIDER_LATENCY = Histogram('redactum_provider_latency_seconds', 'Provider completion latency.', ('provider', 'model'))
+POSTPROCESS_LATENCY = Histogram('redactum_postprocess_latency_seconds', 'Postprocess pipeline latency.', ('aggressiveness',))
+PROMPT_TOKENS = Histogram('redactum_prompt_tokens', 'Estimated prompt size per provider call.', ('provider',), buckets=SIZE_BUCKETS)
+OUTPUT_TOKENS = Histogram('redactum_output_tokens', 'Estimated completion size per provider call.', ('provider',), buckets=SIZE_BUCKETS)
+SCHEDULER_WAIT = Histogram('redactum_scheduler_wait_seconds', 'Time spent waiting for provider capacity.', ('provider',))
+PROMPT_CACHE_TOKENS = Counter('redactum_prompt_cache_tokens_total', 'Prompt tokens reported by providers, by cache status.', ('provider', 'status'))
+REQUESTS = Counter('redactum_requests_total', 'API requests by endpoint and status code.', ('endpoint', 'status'))
+ERRORS = Counter('redactum_errors_total', 'Errors by endpoint and kind.', ('endpoint', 'kind'))
+POSTPROCESS_ROUTE = Counter('redactum_postprocess_route_total', 'Postprocess runs by route (inline, pooled, overflow to inline, broken pool to inline).', ('route',))
+POSTPROCESS_POOL_IN_FLIGHT = Gauge('redactum_postprocess_pool_in_flight', 'Texts running or queued in the postprocess process pool.')
+POSTPROCESS_QUEUE_WAIT = Histogram('redactum_postprocess_queue_wait_seconds', 'Time texts waited for a postprocess pool worker.')
+MICROBATCH_ITEMS = Counter('redactum_microbatch_items_total', 'Refine requests offered to the micro-batcher, by outcome.', ('outcome',))
+WORKER_START = Histogram('redactum_worker_start_seconds', 'Time from fork (or process start) until a worker is ready.')
+PROCESS_MEMORY = Gauge('redactum_process_memory_bytes', 'Memory of live processes by kind (rss, pss, shared, private); pss sums to the true total.', ('kind',))
+TOKENS = Counter('redactum_tokens_total', 'Estimated tokens per refine request, by prompt section (completion for output).', ('provider', 'tone', 'variant', 'section'))
+SPECULATION = Counter('redactum_speculation_total', 'Speculative prefetch outcomes (hits, misses, stored, wasted, skipped_busy, skipped_budget, failed).', ('outcome',))
+JSON_CODEC_SECONDS = Histogram('redactum_json_codec_seconds', 'JSON encode/decode time by operation and call site.', ('op', 'site'), buckets=FAST_BUCKETS)
@@ -0,0 +1,177 @@
+"""Cross-request micro-batching of short refine requests.
+
+For short inputs most of each provider call is the fixed system message and tone
+preamble. MicroBatcher collects concurrent requests that share a batch key (same
+provider, model, API key, tone and custom instructions) for a few milliseconds,
+runs them as one packed provider call and routes each piece of the response back
+to its own request. The first request of a batch acts as its leader and makes the
+call; the others wait for it.
+
+A single request in the window, or a response that does not split cleanly,
+raises BatchFallback in every waiting request, and callers then make their own
+individual call. A provider error (retries exhausted, open circuit, rate limit,
+deadline) is re-raised in every waiting request instead, each getting its own
+copy: retrying each item on its own would only multiply calls to a provider that
+is already failing. Waiting requests give up with DeadlineExceeded when their own
+deadline passes before the leader's call returns.
+"""
+import re
+import threading
+
+import chunking
+import resilience
+
+DEFAULT_WINDOW_MS = 10
+DEFAULT_MAX_ITEMS = 8
+# Packed output has to fit under the provider completion cap
+DEFAULT_MAX_TOKENS = chunking.DEFAULT_CHUNK_TOKENS
+
+
+class BatchFallback(Exception):
+    """The request was not served by a batch; make an individual call instead."""
+
+    def __init__(self, reason, cause=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.cause = cause
+
+
+def item_marker(number, nonce) -> str:
+    return f"<<<ITEM {number} {nonce}>>>"
+
+
+def pack_items(texts, nonce) -> str:
+    """Join texts under numbered markers; the nonce makes the markers unguessable."""
+    blocks = [f"{item_marker(i + 1, nonce)}\n{text.strip()}" for i, text in enumerate(texts)]
+    return '\n\n'.join(blocks) + f"\n\n<<<END {nonce}>>>"
+
+
+def split_response(response, count, nonce):
+    """Split a packed model response back into ``count`` pieces.
+
+    Raises ValueError unless every marker 1..count appears exactly once, in order,
+    with non-empty text after it.
+    """
+    marker_re = re.compile(rf'^\s*<<<ITEM (\d+) {re.escape(nonce)}>>>\s*$', re.MULTILINE)
+    response = re.split(rf'^\s*<<<END {re.escape(nonce)}>>>\s*$', response or '', maxsplit=1, flags=re.MULTILINE)[0]
+    matches = list(marker_re.finditer(response))
+    if [int(m.group(1)) for m in matches] != list(range(1, count + 1)):
+        raise ValueError('Packed response markers are missing, duplicated or out of order')
+    pieces = []
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+        piece = response[m.end():end].strip()
+        if not piece or '<<<' in piece:
+            raise ValueError(f'Packed response item {i + 1} is empty or malformed')
+        pieces.append(piece)
+    return pieces
+
+
+def _copy_error(error):
+    """A new exception equal to ``error``, so each waiting thread raises its own object."""
+    copy = error.__class__.__new__(error.__class__, *error.args)
+    copy.__dict__.update(error.__dict__)
+    return copy
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.tokens = 0
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.reason = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Groups concurrent submissions per key into packed calls. Thread-safe."""
+
+    def __init__(self, window_ms=DEFAULT_WINDOW_MS, max_items=DEFAULT_MAX_ITEMS, max_tokens=DEFAULT_MAX_TOKENS):
+        self.window_ms = window_ms
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._open = {}
+        self.stats_totals = {'batches': 0, 'batched_items': 0, 'single': 0, 'fallback_items': 0,
+                             'error_items': 0}
+
+    def configure(self, window_ms=None, max_items=None):
+        if window_ms is not None:
+            self.window_ms = window_ms
+        if max_items is not None:
+            self.max_items = max_items
+
+    def submit(self, key, text, execute, deadline=None):
+        """Return this text's result from a packed call, or raise BatchFallback.
+
+        ``execute(texts)`` makes one provider call for all texts and returns a list of
+        results in the same order. It raises ValueError when the response does not
+        split, which falls back; any other exception is re-raised to every waiter.
+        A request that joined another's batch waits at most until its ``deadline``.
+        """
+        tokens = chunking.estimate_tokens(text)
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is None or len(batch.items) >= self.max_items or batch.tokens + tokens > self.max_tokens:
+                batch = self._open[key] = _Batch()
+                leader = True
+            else:
+                leader = False
+            index = len(batch.items)
+            batch.items.append(text)
+            batch.tokens += tokens
+            if len(batch.items) >= self.max_items:
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window_ms / 1000.0)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            self._run(batch, execute)
+        elif not batch.done.wait(deadline.remaining() if deadline is not None else None):
+            raise resilience.DeadlineExceeded()
+
+        if batch.reason == 'error':
+            if leader:
+                raise batch.error
+            raise _copy_error(batch.error) from batch.error
+        if batch.results is None:
+            raise BatchFallback(batch.reason, batch.error)
+        return batch.results[index]
+
+    def _run(self, batch, execute):
+        items = list(batch.items)
+        try:
+            if len(items) == 1:
+                batch.reason = 'single'
+                return
+            results = execute(items)
+            if len(results) != len(items):
+                raise ValueError('Packed call returned the wrong number of results')
+            batch.results = results
+        except ValueError as e:
+            batch.reason = 'failed'
+            batch.error = e
+        except Exception as e:
+            batch.reason = 'error'
+            batch.error = e
+        finally:
+            with self._lock:
+                totals = self.stats_totals
+                if batch.results is not None:
+                    totals['batches'] += 1
+                    totals['batched_items'] += len(items)
+                elif batch.reason == 'single':
+                    totals['single'] += 1
+                elif batch.reason == 'error':
+                    totals['error_items'] += len(items)
+                else:
+                    totals['fallback_items'] += len(items)
+            batch.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats_totals)
@@ -0,0 +1,124 @@
+"""Incremental postprocessing with a paragraph-level result cache.
+
+When a user edits one paragraph of a long document, only that paragraph needs to
+go back through the pipeline. ``postprocess_incremental`` splits the text at blank
+lines and runs each paragraph through ``postprocess_refined_text_full`` on its
+own, so a paragraph's result depends only on its text and the humanize level
+(the RNG substreams are seeded from the paragraph itself). Those two form the
+cache key; neighbouring paragraphs are left out of it because they do not change
+a paragraph's result. Everything that depends on the rest of the document runs
+over the joined result instead: the budgets (em dashes per 500 words, one "not
+just" construction), the single human marker and the transition markers at the
+aggressive level, personalizing phrases used in more than one paragraph, and
+removal of sentences repeated across paragraphs. That last step reuses sentence
+hashes cached with each paragraph's result, so only edited paragraphs are rehashed.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import dedupe
+import postprocess as pp
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('REDACTUM_PARAGRAPH_CACHE_SIZE', '4096'))
+
+_PARAGRAPH_SPLIT_RE = re.compile(r'\n\s*\n')
+
+
+def paragraph_key(paragraph: str, aggressiveness: str) -> str:
+    return hashlib.blake2b(f'{aggressiveness}|{paragraph}'.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ParagraphCache:
+    """Thread-safe LRU of paragraph key -> (text, report, sentence features)."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'maxEntries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+# Steps limited to once per document; reconcile_document runs them over the joined text
+DOCUMENT_STEPS = ('insert_human_markers', 'soften_transitions')
+
+
+def _process_paragraph(paragraph, aggressiveness):
+    result = pp.postprocess_refined_text_full(paragraph, debug=True, aggressiveness=aggressiveness,
+                                              telemetry=False, skip=DOCUMENT_STEPS)
+    return result['text'], result['report'], dedupe.sentence_features(result['text'])
+
+
+def reconcile_document(text: str, aggressiveness: str = 'standard') -> str:
+    """Re-apply the transforms whose budgets span the whole document."""
+    text = pp.drop_repeated_phrases(pp.limit_em_dashes(pp.limit_parallel_structure(text)))
+    if aggressiveness == 'aggressive' and text:
+        streams = pp.RngStreams(text, aggressiveness)
+        text = pp.soften_transitions(text, streams.rng('soften_transitions'))
+        text = pp.insert_human_markers(text, streams.rng('insert_human_markers'))
+    return text
+
+
+def postprocess_incremental(text, aggressiveness='standard', cache=None):
+    """Postprocess text paragraph by paragraph, reusing cached paragraph results.
+
+    Returns {'text': ..., 'report': {...}}; the report sums the per-paragraph
+    counters and adds ``paragraphs`` and ``paragraphs_reprocessed``.
+    """
+    paragraphs = [p.strip() for p in _PARAGRAPH_SPLIT_RE.split(text or '') if p.strip()]
+    outputs = []
+    sentences, sets, sigs = [], [], []
+    report = {'paragraphs': len(paragraphs), 'paragraphs_reprocessed': 0}
+    for paragraph in paragraphs:
+        key = paragraph_key(paragraph, aggressiveness)
+        cached = cache.get(key) if cache is not None else None
+        if cached is None:
+            cached = _process_paragraph(paragraph, aggressiveness)
+            report['paragraphs_reprocessed'] += 1
+            if cache is not None:
+                cache.put(key, cached)
+        out_text, para_report, features = cached
+        if out_text:
+            outputs.append(out_text)
+            sentences.extend(features[0])
+            sets.extend(features[1])
+            sigs.append(features[2])
+        for name, value in para_report.items():
+            if isinstance(value, int) and not name.startswith('expected_') and name != 'final_length':
+                report[name] = report.get(name, 0) + value
+
+    # Paragraphs are deduplicated on their own; repeats across paragraphs are removed
+    # here, from the cached sentence hashes so only changed paragraphs are rehashed
+    features = (sentences, sets, np.vstack(sigs) if sigs else np.zeros((0, dedupe.NUM_PERM), np.uint64))
+    joined, removed = dedupe.remove_near_duplicate_sentences('\n\n'.join(outputs), features=features)
+    report['near_duplicate_sentences_removed'] = report.get('near_duplicate_sentences_removed', 0) + removed
+    joined = reconcile_document(joined, aggressiveness)
+    report['final_length'] = len(joined)
+    return {'text': joined, 'report': report}
@@ -1,5 +1,11 @@
+import hashlib
+import math
+import random
 import re
 
+import dedupe
+import jsoncodec
+
 """Post-processing helpers to enforce the quality rules and humanize AI output.
 
 This module contains deterministic, well-tested text transformations used by the
@@ -88,11 +94,40 @@ def strip_leading_emoji_from_list_items(text: str) -> str:
 
 
 def _seeded_random(text: str, aggressiveness: str):
-    import hashlib, random
     seed = int(hashlib.md5((text + '|' + aggressiveness).encode('utf-8')).hexdigest()[:16], 16)
     return random.Random(seed)
 
 
+class RngStreams:
+    """Independent random substreams derived from one content hash.
+
+    The text is hashed once; ``rng(transform, paragraph, pass_index)`` then returns a
+    fresh generator seeded from (content hash, transform, paragraph, pass). Each
+    transform's choices depend only on its own key, so disabling or reordering a
+    transform, or processing paragraphs separately, leaves every other choice unchanged.
+    """
+
+    def __init__(self, text: str, aggressiveness: str):
+        self.seed = hashlib.blake2b((text + '|' + aggressiveness).encode('utf-8'), digest_size=16).hexdigest()
+
+    def rng(self, transform: str, paragraph: int = -1, pass_index: int = 0):
+        # String seeds are hashed with SHA-512 by random.Random, so keys are stable across runs
+        return random.Random(f'{self.seed}|{transform}|{paragraph}|{pass_index}')
+
+
+def apply_per_paragraph(text: str, transform, streams: RngStreams, pass_index: int = 0, **kwargs) -> str:
+    """Apply ``transform(paragraph, rng, **kwargs)`` to each blank-line separated paragraph.
+
+    Every paragraph gets its own substream keyed by (transform, paragraph index).
+    """
+    paragraphs = text.split('\n\n')
+    name = transform.__name__
+    return '\n\n'.join(
+        transform(p, streams.rng(name, i, pass_index), **kwargs) if p.strip() else p
+        for i, p in enumerate(paragraphs)
+    )
+
+
 def apply_contractions(text: str, rng) -> str:
     """Apply a subset of contractions deterministically using provided rng."""
     # Choose fraction of contraction mappings to apply
@@ -231,27 +266,31 @@ def fix_punctuation_and_spacing(text: str) -> str:
     return text.strip()
 
 
-def insert_personalizing_phrases(text: str, rng) -> str:
+PERSONALIZING_PHRASES = (
+    "For example, someone might prefer quiet reflection over group discussion.",
+    "In practice, this shows up as small day-to-day preferences.",
+    "Often, this appears in how people choose tasks or teams.",
+    "A common case is preferring a planned schedule to spontaneous changes.",
+    "Sometimes this is visible in career choices or team roles.",
+)
+
+
+def insert_personalizing_phrases(text: str, rng, used=None) -> str:
     """Insert short illustrative micro-examples or hedges to add human-like specificity.
 
     Uses neutral, non-assertive phrasing (avoids first-person claims) and is deterministic via rng.
+    Pass one ``used`` set for every paragraph of a document so no phrase is used twice.
     """
-    phrases = [
-        "For example, someone might prefer quiet reflection over group discussion.",
-        "In practice, this shows up as small day-to-day preferences.",
-        "Often, this appears in how people choose tasks or teams.",
-        "A common case is preferring a planned schedule to spontaneous changes.",
-        "Sometimes this is visible in career choices or team roles."
-    ]
+    phrases = PERSONALIZING_PHRASES
     # Insert after some sentences with small probability, avoid repeats
     sents = re.split(r'(?<=[.!?])\s+', text)
     out = []
-    used = set()
+    used = set() if used is None else used
     for s in sents:
         out.append(s)
         if rng.random() < 0.06 and len(s.split()) > 6:
             # pick a phrase not used yet (deterministically)
-            choices = [p for p in phrases if p not in used]
+            choices = [p for p in phrases if p not in used and p not in text]
             if not choices:
                 continue
             ph = choices[rng.randrange(len(choices))]
@@ -261,6 +300,16 @@ def insert_personalizing_phrases(text: str, rng) -> str:
 
 
 
+def drop_repeated_phrases(text: str, phrases=PERSONALIZING_PHRASES) -> str:
+    """Keep the first occurrence of each inserted phrase and remove the rest."""
+    for phrase in phrases:
+        first = text.find(phrase)
+        if first >= 0 and text.find(phrase, first + len(phrase)) >= 0:
+            head, tail = text[:first + len(phrase)], text[first + len(phrase):]
+            text = head + re.sub(r' ?' + re.escape(phrase), '', tail)
+    return text
+
+
 FORMAL_TO_PLAIN_REPLACEMENTS = [
     (r'(?i)\bis a widely recognized framework\b', 'is a framework'),
     (r'(?i)\bthe fundamental principle\b', 'the main idea'),
@@ -339,6 +388,8 @@ def fix_three_item_lists(text: str) -> str:
 def limit_parallel_structure(text: str) -> str:
     """Preserve the first 'Not just' phrasing; rewrite subsequent occurrences to 'Beyond'."""
     # Simpler deterministic approach: replace additional 'not just' occurrences with 'Beyond'.
+    if text.lower().count('not just') < 2:
+        return text
     pattern = re.compile(r'(?i)\bnot just\b')
     counter = {'n': 0}
 
@@ -351,10 +402,13 @@ def limit_parallel_structure(text: str) -> str:
     return pattern.sub(_repl, text)
 
 def limit_em_dashes(text: str) -> str:
-    words = len(re.findall(r'\w+', text))
-    allowed = max(1, words // 500)
     emdash = '—'
     count = text.count(emdash)
+    if count <= 1:
+        # Every text is allowed one; skip counting words
+        return text
+    words = len(re.findall(r'\w+', text))
+    allowed = max(1, words // 500)
     if count <= allowed:
         return text
     parts = text.split(emdash)
@@ -395,11 +449,50 @@ def postprocess_refined_text(text: str) -> str:
     return str(result)
 
 
-def postprocess_refined_text_full(text: str, debug: bool = False, aggressiveness: str = 'standard'):
+# Optional humanization steps, most expensive first (measured on a ~2,000 word
+# document; extra passes repeat the whole pipeline). When a request is running out
+# of time the pipeline drops steps from the front of this list. The transforms that
+# enforce the quality rules always run.
+OPTIONAL_STEPS = (
+    'extra_passes',
+    'apply_contractions',
+    'reduce_formality',
+    'vary_sentence_rhythm',
+    'break_long_sentences_more_aggressively',
+    'insert_personalizing_phrases',
+    'soften_transitions',
+    'insert_human_markers',
+    'remove_linkedin_structure',
+)
+
+# Below this many seconds of remaining budget optional steps start being skipped
+DEGRADE_BELOW_SECONDS = 1.0
+
+
+def plan_degradation(time_budget, degrade_below: float = DEGRADE_BELOW_SECONDS):
+    """Return the optional steps to skip given the remaining budget in seconds.
+
+    Nothing is skipped with no budget or at least ``degrade_below`` seconds left;
+    below that a proportional share of OPTIONAL_STEPS is skipped, most expensive
+    first, down to all of them when the budget is spent.
+    """
+    if time_budget is None or time_budget >= degrade_below:
+        return ()
+    share = 1 - max(0.0, time_budget) / degrade_below
+    return OPTIONAL_STEPS[:math.ceil(len(OPTIONAL_STEPS) * share)]
+
+
+def postprocess_refined_text_full(text: str, debug: bool = False, aggressiveness: str = 'standard',
+                                  telemetry: bool = True, time_budget: float = None, skip=()):
     """Apply the full post-processing pipeline.
 
     If debug is True, returns a dict {'text': cleaned_text, 'report': {...}}.
     aggressiveness may be 'standard' or 'aggressive' (controls number of passes).
+    telemetry=False skips the telemetry log append (used for per-paragraph runs).
+    time_budget is the request's remaining time in seconds; when it is low, optional
+    humanization steps are skipped (see plan_degradation) and listed in
+    report['degraded'].
+    skip names OPTIONAL_STEPS the caller runs itself (not reported as degraded).
     """
     if not text:
         return {'text': text, 'report': {'editorial_markers_found': 0}} if debug else text
@@ -413,6 +506,7 @@ def postprocess_refined_text_full(text: str, debug: bool = False, aggressiveness
         'editorial_markers_found': 0,
         'banned_word_replacements': 0,
         'emoji_list_items_removed': 0,
+        'near_duplicate_sentences_removed': 0,
     }
 
     report['editorial_markers_found'] = len(re.findall(r'(?mi)\b(?:note|nb|edit(?:ed)?|i\s+updated|i\s+removed)\b', original))
@@ -428,10 +522,27 @@ def postprocess_refined_text_full(text: str, debug: bool = False, aggressiveness
     else:
         passes = 2
 
-    # Seeded RNG ensures deterministic 'humanization' choices per input+aggressiveness
-    rng = _seeded_random(original, aggressiveness)
+    skipped = set(plan_degradation(time_budget))
+    if skipped:
+        report['degraded'] = [step for step in OPTIONAL_STEPS if step in skipped]
+        report['time_budget_ms'] = round(1000 * max(0.0, time_budget))
+    if 'extra_passes' in skipped:
+        passes = 1
+    skipped.update(skip)
+
+    def enabled(step):
+        return step not in skipped
+
+    # Deterministic 'humanization' choices per input+aggressiveness, with an independent
+    # substream per (transform, paragraph, pass)
+    streams = RngStreams(original, aggressiveness)
+    # Personalizing phrases already inserted anywhere in the document, across passes
+    used_phrases = set()
 
-    for _ in range(passes):
+    # Repeated sentences are dropped once up front; later passes cannot introduce them
+    text, report['near_duplicate_sentences_removed'] = dedupe.remove_near_duplicate_sentences(text)
+
+    for pass_index in range(passes):
         # Core safety transforms always applied
         text = remove_editorial_notes(text)
         text = remove_clarifying_phrases(text)
@@ -447,7 +558,8 @@ def postprocess_refined_text_full(text: str, debug: bool = False, aggressiveness
         if aggressiveness in ('standard', 'aggressive'):
             # soften overt LinkedIn-like structure heuristically
             before_linkedin = text
-            text = remove_linkedin_structure(text)
+            if enabled('remove_linkedin_structure'):
+                text = remove_linkedin_structure(text)
             if text != before_linkedin:
                 report.setdefault('linkedin_softened', 0)
                 report['linkedin_softened'] += 1
@@ -455,8 +567,11 @@ def postprocess_refined_text_full(text: str, debug: bool = False, aggressiveness
             # in standard mode to make outputs less uniformly formal.
             if aggressiveness == 'standard':
                 before_std = text
-                text = reduce_formality(text)
-                text = insert_personalizing_phrases(text, rng)
+                if enabled('reduce_formality'):
+                    text = reduce_formality(text)
+                if enabled('insert_personalizing_phrases'):
+                    text = apply_per_paragraph(text, insert_personalizing_phrases, streams, pass_index,
+                                               used=used_phrases)
                 if text != before_std:
                     report.setdefault('standard_humanized', 0)
                     report['standard_humanized'] += 1
@@ -465,24 +580,34 @@ def postprocess_refined_text_full(text: str, debug: bool = False, aggressiveness
         if aggressiveness == 'aggressive':
             # Apply deterministic contractions
             before_contractions = text
-            text = apply_contractions(text, rng)
+            if enabled('apply_contractions'):
+                text = apply_per_paragraph(text, apply_contractions, streams, pass_index)
             if text != before_contractions:
                 report.setdefault('contractions_applied', 0)
                 report['contractions_applied'] += 1
 
             # Vary sentence rhythm and insert mild discourse markers
             before_rhythm = text
-            text = vary_sentence_rhythm(text, rng)
-            text = soften_transitions(text, rng)
+            if enabled('vary_sentence_rhythm'):
+                text = apply_per_paragraph(text, vary_sentence_rhythm, streams, pass_index)
+            if enabled('soften_transitions'):
+                # Once per document: run per paragraph it would fire far more often
+                text = soften_transitions(text, streams.rng('soften_transitions', -1, pass_index))
             if text != before_rhythm:
                 report.setdefault('sentence_rhythm_changed', 0)
                 report['sentence_rhythm_changed'] += 1
             # Additional aggressive humanization transforms
             before_more = text
-            text = reduce_formality(text)
-            text = insert_human_markers(text, rng)
-            text = break_long_sentences_more_aggressively(text, rng)
-            text = insert_personalizing_phrases(text, rng)
+            if enabled('reduce_formality'):
+                text = reduce_formality(text)
+            if enabled('insert_human_markers'):
+                # At most one marker per document, so this one draws from a document-level stream
+                text = insert_human_markers(text, streams.rng('insert_human_markers', -1, pass_index))
+            if enabled('break_long_sentences_more_aggressively'):
+                text = apply_per_paragraph(text, break_long_sentences_more_aggressively, streams, pass_index)
+            if enabled('insert_personalizing_phrases'):
+                text = apply_per_paragraph(text, insert_personalizing_phrases, streams, pass_index,
+                                           used=used_phrases)
             if text != before_more:
                 report.setdefault('aggressive_humanized', 0)
                 report['aggressive_humanized'] += 1
@@ -520,26 +645,28 @@ def postprocess_refined_text_full(text: str, debug: bool = False, aggressiveness
 
     # Non-PII telemetry: append summary counts to telemetry log to help tune heuristics.
     # Do not include original text or any user content.
-    try:
-        import json, time
-        telemetry = {
-            'ts': int(time.time()),
-            'aggressiveness': aggressiveness,
-            'editorial_markers_found': report.get('editorial_markers_found', 0),
-            'banned_word_replacements': report.get('banned_word_replacements', 0),
-            'emoji_list_items_removed': report.get('emoji_list_items_removed', 0),
-            'final_length': report.get('final_length', 0)
-        }
-        with open('telemetry.jsonl', 'a') as tf:
-            tf.write(json.dumps(telemetry) + '\n')
-    except Exception:
-        # Telemetry must never break processing; ignore errors silently
-        # Do not silently swallow exceptions that indicate file-system issues in tests.
-        # Keep behavior conservative in production, but surface IOError during test runs.
+    if telemetry:
         try:
-            raise
+            import time
+            entry = {
+                'ts': int(time.time()),
+                'aggressiveness': aggressiveness,
+                'editorial_markers_found': report.get('editorial_markers_found', 0),
+                'banned_word_replacements': report.get('banned_word_replacements', 0),
+                'emoji_list_items_removed': report.get('emoji_list_items_removed', 0),
+                'final_length': report.get('final_length', 0)
+            }
+            line = jsoncodec.encode(entry, 'telemetry') + b'\n'
+            with open('telemetry.jsonl', 'ab') as tf:
+                tf.write(line)
         except Exception:
-            pass
+            # Telemetry must never break processing; ignore errors silently
+            # Do not silently swallow exceptions that indicate file-system issues in tests.
+            # Keep behavior conservative in production, but surface IOError during test runs.
+            try:
+                raise
+            except Exception:
+                pass
 
     # Add determinism report fields for aggressiveness unit tests: contraction fraction
     # and rhythm merge/split probabilities are seeded deterministically; expose
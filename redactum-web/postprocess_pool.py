@@ -0,0 +1,153 @@
+"""Process pool for CPU-heavy postprocessing.
+
+postprocess_refined_text_full is regex-heavy pure Python and holds the GIL while
+it runs. Sending long texts to worker processes lets request threads that are
+only waiting on provider I/O keep running; short texts stay inline, where the
+pipeline is cheaper than the round trip to a worker. The pool is created lazily
+(or ahead of traffic by ``warm``) and rebuilt if a worker dies; if it cannot be
+used at all the work runs inline.
+
+The pool is sized per host, not per process: every gunicorn worker has its own
+pool, so by default each gets ``cpu_count // REDACTUM_WORKERS - 1`` processes
+(at least 1). Pool processes are started by a fork server (spawn where that is
+unavailable) rather than forked from the worker, which by then runs job-queue
+and request threads whose locks a forked child could inherit mid-use.
+
+At most ``MAX_QUEUE`` texts are in flight in the pool (running or waiting for a
+worker). Further texts are processed inline instead of queueing without bound,
+and ``stats()`` reports saturation and how long texts waited for a worker.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+import postprocess as pp
+
+# Server processes on this host (gunicorn.conf.py exports its worker count)
+SERVER_WORKERS = max(1, int(os.environ.get('REDACTUM_WORKERS', '0')) or 1)
+POOL_WORKERS = (int(os.environ.get('REDACTUM_POSTPROCESS_WORKERS', '0'))
+                or max(1, (os.cpu_count() or 2) // SERVER_WORKERS - 1))
+# Texts shorter than this (in characters) are postprocessed in the request thread
+INLINE_MAX_CHARS = int(os.environ.get('REDACTUM_POSTPROCESS_INLINE_MAX_CHARS', '4000'))
+MAX_QUEUE = int(os.environ.get('REDACTUM_POSTPROCESS_QUEUE', '0')) or POOL_WORKERS * 4
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_QUEUE)
+_stats_lock = threading.Lock()
+_stats = {'inline': 0, 'pooled': 0, 'overflow': 0, 'broken': 0, 'in_flight': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=_mp_context())
+        return _pool
+
+
+def _discard_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False)
+
+
+def _run_in_worker(submitted_at, text, debug, aggressiveness, time_budget):
+    """Runs in a pool process; returns (result, seconds waited for a worker)."""
+    waited = max(0.0, time.time() - submitted_at)
+    if time_budget is not None:
+        time_budget -= waited
+    return pp.postprocess_refined_text_full(text, debug, aggressiveness, time_budget=time_budget), waited
+
+
+def _count(route, waited=None):
+    with _stats_lock:
+        _stats[route] += 1
+        if waited is not None:
+            _stats['wait_total'] += waited
+            _stats['wait_max'] = max(_stats['wait_max'], waited)
+    metrics.POSTPROCESS_ROUTE.inc(route=route)
+
+
+def _inline(text, debug, aggressiveness, time_budget):
+    return pp.postprocess_refined_text_full(text, debug=debug, aggressiveness=aggressiveness, time_budget=time_budget)
+
+
+def postprocess(text, debug=False, aggressiveness='standard', time_budget=None):
+    """Postprocess inline for short texts, otherwise in the pool, and wait for the result."""
+    if len(text or '') < INLINE_MAX_CHARS:
+        _count('inline')
+        return _inline(text, debug, aggressiveness, time_budget)
+    if not _slots.acquire(blocking=False):
+        # Pool saturated: do the work here rather than queueing without bound
+        _count('overflow')
+        return _inline(text, debug, aggressiveness, time_budget)
+    with _stats_lock:
+        _stats['in_flight'] += 1
+    metrics.POSTPROCESS_POOL_IN_FLIGHT.inc()
+    pool = None
+    try:
+        pool = get_pool()
+        result, waited = pool.submit(_run_in_worker, time.time(), text, debug, aggressiveness, time_budget).result()
+        metrics.POSTPROCESS_QUEUE_WAIT.observe(waited)
+        _count('pooled', waited)
+        return result
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); replace the pool and finish this one inline
+        if pool is not None:
+            _discard_pool(pool)
+        _count('broken')
+        return _inline(text, debug, aggressiveness, time_budget)
+    finally:
+        with _stats_lock:
+            _stats['in_flight'] -= 1
+        metrics.POSTPROCESS_POOL_IN_FLIGHT.dec()
+        _slots.release()
+
+
+def warm():
+    """Start every worker process and run the pipeline once in each."""
+    pool = get_pool()
+    futures = [pool.submit(_run_in_worker, time.time(), 'Warm up. It is fine.', False, 'aggressive', None)
+               for _ in range(POOL_WORKERS)]
+    for future in futures:
+        future.result()
+
+
+def stats() -> dict:
+    with _stats_lock:
+        s = dict(_stats)
+    pooled = s.pop('pooled')
+    wait_total = s.pop('wait_total')
+    return {
+        'workers': POOL_WORKERS,
+        'maxQueue': MAX_QUEUE,
+        'inlineMaxChars': INLINE_MAX_CHARS,
+        'inFlight': s['in_flight'],
+        'saturation': round(s['in_flight'] / MAX_QUEUE, 3),
+        'inline': s['inline'],
+        'pooled': pooled,
+        'overflow': s['overflow'],
+        'broken': s['broken'],
+        'avgQueueWaitMs': round(1000 * wait_total / pooled, 2) if pooled else 0.0,
+        'maxQueueWaitMs': round(1000 * s['wait_max'], 2),
+    }
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
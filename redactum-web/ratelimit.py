@@ -0,0 +1,223 @@
+"""Per-provider request scheduling: rate budgets, concurrency cap and backpressure.
+
+Each (provider, API key) pair gets one ProviderScheduler that enforces a
+requests-per-minute and a tokens-per-minute budget (token buckets) plus a maximum
+number of in-flight calls. Requests that cannot start immediately wait in a
+bounded FIFO queue up to a deadline; when the queue is full or the deadline
+passes, RateLimited is raised so the web layer can answer 429 with Retry-After
+instead of letting the provider reject the call.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_LIMITS = {
+    'rpm': 60,
+    'tpm': 120000,
+    'maxInFlight': 8,
+    'queueSize': 32,
+    'queueTimeout': 30.0,
+}
+
+
+class RateLimited(Exception):
+    """Raised when a request cannot be scheduled within its budget."""
+
+    # The scheduler already waited as long as allowed; callers should not retry
+    # blindly (see chunking.refine_chunks).
+    retryable = False
+
+    def __init__(self, message, retry_after, timed_out=False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        # True when the request waited its full timeout, False when rejected at once
+        self.timed_out = timed_out
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, int(math.ceil(self.retry_after))))
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``per_minute / 60`` per second."""
+
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.clock = clock
+        self.configure(per_minute)
+
+    def configure(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.tokens = self.capacity
+        self.updated = self.clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount) -> float:
+        """Seconds until ``amount`` tokens are available (0 when available now)."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        # A request larger than the whole bucket can still run once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        if self.capacity <= 0:
+            return
+        self.tokens -= min(amount, self.capacity)
+
+
+class ProviderScheduler:
+    """Admission control for one provider/API-key pair. Thread-safe."""
+
+    def __init__(self, limits=None, clock=time.monotonic):
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self.in_flight = 0
+        self.requests = TokenBucket(0, clock)
+        self.tokens = TokenBucket(0, clock)
+        self.stats_totals = {'admitted': 0, 'rejected': 0, 'waited': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+        self.configure(limits)
+
+    def configure(self, limits=None):
+        merged = dict(DEFAULT_LIMITS)
+        merged.update(limits or {})
+        with self._cond:
+            if merged == getattr(self, 'limits', None):
+                return
+            self.limits = merged
+            self.requests.configure(merged['rpm'])
+            self.tokens.configure(merged['tpm'])
+            self._cond.notify_all()
+
+    def _wait_needed(self, tokens) -> float:
+        """Seconds until a request of ``tokens`` could start; 0 when it can start now.
+
+        Returns ``math.inf`` when only a release (not the clock) can free a slot.
+        """
+        if self.in_flight >= self.limits['maxInFlight']:
+            return math.inf
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def _retry_after(self, tokens) -> float:
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+        return max(1.0, wait)
+
+    def acquire(self, tokens=0, timeout=None):
+        """Block until the request may start, or raise RateLimited."""
+        timeout = self.limits['queueTimeout'] if timeout is None else timeout
+        start = self.clock()
+        with self._cond:
+            if not self._queue and self._wait_needed(tokens) == 0:
+                self._admit(tokens, 0.0)
+                return
+            if len(self._queue) >= self.limits['queueSize']:
+                self.stats_totals['rejected'] += 1
+                raise RateLimited('Provider queue is full; please retry shortly.', self._retry_after(tokens))
+
+            ticket = object()
+            self._queue.append(ticket)
+            try:
+                while True:
+                    wait = self._wait_needed(tokens) if self._queue[0] is ticket else math.inf
+                    if wait == 0:
+                        self._queue.popleft()
+                        self._admit(tokens, self.clock() - start)
+                        self._cond.notify_all()
+                        return
+                    remaining = start + timeout - self.clock()
+                    if remaining <= 0:
+                        self.stats_totals['rejected'] += 1
+                        raise RateLimited('Timed out waiting for provider capacity; please retry shortly.',
+                                          self._retry_after(tokens), timed_out=True)
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    self._cond.notify_all()
+
+    def try_acquire(self, tokens=0) -> bool:
+        """Start a request only if it can start now without waiting or queueing.
+
+        For optional work (speculative prefetch) that must not delay queued
+        requests; a refusal is not counted as a rejection. Call release() after.
+        """
+        with self._cond:
+            if self._queue or self._wait_needed(tokens) != 0:
+                return False
+            self._admit(tokens, 0.0)
+            return True
+
+    def _admit(self, tokens, waited):
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.in_flight += 1
+        totals = self.stats_totals
+        totals['admitted'] += 1
+        if waited > 0:
+            totals['waited'] += 1
+            totals['wait_seconds'] += waited
+            totals['max_wait_seconds'] = max(totals['max_wait_seconds'], waited)
+
+    def release(self):
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens=0, timeout=None):
+        self.acquire(tokens, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._cond:
+            totals = self.stats_totals
+            return {
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._queue),
+                'admitted': totals['admitted'],
+                'rejected': totals['rejected'],
+                'waited': totals['waited'],
+                'avg_wait_ms': round(1000 * totals['wait_seconds'] / totals['waited'], 2) if totals['waited'] else 0.0,
+                'max_wait_ms': round(1000 * totals['max_wait_seconds'], 2),
+                'limits': dict(self.limits),
+            }
+
+
+_registry_lock = threading.Lock()
+_SCHEDULERS = {}
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Short non-reversible label for an API key (never store or expose raw keys)."""
+    return hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:8]
+
+
+def get_scheduler(provider_name, api_key, limits=None) -> ProviderScheduler:
+    """Return the shared scheduler for a provider/API-key pair, creating it on first use."""
+    key = f"{provider_name}:{key_fingerprint(api_key)}"
+    with _registry_lock:
+        scheduler = _SCHEDULERS.get(key)
+        if scheduler is None:
+            scheduler = _SCHEDULERS[key] = ProviderScheduler(limits)
+    scheduler.configure(limits)
+    return scheduler
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        items = list(_SCHEDULERS.items())
+    return {key: scheduler.stats() for key, scheduler in items}
@@ -0,0 +1,228 @@
+"""Retry policy and circuit breaker for provider calls.
+
+Provider adapters raise ProviderError carrying the upstream HTTP status (when one
+is known) and whether the failure is worth retrying: timeouts, connection errors,
+429 and 5xx are; authentication and validation errors are not. RetryPolicy retries
+retryable errors with jittered exponential backoff inside a total deadline, and a
+CircuitBreaker per provider fails fast while the provider keeps failing so the
+web layer can switch to a configured fallback provider. A per-request Deadline
+bounds attempts, backoff and provider timeouts for one request.
+"""
+import random
+import socket
+import threading
+import time
+
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """A provider call failed. ``status`` is the upstream HTTP status if known."""
+
+    def __init__(self, message, status=None, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class RetriesExhausted(ProviderError):
+    """Retryable failures persisted past the retry budget; do not retry again."""
+
+    def __init__(self, last_error, attempts):
+        super().__init__(f"{last_error} (after {attempts} attempts)",
+                         status=getattr(last_error, 'status', None),
+                         retryable=False,
+                         retry_after=getattr(last_error, 'retry_after', None))
+        self.attempts = attempts
+
+
+class CircuitOpen(ProviderError):
+    """The provider's circuit is open; the call was not attempted."""
+
+    def __init__(self, provider_name, retry_after):
+        super().__init__(f"{provider_name} is temporarily unavailable; please retry shortly.",
+                         status=503, retryable=False, retry_after=retry_after)
+
+
+class DeadlineExceeded(ProviderError):
+    """The request's time budget ran out before the provider answered."""
+
+    def __init__(self, message='Request deadline exceeded before the provider answered.'):
+        super().__init__(message, status=504, retryable=False)
+
+
+class Deadline:
+    """Time budget of one request, passed down to provider calls and postprocessing."""
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self):
+        """Raise DeadlineExceeded once the budget is spent."""
+        if self.expired():
+            raise DeadlineExceeded()
+
+
+def _status_of(exc):
+    for attr in ('status_code', 'status', 'http_status'):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, 'response', None)
+    value = getattr(response, 'status_code', None)
+    return value if isinstance(value, int) else None
+
+
+def _retry_after_of(exc):
+    headers = getattr(getattr(exc, 'response', None), 'headers', None)
+    try:
+        value = headers.get('retry-after') if headers is not None else None
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_timeout(exc):
+    if isinstance(exc, (TimeoutError, socket.timeout, ConnectionError)):
+        return True
+    # SDK exception classes (APITimeoutError, APIConnectionError, ...) without importing SDKs
+    name = type(exc).__name__
+    return 'Timeout' in name or 'Connection' in name
+
+
+def wrap_provider_error(label, exc) -> ProviderError:
+    """Convert any SDK/transport exception into a ProviderError with retry metadata."""
+    if isinstance(exc, ProviderError):
+        return exc
+    status = _status_of(exc)
+    retryable = status in RETRYABLE_STATUSES if status is not None else _is_timeout(exc)
+    return ProviderError(f"{label} API error: {str(exc)}", status=status, retryable=retryable,
+                         retry_after=_retry_after_of(exc))
+
+
+class RetryPolicy:
+    """Jittered exponential backoff ("full jitter") bounded by a total deadline."""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, deadline=30.0,
+                 sleep=time.sleep, clock=time.monotonic, rng=None):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.sleep = sleep
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+    def backoff(self, attempt, error=None) -> float:
+        """Delay before retry number ``attempt`` (1-based); honours Retry-After."""
+        delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, fn, deadline=None):
+        """Run ``fn`` with retries; a request ``deadline`` also bounds the backoff sleeps."""
+        start = self.clock()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return fn()
+            except ProviderError as e:
+                if not e.retryable:
+                    raise
+                if attempt >= self.max_attempts:
+                    raise RetriesExhausted(e, attempt) from e
+                delay = self.backoff(attempt, e)
+                if self.clock() + delay - start > self.deadline:
+                    raise RetriesExhausted(e, attempt) from e
+                if deadline is not None and delay >= deadline.remaining():
+                    raise RetriesExhausted(e, attempt) from e
+                self.sleep(delay)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures.
+
+    While open, calls fail fast. After ``reset_timeout`` seconds one trial call is
+    let through (half-open); its success closes the circuit, its failure re-opens it.
+    A trial that ends without reaching the provider must call ``release_trial``
+    so the next call can try again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may proceed now."""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if self.state == 'open' and remaining <= 0:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            raise CircuitOpen(self.name, max(1.0, remaining))
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = self.clock()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Let another trial through after one that neither succeeded nor failed."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures}
+
+
+_breakers_lock = threading.Lock()
+_BREAKERS = {}
+
+
+def get_breaker(provider_name, **options) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a provider."""
+    with _breakers_lock:
+        breaker = _BREAKERS.get(provider_name)
+        if breaker is None:
+            breaker = _BREAKERS[provider_name] = CircuitBreaker(provider_name, **options)
+        return breaker
+
+
+def snapshot() -> dict:
+    with _breakers_lock:
+        items = list(_BREAKERS.items())
+    return {name: breaker.stats() for name, breaker in items}
@@ -0,0 +1,95 @@
+"""Typed request bodies for the JSON API.
+
+Each schema is a ``TypedDict`` naming the fields an endpoint reads and their
+types. ``validate`` checks a decoded body against one: fields with the wrong type
+raise SchemaError (answered with 400 by app.py), ``null`` counts as absent, and
+unknown fields pass through untouched so handlers keep their own defaults.
+"""
+from typing import List, TypedDict, get_type_hints
+
+
+class SchemaError(ValueError):
+    """A request body does not match its schema."""
+
+
+class RefineRequest(TypedDict, total=False):
+    text: str
+    tone: str
+    customInstructions: str
+    humanizeLevel: str
+    debug: bool
+    compact: bool
+    responseFormat: str
+    promptVariant: str
+    sessionId: str
+    speculate: bool
+
+
+class PostprocessRequest(TypedDict, total=False):
+    text: str
+    humanizeLevel: str
+    debug: bool
+
+
+class LintRequest(TypedDict, total=False):
+    text: str
+
+
+class BatchRequest(TypedDict, total=False):
+    items: List[dict]
+    concurrency: int
+    stream: bool
+
+
+class JobRequest(RefineRequest, total=False):
+    priority: str
+
+
+class SettingsRequest(TypedDict, total=False):
+    activeProvider: str
+    theme: str
+    provider: str
+    apiKey: str
+    model: str
+    baseUrl: str
+    humanizeLevel: str
+    promptVariant: str
+    debug: bool
+
+
+_TYPE_NAMES = {str: 'a string', bool: 'true or false', int: 'an integer', list: 'an array', dict: 'an object'}
+_fields_cache = {}
+
+
+def _fields(schema):
+    fields = _fields_cache.get(schema)
+    if fields is None:
+        fields = _fields_cache[schema] = {
+            name: getattr(hint, '__origin__', hint) for name, hint in get_type_hints(schema).items()
+        }
+    return fields
+
+
+def _matches(value, expected) -> bool:
+    if expected is int:
+        # bool is an int subclass, but true is not a count
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, expected)
+
+
+def validate(body, schema) -> dict:
+    """Return ``body`` as a dict without null fields, or raise SchemaError."""
+    if body is None:
+        return {}
+    if not isinstance(body, dict):
+        raise SchemaError('Request body must be a JSON object')
+    out = {}
+    fields = _fields(schema)
+    for name, value in body.items():
+        if value is None:
+            continue
+        expected = fields.get(name)
+        if expected is not None and not _matches(value, expected):
+            raise SchemaError(f'"{name}" must be {_TYPE_NAMES.get(expected, expected.__name__)}')
+        out[name] = value
+    return out
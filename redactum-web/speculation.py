@@ -0,0 +1,251 @@
+"""Speculative prefetch of the refinements a user is likely to ask for next.
+
+After a refine, users often retry (same text and tone, for a different version)
+or switch to another tone. With speculation enabled, app.py prefetches those
+results, either from extra choices (``n > 1``) returned by the original provider
+call or from low-priority background refinements. It stores them in a
+short-lived cache scoped to the browser session, so the retry or tone switch is
+answered without a provider round trip.
+
+Background refinements only use spare provider capacity (they never queue behind
+or retry like user requests) and are paid for from a token budget per minute, so
+speculative spend is capped. Hit rate and wasted prefetches are reported by
+``stats()`` and the ``redactum_speculation_total`` metric.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import ratelimit
+
+# Seconds a prefetched result stays usable
+DEFAULT_TTL = 120.0
+MAX_SESSIONS = 1024
+MAX_ENTRIES_PER_SESSION = 8
+WORKERS = int(os.environ.get('REDACTUM_SPECULATIVE_WORKERS', '2'))
+# Speculative tokens (prompt + estimated completion) allowed per minute, per process
+DEFAULT_TOKENS_PER_MINUTE = 20000
+
+
+def request_key(text, tone_id, custom_instructions, humanize_level, provider, model, variant='full') -> str:
+    """Identity of a refinement result: what was asked and who answers it."""
+    raw = '\x1f'.join((text, tone_id, custom_instructions or '', humanize_level, provider, model, variant))
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class SpeculativeCache:
+    """Per-session store of prefetched results. Each result is served at most once."""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_sessions=MAX_SESSIONS, max_entries=MAX_ENTRIES_PER_SESSION,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self.counts = {'hits': 0, 'misses': 0, 'stored': 0, 'wasted': 0}
+
+    def _count(self, outcome, n=1):
+        if n:
+            self.counts[outcome] += n
+            metrics.SPECULATION.inc(n, outcome=outcome)
+
+    def _expire(self, entries, now):
+        for key in list(entries):
+            fresh = [item for item in entries[key] if item[0] > now]
+            self._count('wasted', len(entries[key]) - len(fresh))
+            if fresh:
+                entries[key] = fresh
+            else:
+                del entries[key]
+
+    def put(self, session, key, value):
+        now = self.clock()
+        with self._lock:
+            entries = self._sessions.get(session)
+            if entries is None:
+                entries = self._sessions[session] = OrderedDict()
+                while len(self._sessions) > self.max_sessions:
+                    _, dropped = self._sessions.popitem(last=False)
+                    self._count('wasted', sum(len(v) for v in dropped.values()))
+            self._sessions.move_to_end(session)
+            self._expire(entries, now)
+            entries.setdefault(key, []).append((now + self.ttl, value))
+            entries.move_to_end(key)
+            while sum(len(v) for v in entries.values()) > self.max_entries:
+                oldest = next(iter(entries))
+                entries[oldest].pop(0)
+                self._count('wasted')
+                if not entries[oldest]:
+                    del entries[oldest]
+            self._count('stored')
+
+    def take(self, session, key):
+        """Remove and return the oldest fresh result for ``key``, or None."""
+        now = self.clock()
+        with self._lock:
+            entries = self._sessions.get(session)
+            if entries is not None:
+                self._expire(entries, now)
+                items = entries.get(key)
+                if items:
+                    value = items.pop(0)[1]
+                    if not items:
+                        del entries[key]
+                    self._count('hits')
+                    return value
+            self._count('misses')
+            return None
+
+    def available(self, session, key) -> int:
+        now = self.clock()
+        with self._lock:
+            items = self._sessions.get(session, {}).get(key, ())
+            return sum(1 for expires, _ in items if expires > now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            entries = sum(len(v) for e in self._sessions.values() for v in e.values())
+            sessions = len(self._sessions)
+        lookups = counts['hits'] + counts['misses']
+        return dict(counts, sessions=sessions, entries=entries,
+                    hitRate=round(counts['hits'] / lookups, 4) if lookups else 0.0)
+
+
+class ToneHistory:
+    """Remembers each session's last tone and counts tone switches to rank likely next tones."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._last = OrderedDict()
+        self._switches = {}
+
+    def record(self, session, tone_id):
+        with self._lock:
+            previous = self._last.pop(session, None)
+            self._last[session] = tone_id
+            while len(self._last) > self.max_sessions:
+                self._last.popitem(last=False)
+            if previous is not None and previous != tone_id:
+                pair = (previous, tone_id)
+                self._switches[pair] = self._switches.get(pair, 0) + 1
+
+    def likely_next(self, tone_id, tone_ids, k=1):
+        """The ``k`` tones most often switched to from ``tone_id``; ties go to neighbours in the list."""
+        if k <= 0 or tone_id not in tone_ids:
+            return []
+        index = tone_ids.index(tone_id)
+        with self._lock:
+            switches = dict(self._switches)
+
+        def rank(candidate):
+            distance = abs(tone_ids.index(candidate) - index)
+            # Among equal counts, nearer tones first and the next tone before the previous one
+            return (-switches.get((tone_id, candidate), 0), distance, tone_ids.index(candidate) < index)
+
+        return sorted((t for t in tone_ids if t != tone_id), key=rank)[:k]
+
+
+class Budget:
+    """Token budget per minute for speculative provider calls."""
+
+    def __init__(self, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self.bucket = ratelimit.TokenBucket(tokens_per_minute, clock)
+        self.spent = 0
+        self.denied = 0
+
+    def configure(self, tokens_per_minute):
+        with self._lock:
+            if self.bucket.capacity != float(tokens_per_minute):
+                self.bucket.configure(tokens_per_minute)
+
+    def try_spend(self, tokens) -> bool:
+        with self._lock:
+            if self.bucket.capacity <= 0 or self.bucket.wait_time(tokens) > 0:
+                self.denied += 1
+                return False
+            self.bucket.take(tokens)
+            self.spent += tokens
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'tokensPerMinute': int(self.bucket.capacity), 'spentTokens': self.spent, 'denied': self.denied}
+
+
+class Speculator:
+    """The cache, tone history, budget and background workers shared by a process."""
+
+    def __init__(self, workers=WORKERS, cache=None, budget=None, history=None):
+        self.workers = workers
+        self.cache = cache or SpeculativeCache()
+        self.budget = budget or Budget()
+        self.history = history or ToneHistory()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = set()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='speculate')
+            return self._executor
+
+    def submit(self, session, key, tokens, fn) -> bool:
+        """Run ``fn()`` in the background and cache its results for (session, key).
+
+        Skipped when the same prefetch is already pending or cached, when the
+        workers are all busy, or when the budget cannot pay ``tokens``. ``fn``
+        returns a list of values to cache, or None when it could not run (e.g. the
+        provider had no spare capacity).
+        """
+        job = (session, key)
+        with self._lock:
+            if job in self._pending or len(self._pending) >= self.workers * 2:
+                metrics.SPECULATION.inc(outcome='skipped_busy')
+                return False
+            if self.cache.available(session, key):
+                return False
+            if not self.budget.try_spend(tokens):
+                metrics.SPECULATION.inc(outcome='skipped_budget')
+                return False
+            self._pending.add(job)
+
+        def run():
+            try:
+                values = fn()
+                if values is None:
+                    metrics.SPECULATION.inc(outcome='skipped_busy')
+                for value in values or ():
+                    self.cache.put(session, key, value)
+            except Exception:
+                metrics.SPECULATION.inc(outcome='failed')
+            finally:
+                with self._lock:
+                    self._pending.discard(job)
+
+        self._get_executor().submit(run)
+        return True
+
+    def wait_idle(self, timeout=5.0) -> bool:
+        """Block until no prefetch is pending (used by tests and benchmarks)."""
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {'cache': self.cache.stats(), 'budget': self.budget.stats(), 'pending': pending}
@@ -0,0 +1,157 @@
+"""Preloading, warmup and readiness for the production server (see gunicorn.conf.py).
+
+``warm_app`` runs once in the gunicorn master before workers fork: it imports the
+provider SDKs, runs the postprocess pipeline at every humanize level so its regexes
+are compiled, builds the cached prompt prefixes and compiles the templates. It
+then calls ``gc.freeze()`` so those objects are left out of later collections and
+their pages stay shared copy-on-write with every worker. ``warm_worker`` runs in
+each worker after the fork: it creates the SDK clients (connection pools must not
+be shared across processes), starts the job queue and the postprocess pool
+processes, and marks the worker ready.
+"""
+import gc
+import importlib
+import os
+import time
+
+import fewshot
+import metrics
+import postprocess as pp
+import postprocess_pool
+
+# Module import time; wsgi.py imports this module first, so it approximates boot
+BOOT_STARTED = time.time()
+
+PROVIDER_SDKS = ('groq', 'openai', 'anthropic')
+
+WARMUP_TEXT = (
+    "Note: edited. We leverage robust tooling — and it is seamless. It is clear that we do not "
+    "need more meetings, and I am sure the plan is fine.\n\n- Speed\n- Cost\n- Quality"
+)
+
+_state = {
+    'ready': False,
+    'bootSeconds': None,
+    'forkedAt': None,
+    'workerStartSeconds': None,
+    'warmup': {},
+}
+
+
+def memory_usage() -> dict:
+    """Memory of this process in bytes: rss, plus pss/shared/private where /proc allows."""
+    usage = {}
+    try:
+        kb = {}
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                # "Rss:  12345 kB"; the first line is the address-range header
+                if len(parts) == 3 and parts[0].endswith(':') and parts[2] == 'kB':
+                    kb[parts[0][:-1]] = int(parts[1]) * 1024
+        usage['rss'] = kb.get('Rss', 0)
+        usage['pss'] = kb.get('Pss', 0)
+        usage['shared'] = kb.get('Shared_Clean', 0) + kb.get('Shared_Dirty', 0)
+        usage['private'] = kb.get('Private_Clean', 0) + kb.get('Private_Dirty', 0)
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux; the best available without /proc
+        usage['rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return usage
+
+
+def _timed(name, fn):
+    start = time.perf_counter()
+    result = fn()
+    _state['warmup'][name] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _import_sdks():
+    loaded = []
+    for module in PROVIDER_SDKS:
+        try:
+            importlib.import_module(module)
+            loaded.append(module)
+        except ImportError:
+            pass
+    _state['sdks'] = loaded
+
+
+def _warm_postprocess():
+    for level in ('low', 'standard', 'aggressive'):
+        pp.postprocess_refined_text_full(WARMUP_TEXT, aggressiveness=level, telemetry=False)
+
+
+def _warm_prompts(appmod):
+    for tone in appmod.TONES:
+        appmod.create_refinement_prompt(WARMUP_TEXT, tone['id'], tone['instruction'])
+
+
+def _warm_templates(flask_app):
+    for name in flask_app.jinja_env.list_templates():
+        flask_app.jinja_env.get_template(name)
+
+
+def warm_app(appmod):
+    """Load everything that can be shared read-only between workers. Call before forking."""
+    _timed('sdks', _import_sdks)
+    _timed('postprocess', _warm_postprocess)
+    _timed('few_shot', fewshot.get_index)
+    _timed('prompts', lambda: _warm_prompts(appmod))
+    _timed('templates', lambda: _warm_templates(appmod.app))
+    gc.collect()
+    gc.freeze()
+    _state['bootSeconds'] = round(time.time() - BOOT_STARTED, 4)
+
+
+def mark_forked():
+    """Record the fork time of a new worker (gunicorn post_fork hook)."""
+    _state['forkedAt'] = time.time()
+
+
+def _warm_clients(appmod):
+    settings = appmod.load_settings()
+    warmed = []
+    for name in {settings.get('activeProvider'), settings.get('fallbackProvider')} - {None}:
+        provider = appmod.get_ai_provider(name, settings)
+        if provider is None or not hasattr(provider, '_client'):
+            continue
+        try:
+            provider._client()
+            warmed.append(name)
+        except Exception:
+            # A missing SDK or bad key surfaces on the first real call instead
+            pass
+    _state['clients'] = sorted(warmed)
+
+
+def warm_worker(appmod):
+    """Per-process warmup after the fork; marks the worker ready."""
+    _timed('clients', lambda: _warm_clients(appmod))
+    _timed('jobs', appmod.get_job_queue)
+    _timed('postprocess_pool', postprocess_pool.warm)
+    started = _state['forkedAt'] or BOOT_STARTED
+    _state['workerStartSeconds'] = round(time.time() - started, 4)
+    _state['ready'] = True
+    metrics.WORKER_START.observe(_state['workerStartSeconds'])
+    record_memory()
+
+
+def record_memory() -> dict:
+    usage = memory_usage()
+    for kind, value in usage.items():
+        metrics.PROCESS_MEMORY.set(value, kind=kind)
+    return usage
+
+
+def status() -> dict:
+    """Copy of the startup state: readiness, boot/worker start times, warmup timings."""
+    return dict(_state, warmup=dict(_state['warmup']), pid=os.getpid())
+
+
+def readiness():
+    """Return (body, status) for the readiness check: 200 once this worker is warm."""
+    body = status()
+    body['memory'] = record_memory()
+    return body, (200 if body['ready'] else 503)
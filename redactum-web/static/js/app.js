@@ -7,6 +7,7 @@ class RedactumApp {
         this.settings = {};
         this.providers = {};
         this.theme = localStorage.getItem('theme') || 'dark';
+        this.sessionId = this.getSessionId();
         this.models = {
             'openai': ['gpt-4o', 'gpt-4o-mini', 'gpt-4-turbo', 'gpt-4', 'gpt-3.5-turbo'],
             'groq': ['llama-3.3-70b-versatile', 'llama-3.1-70b-versatile', 'llama-3.1-8b-instant', 'mixtral-8x7b-32768', 'gemma-7b-it'],
@@ -33,6 +34,16 @@ class RedactumApp {
         this.setupCharacterCount();
     }
 
+    getSessionId() {
+        // Per-tab id that scopes the server's speculative prefetch cache
+        let id = sessionStorage.getItem('sessionId');
+        if (!id) {
+            id = Math.random().toString(36).slice(2) + Date.now().toString(36);
+            sessionStorage.setItem('sessionId', id);
+        }
+        return id;
+    }
+
     async loadTones() {
         try {
             const response = await fetch('/api/tones');
@@ -198,7 +209,8 @@ class RedactumApp {
         try {
             const requestBody = {
                 text: inputText,
-                tone: this.selectedTone
+                tone: this.selectedTone,
+                sessionId: this.sessionId
             };
 
             // Add custom instructions if provided
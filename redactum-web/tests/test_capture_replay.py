@@ -0,0 +1,54 @@
+import json
+
+import capture
+from app import app
+from tools import replay
+
+
+def test_capture_records_shape_without_text(monkeypatch, tmp_path):
+    path = tmp_path / 'traffic.jsonl'
+    monkeypatch.setattr(capture, 'CAPTURE_FILE', str(path))
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: None)
+    secret = 'Confidential merger plan for Acme Corp'
+    app.test_client().post('/api/refine', json={'text': secret, 'tone': 'formal', 'humanizeLevel': 'low',
+                                                'customInstructions': 'Mention Bob'})
+    raw = path.read_text()
+    assert 'Acme' not in raw and 'Bob' not in raw
+    shape = json.loads(raw)
+    assert shape['textChars'] == len(secret) and shape['textWords'] == 6
+    assert shape['tone'] == 'formal' and shape['humanizeLevel'] == 'low'
+    assert shape['customInstructionChars'] == len('Mention Bob')
+
+
+def test_capture_is_off_by_default(monkeypatch, tmp_path):
+    monkeypatch.setattr(capture, 'CAPTURE_FILE', None)
+    monkeypatch.chdir(tmp_path)
+    capture.record({'text': 'hello'})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_replay_matches_sizes_and_scales_timing(tmp_path):
+    path = tmp_path / 'traffic.jsonl'
+    shapes = [capture.request_shape({'text': 'x' * chars, 'tone': 'casual', 'compact': chars == 900}, now=ts)
+              for ts, chars in [(101.0, 900), (100.0, 40), (104.0, 12)]]
+    path.write_text(''.join(json.dumps(s) + '\n' for s in shapes))
+
+    shapes = capture.load(str(path))
+    schedule = replay.build_schedule(shapes, speed=2.0)
+    assert [offset for offset, _ in schedule] == [0.0, 0.5, 2.0]
+    assert [len(p['text']) for _, p in schedule] == [40, 900, 12]
+    assert schedule[1][1]['compact'] is True and schedule[0][1]['tone'] == 'casual'
+
+    sent = []
+    report = replay.replay('http://stub/api/refine', shapes, speed=100.0,
+                           sender=lambda url, payload, timeout: sent.append(payload) or ('ok', 200))
+    assert report['ok'] == 3 and len(sent) == 3
+    assert report['traffic']['requests'] == 3 and report['traffic']['text_chars']['max'] == 900
+
+
+def test_unknown_option_values_are_recorded_as_other():
+    shape = capture.request_shape({'text': 'x', 'tone': 'Call me at 555-0100', 'humanizeLevel': ['low'],
+                                   'responseFormat': 'patch', 'promptVariant': 'jane@example.com'})
+    assert shape['tone'] == 'other' and shape['humanizeLevel'] == 'other'
+    assert shape['responseFormat'] == 'patch' and shape['promptVariant'] == 'other'
+    assert capture.request_shape({'text': 'x', 'tone': 'casual'})['tone'] == 'casual'
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+import chunking
+from app import app
+
+
+def _long_text(paragraphs=6, words=300):
+    return '\n\n'.join(
+        f"Paragraph {i} " + ' '.join(f"word{i}x{j}" for j in range(words)) + '.'
+        for i in range(paragraphs)
+    )
+
+
+def test_split_into_chunks_is_paragraph_aligned():
+    text = _long_text()
+    chunks = chunking.split_into_chunks(text, max_tokens=900)
+    assert len(chunks) > 1
+    # Stitching the chunk texts back must give the original paragraphs in order
+    assert '\n\n'.join(c.text for c in chunks) == text
+    for c in chunks:
+        assert chunking.estimate_tokens(c.text) <= 900
+    assert chunks[0].before == ''
+    assert chunks[1].before and chunks[0].after
+
+
+def test_short_text_is_single_chunk():
+    chunks = chunking.split_into_chunks('Hello world.\n\nSecond paragraph.')
+    assert len(chunks) == 1
+
+
+def test_refine_chunks_retries_failed_chunk_and_keeps_order():
+    chunks = chunking.split_into_chunks(_long_text(), max_tokens=500)
+    attempts = {}
+    lock = threading.Lock()
+
+    def refine_one(chunk):
+        with lock:
+            attempts[chunk.index] = attempts.get(chunk.index, 0) + 1
+            first_try = attempts[chunk.index] == 1
+        if chunk.index == 1 and first_try:
+            raise RuntimeError('transient')
+        return f"R{chunk.index}"
+
+    out = chunking.refine_chunks(chunks, refine_one, max_workers=3)
+    assert out == '\n\n'.join(f"R{c.index}" for c in chunks)
+    assert attempts[1] == 2
+    assert all(attempts[c.index] == 1 for c in chunks if c.index != 1)
+
+
+def test_empty_chunk_result_is_retried_with_backoff_then_fails():
+    chunks = chunking.split_into_chunks(_long_text(), max_tokens=500)
+    slept = []
+    results = {1: ['', 'R1 again']}
+
+    def refine_one(chunk):
+        pending = results.get(chunk.index)
+        return pending.pop(0) if pending else f"R{chunk.index}"
+
+    out = chunking.refine_chunks(chunks, refine_one, sleep=slept.append)
+    assert out.split('\n\n')[1] == 'R1 again' and slept == [chunking.DEFAULT_CHUNK_BACKOFF]
+
+    slept.clear()
+    with pytest.raises(chunking.ChunkRefinementError) as exc:
+        chunking.refine_chunks(chunks, lambda chunk: '' if chunk.index == 2 else 'ok', sleep=slept.append)
+    assert exc.value.index == 2 and slept == [chunking.DEFAULT_CHUNK_BACKOFF, 2 * chunking.DEFAULT_CHUNK_BACKOFF]
+
+
+def test_refine_api_chunks_long_input(monkeypatch):
+    calls = []
+
+    class FakeProvider:
+        def generate_completion(self, prompt, temperature=0.4):
+            calls.append(prompt)
+            return 'Refined section.'
+
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: FakeProvider())
+    client = app.test_client()
+    resp = client.post('/api/refine', json={'text': _long_text(paragraphs=8), 'tone': 'professional'})
+    assert resp.status_code == 200
+    assert len(calls) > 1
+    assert all('SURROUNDING CONTEXT' in p for p in calls)
@@ -0,0 +1,98 @@
+import gzip
+import time
+
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+import compression
+import textpatch
+from app import app
+
+
+def test_patch_roundtrip():
+    original = "We leverage robust tools.  The plan is ready, and it is fine.\n\nSecond paragraph here."
+    refined = "We use reliable tools. The plan is ready and it's fine.\n\nSecond paragraph here!"
+    patch = textpatch.make_patch(original, refined)
+    assert textpatch.apply_patch(original, patch) == refined
+    assert all(p[0] <= p[1] for p in patch)
+    assert textpatch.make_patch(original, original) == []
+
+
+
+def _js_apply(original, patch):
+    """Apply a patch the way a JavaScript client does, slicing UTF-16 code units."""
+    units = original.encode('utf-16-le')
+    for start, end, replacement in reversed(patch):
+        units = units[:2 * start] + replacement.encode('utf-16-le') + units[2 * end:]
+    return units.decode('utf-16-le')
+
+
+def test_utf16_offsets_survive_emoji():
+    original = "Launch day 🚀 is here. We ship 🎉 the robust build today."
+    refined = "Launch day 🚀 is here! We ship 🎉 the reliable build today."
+    patch = textpatch.make_patch(original, refined, utf16=True)
+    assert _js_apply(original, patch) == refined
+    assert textpatch.apply_patch(original, patch, utf16=True) == refined
+    # Code-point offsets stay available for Python callers
+    assert textpatch.apply_patch(original, textpatch.make_patch(original, refined)) == refined
+
+
+def test_long_repetitive_documents_diff_quickly():
+    para = "The team reviewed the plan and agreed on the next steps for the release. " * 5
+    original = '\n\n'.join(para for _ in range(280))
+    refined = original.replace('agreed', 'settled', 50).replace('release', 'launch', 30)
+    refined = refined.replace('\n\n', '\n\nA new 🚀 paragraph.\n\n', 1)
+    start = time.perf_counter()
+    patch = textpatch.make_patch(original, refined, utf16=True)
+    # Word-level diffing took several seconds here
+    assert time.perf_counter() - start < 1.0
+    assert _js_apply(original, patch) == refined
+    assert sum(len(p[2]) for p in patch) < len(refined) // 4
+
+
+def _fake_provider(monkeypatch, output):
+    class FakeProvider:
+        def generate_completion(self, prompt, temperature=0.4):
+            return output
+
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: FakeProvider())
+
+
+def test_compact_and_patch_modes(monkeypatch):
+    _fake_provider(monkeypatch, 'The report is done. Send it today.')
+    client = app.test_client()
+    draft = 'The report is finished. Send it today.'
+    full = client.post('/api/refine', json={'text': draft, 'tone': 'casual'}).get_json()
+    assert full['original'] == draft and full['tone']['id'] == 'casual'
+
+    compact = client.post('/api/refine', json={'text': draft, 'tone': 'casual', 'compact': True}).get_json()
+    assert 'original' not in compact and 'tone' not in compact
+    assert compact['toneId'] == 'casual' and compact['refined'] == full['refined']
+
+    patched = client.post('/api/refine', json={'text': draft, 'tone': 'casual', 'responseFormat': 'patch'}).get_json()
+    assert 'refined' not in patched
+    assert textpatch.apply_patch(draft, patched['patch'], utf16=True) == full['refined']
+
+
+def test_large_responses_are_gzipped_when_accepted(monkeypatch):
+    _fake_provider(monkeypatch, 'A short sentence about the plan. ' * 200)
+    monkeypatch.setattr(compression, 'brotli', None)
+    client = app.test_client()
+    payload = {'text': 'draft ' * 300, 'tone': 'casual'}
+    resp = client.post('/api/refine', json=payload, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert b'"success"' in gzip.decompress(resp.get_data())
+
+    plain = client.post('/api/refine', json=payload)
+    assert 'Content-Encoding' not in plain.headers
+    tiny = client.post('/api/refine', json={'text': '', 'tone': 'casual'}, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in tiny.headers
+
+
+def test_encoding_follows_client_preference(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', object())
+    assert compression.choose_encoding(parse_accept_header('gzip, br', Accept)) == 'br'
+    assert compression.choose_encoding(parse_accept_header('gzip;q=1.0, br;q=0.5', Accept)) == 'gzip'
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert compression.choose_encoding(parse_accept_header('br', Accept)) is None
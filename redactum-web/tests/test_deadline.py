@@ -0,0 +1,121 @@
+import pytest
+
+import app as appmod
+import postprocess
+import ratelimit
+import resilience
+from app import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class MaxJitter:
+    def uniform(self, low, high):
+        return high
+
+
+def test_degradation_plan_skips_most_expensive_steps_first():
+    assert postprocess.plan_degradation(None) == ()
+    assert postprocess.plan_degradation(5.0) == ()
+    half = postprocess.plan_degradation(0.5)
+    assert half == postprocess.OPTIONAL_STEPS[:len(half)] and 0 < len(half) < len(postprocess.OPTIONAL_STEPS)
+    assert postprocess.plan_degradation(0.0) == postprocess.OPTIONAL_STEPS
+
+
+def test_pipeline_without_budget_keeps_core_rules_and_reports_degradation():
+    text = "It is clear that we do not leverage the plan. I am sure it is robust."
+    out = postprocess.postprocess_refined_text_full(text, debug=True, aggressiveness='aggressive',
+                                                    telemetry=False, time_budget=0.0)
+    report = out['report']
+    assert report['degraded'] == list(postprocess.OPTIONAL_STEPS)
+    assert 'contractions_applied' not in report
+    assert 'leverage' not in out['text'] and 'robust' not in out['text']
+    full = postprocess.postprocess_refined_text_full(text, debug=True, aggressiveness='aggressive', telemetry=False)
+    assert 'degraded' not in full['report']
+
+
+def test_call_provider_passes_remaining_budget_and_stops_when_spent():
+    clock = FakeClock()
+    deadline = resilience.Deadline(5.0, clock=clock)
+    seen = []
+
+    class Provider:
+        def generate_completion(self, prompt, temperature=0.4):
+            seen.append(self.timeout)
+            clock.now += 2
+            return 'ok'
+
+    provider = Provider()
+    assert appmod.call_provider(provider, 'p', deadline=deadline) == 'ok'
+    assert seen == [5.0]
+    clock.now += 10
+    with pytest.raises(resilience.DeadlineExceeded):
+        appmod.call_provider(provider, 'p', deadline=deadline)
+
+
+def test_queue_wait_counts_against_the_provider_timeout():
+    clock = FakeClock()
+    seen = []
+
+    class QueueingScheduler:
+        limits = {'queueTimeout': 30.0}
+
+        def acquire(self, tokens=0, timeout=None):
+            if timeout < 2:
+                clock.now += timeout
+                raise ratelimit.RateLimited('Timed out waiting', 1, timed_out=True)
+            clock.now += 2
+
+        def release(self):
+            pass
+
+    class Provider:
+        scheduler = QueueingScheduler()
+
+        def generate_completion(self, prompt, temperature=0.4):
+            seen.append(self.timeout)
+            return 'ok'
+
+    assert appmod.call_provider(Provider(), 'p', deadline=resilience.Deadline(5.0, clock=clock)) == 'ok'
+    assert seen == [3.0]
+    # Running out of request budget in the queue is a timeout (504), not a rate limit
+    with pytest.raises(resilience.DeadlineExceeded):
+        appmod.call_provider(Provider(), 'p', deadline=resilience.Deadline(1.0, clock=clock))
+
+
+def test_retries_stop_at_the_request_deadline():
+    clock = FakeClock()
+    sleeps = []
+    policy = resilience.RetryPolicy(max_attempts=5, base_delay=4, max_delay=4, deadline=60,
+                                    sleep=sleeps.append, clock=clock, rng=MaxJitter())
+
+    def failing():
+        raise resilience.ProviderError('busy', status=503, retryable=True)
+
+    with pytest.raises(resilience.RetriesExhausted):
+        policy.call(failing, resilience.Deadline(3.0, clock=clock))
+    assert sleeps == []
+
+
+def test_refine_honours_timeout_header(monkeypatch):
+    seen = []
+
+    class FakeProvider:
+        def generate_completion(self, prompt, temperature=0.4):
+            seen.append(self.timeout)
+            return 'Refined text.'
+
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: FakeProvider())
+    client = app.test_client()
+    resp = client.post('/api/refine', json={'text': 'draft', 'tone': 'casual'}, headers={'X-Request-Timeout': '2.5'})
+    assert resp.status_code == 200
+    assert 0 < seen[0] <= 2.5
+    # A larger client budget cannot extend the configured one
+    client.post('/api/refine', json={'text': 'draft', 'tone': 'casual'}, headers={'X-Request-Timeout': '9999'})
+    assert seen[1] <= appmod.REQUEST_TIMEOUT_SECONDS
@@ -0,0 +1,96 @@
+import random
+import time
+
+import numpy as np
+
+import dedupe
+import paragraph_cache
+import postprocess
+from tools.replay import WORDS
+
+DOC = (
+    "We moved the review to Friday so everyone has time to read the draft. Send comments by Thursday noon.\n\n"
+    "- The new onboarding guide covers account setup and billing today.\n"
+    "- Pricing stays the same for now.\n"
+    "- The new onboarding guide covers account setup and billing today.\n\n"
+    "We moved the review to Friday so that everyone has time to read the draft. Thanks. Thanks."
+)
+
+
+def test_keeps_first_occurrence_and_line_structure():
+    text, removed = dedupe.remove_near_duplicate_sentences(DOC)
+    assert removed == 2
+    assert text.count('onboarding guide') == 1 and text.count('moved the review') == 1
+    # The first wording survives; the list keeps its remaining items; short repeats stay
+    assert 'so everyone has time' in text
+    assert '- Pricing stays the same for now.\n\nThanks. Thanks.' in text
+
+
+def test_distinct_sentences_are_untouched():
+    text = "The team shipped the update on Tuesday morning. Support tickets dropped by a third in the first week."
+    assert dedupe.remove_near_duplicate_sentences(text) == (text, 0)
+
+
+def test_pipeline_reports_removed_count():
+    result = postprocess.postprocess_refined_text_full(DOC, debug=True, aggressiveness='low', telemetry=False)
+    assert result['report']['near_duplicate_sentences_removed'] == 2
+    assert result['text'].count('onboarding guide') == 1
+
+
+def test_incremental_removes_repeats_across_paragraphs():
+    sentence = "The new onboarding guide covers account setup and billing today."
+    result = paragraph_cache.postprocess_incremental(f"{sentence}\n\nPricing is fixed.\n\n{sentence}", 'low')
+    assert result['report']['near_duplicate_sentences_removed'] == 1
+    assert result['text'].count('onboarding guide') == 1
+
+
+def test_scales_to_tens_of_thousands_of_sentences():
+    rng = random.Random(1)
+    sentences = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + '.'
+                 for _ in range(15000)]
+    sentences += sentences[::3]
+    rng.shuffle(sentences)
+    start = time.perf_counter()
+    text, removed = dedupe.remove_near_duplicate_sentences(' '.join(sentences))
+    assert time.perf_counter() - start < 10
+    assert removed >= 5000
+    assert dedupe.remove_near_duplicate_sentences(text)[1] == 0
+
+
+def test_recall_on_one_word_edits():
+    rng = random.Random(7)
+    originals, edits = [], []
+    for _ in range(300):
+        words = [rng.choice(WORDS) for _ in range(20)]
+        edited = list(words)
+        edited[rng.randrange(2, 18)] = rng.choice(WORDS)
+        originals.append(' '.join(words) + '.')
+        edits.append(' '.join(edited) + '.')
+    sets = [dedupe.shingles(s) for s in originals + edits]
+    sigs = dedupe.minhash_signatures(sets)
+    # Signature rows are independent, so their agreement rate estimates the Jaccard similarity
+    similarity = np.mean([dedupe.jaccard(sets[i], sets[300 + i]) for i in range(300)])
+    assert abs((sigs[:300] == sigs[300:]).mean() - similarity) < 0.03
+    # Every edited copy must reach the exact check through a shared LSH bucket
+    pairs = set(map(tuple, dedupe.candidate_pairs(sigs).tolist()))
+    assert sum((i, 300 + i) not in pairs for i in range(300)) <= 2
+
+
+def test_filler_variants_of_a_paragraph_are_removed():
+    variants = ['The review moved to Friday so everyone can read the draft first.',
+                'The review moved to Friday so that everyone can read the draft first.',
+                'The review just moved to Friday so everyone can read the draft first.']
+    text = '\n\n'.join(variants[i % 3] for i in range(40))
+    assert dedupe.remove_near_duplicate_sentences(text)[1] == 39
+
+
+def test_sentences_that_differ_in_one_fact_are_kept():
+    bullets = '\n'.join(f'- Grow revenue in the {region} region by ten percent before the end of the year.'
+                         for region in ('northern', 'southern', 'eastern'))
+    assert dedupe.remove_near_duplicate_sentences(bullets) == (bullets, 0)
+    prose = ('Support hours in the northern office run from nine to five on weekdays. '
+             'Support hours in the southern office run from nine to five on weekdays. '
+             'Support hours in the northern office run from nine to six on weekdays.')
+    assert dedupe.remove_near_duplicate_sentences(prose) == (prose, 0)
+    result = postprocess.postprocess_refined_text_full(bullets, aggressiveness='low', telemetry=False)
+    assert 'southern' in result and 'eastern' in result
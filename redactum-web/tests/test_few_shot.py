@@ -0,0 +1,69 @@
+import json
+import os
+import re
+import time
+
+import app as appmod
+import chunking
+import fewshot
+
+BANK = [
+    {'tone': None, 'before': 'The results were better than before.', 'after': 'Results improved.'},
+    {'tone': 'casual', 'before': 'The office will be closed on Monday due to the holiday.',
+     'after': 'Heads up, the office is closed Monday!'},
+    {'tone': 'casual', 'before': 'The deployment has been postponed due to technical difficulties.',
+     'after': "We're holding off on the release for now."},
+    {'tone': 'formal', 'before': 'hey the report is gonna be late', 'after': 'The report will be delayed.'},
+]
+
+
+def test_select_ranks_examples_of_the_tone_by_similarity():
+    index = fewshot.ExampleIndex(BANK)
+    picked = index.select('Our office is closed next Monday for the bank holiday.', 'casual', k=1)
+    assert picked == [BANK[1]]
+    picked = index.select('The deployment is postponed again, sorry.', 'casual', k=3)
+    assert picked[0] == BANK[2] and BANK[3] not in picked
+    # Unknown tones only see the tone-independent examples
+    assert index.select('The results were better this time.', 'nonexistent') == [BANK[0]]
+    assert index.select('', 'casual') == [] and fewshot.ExampleIndex([]).select('text') == []
+
+
+def test_select_stays_within_token_budget():
+    index = fewshot.ExampleIndex(BANK)
+    text = 'The office will be closed on Monday due to the holiday.'
+    one = chunking.estimate_tokens(fewshot.format_example(BANK[1]))
+    assert index.select(text, 'casual', k=3, token_budget=one) == [BANK[1]]
+    assert index.select(text, 'casual', k=3, token_budget=one - 1) != [BANK[1]]
+    assert index.select(text, 'casual', k=3, token_budget=0) == []
+
+
+def test_prompt_examples_follow_the_input_and_keep_the_prefix_stable():
+    tone = appmod.TONES[5]
+    closed = appmod.create_refinement_prompt('The office will be closed on Friday.', tone['id'], tone['instruction'])
+    delayed = appmod.create_refinement_prompt('The release is postponed.', tone['id'], tone['instruction'])
+    assert closed.prefix == delayed.prefix and 'EXAMPLES' not in closed.prefix
+    assert 'office is closed Monday' in closed.body
+    assert closed.body.index('EXAMPLES') < closed.body.index('ORIGINAL TEXT')
+
+
+def test_bank_loads_once_and_queries_are_fast():
+    index = fewshot.get_index()
+    assert index is fewshot.get_index() and index.stats()['examples'] > 0
+    text = 'We would like to inform you that the meeting has been moved to Thursday afternoon. ' * 20
+    start = time.perf_counter()
+    for _ in range(200):
+        index.select(text, 'professional')
+    assert (time.perf_counter() - start) / 200 < 0.002
+
+
+def test_bundled_examples_invent_no_facts():
+    with open(os.path.join(os.path.dirname(fewshot.__file__), 'few_shot_examples.json'), encoding='utf-8') as f:
+        examples = json.load(f)
+    for example in examples:
+        before = example['before'].lower()
+        # Numbers and capitalized words not at a sentence start (names, days, products)
+        facts = re.findall(r'\d[\d.,%]*', example['after'])
+        facts += re.findall(r"(?<![.!?]\s)(?<!^)\b[A-Z][\w']*", example['after'])
+        for fact in facts:
+            if fact not in ('I', "I'm"):
+                assert fact.lower() in before, (fact, example['after'])
@@ -0,0 +1,65 @@
+import os
+import re
+
+from flask import Flask, request
+
+import app as appmod
+import httpcache
+
+
+def test_json_endpoints_use_etags_and_compressed_variants():
+    client = appmod.app.test_client()
+    first = client.get('/api/tones', headers={'Accept-Encoding': 'gzip'})
+    assert first.status_code == 200
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert 'max-age=300' in first.headers['Cache-Control']
+    etag = first.headers['ETag']
+    again = client.get('/api/tones', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+    # The uncompressed representation has a different ETag
+    plain = client.get('/api/tones', headers={'If-None-Match': etag})
+    assert plain.status_code == 200 and plain.json == appmod.TONES
+    assert client.get('/api/providers').json['ollama']['name'] == 'Ollama'
+
+
+def test_static_urls_are_fingerprinted_and_immutable():
+    client = appmod.app.test_client()
+    page = client.get('/app')
+    assert page.status_code == 200 and 'no-cache' in page.headers['Cache-Control']
+    url = re.search(r'href="(/static/css/style\.css\?v=\w+)"', page.get_data(as_text=True)).group(1)
+    asset = client.get(url)
+    assert 'immutable' in asset.headers['Cache-Control'] and 'no-cache' not in asset.headers['Cache-Control']
+    assert 'immutable' not in client.get('/static/css/style.css?v=stale').headers['Cache-Control']
+    assert client.get('/app', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+
+
+def test_render_cache_invalidates_on_template_change_only(tmp_path):
+    (tmp_path / 'templates').mkdir()
+    (tmp_path / 'static').mkdir()
+    template = tmp_path / 'templates' / 'page.html'
+    asset = tmp_path / 'static' / 'site.css'
+    template.write_text("<link href=\"{{ url_for('static', filename='site.css') }}\"> one")
+    asset.write_text('body { color: red }')
+    site = Flask('site', template_folder=str(tmp_path / 'templates'), static_folder=str(tmp_path / 'static'))
+
+    @site.url_defaults
+    def versioned(endpoint, values):
+        if endpoint == 'static':
+            values['v'] = httpcache.static_version(site.static_folder, values['filename'])
+
+    @site.route('/')
+    def page():
+        return httpcache.render_cached(site, request, 'page.html')
+
+    client = site.test_client()
+    first = client.get('/').get_data(as_text=True)
+    assert first.endswith(' one') and client.get('/').get_data(as_text=True) == first
+
+    # Asset changes do not cost a filesystem walk per page request; a deploy restarts
+    asset.write_text('body { color: blue }')
+    os.utime(asset, ns=(1, 1))
+    assert client.get('/').get_data(as_text=True) == first
+
+    template.write_text("<link href=\"{{ url_for('static', filename='site.css') }}\"> two")
+    os.utime(template, (2, 2))
+    assert client.get('/').get_data(as_text=True).endswith(' two')
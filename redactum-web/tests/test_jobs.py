@@ -0,0 +1,100 @@
+import time
+
+import app as appmod
+import jobs
+from app import app
+
+
+def _queue(tmp_path, handler=None, **kwargs):
+    handler = handler or (lambda payload: ({'echo': payload['text']}, 200, {}))
+    return jobs.JobQueue(str(tmp_path / 'jobs.sqlite3'), handler, **kwargs)
+
+
+def test_interactive_jobs_run_before_bulk(tmp_path):
+    q = _queue(tmp_path)
+    bulk = q.enqueue({'text': 'bulk'}, 'bulk')
+    interactive = q.enqueue({'text': 'interactive'}, 'interactive')
+    assert q.claim()[0] == interactive
+    assert q.claim()[0] == bulk
+    assert q.claim() is None
+
+
+def test_jobs_survive_restart_and_expired_leases_are_reclaimed(tmp_path):
+    now = [1000.0]
+    clock = lambda: now[0]
+    q = _queue(tmp_path, clock=clock, lease_seconds=30)
+    job_id = q.enqueue({'text': 'hello'})
+    assert q.claim()[0] == job_id  # worker "crashes" without completing
+
+    restarted = _queue(tmp_path, clock=clock, lease_seconds=30)
+    assert restarted.claim() is None  # lease still held
+    now[0] += 31
+    assert restarted.run_once()
+    job = restarted.get(job_id)
+    assert job['status'] == 'done'
+    assert job['attempts'] == 2
+    assert job['result'] == {'echo': 'hello'}
+
+
+def test_transient_failures_are_requeued(tmp_path):
+    results = [({'error': 'busy'}, 503, {'Retry-After': '0'}), ({'ok': True}, 200, {})]
+    q = _queue(tmp_path, handler=lambda payload: results.pop(0))
+    job_id = q.enqueue({'text': 'x'})
+    q.run_once()
+    assert q.get(job_id)['status'] == 'queued'
+    q.run_once()
+    assert q.get(job_id)['status'] == 'done'
+
+
+def test_jobs_api_roundtrip(monkeypatch, tmp_path):
+    class FakeProvider:
+        def generate_completion(self, prompt, temperature=0.4):
+            return 'Refined in the background.'
+
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: FakeProvider())
+    monkeypatch.setattr(appmod, 'JOBS_DB', str(tmp_path / 'api.sqlite3'))
+    monkeypatch.setattr(appmod, '_job_queue', None)
+    client = app.test_client()
+    try:
+        resp = client.post('/api/jobs', json={'text': 'Hello', 'tone': 'professional', 'priority': 'bulk'})
+        assert resp.status_code == 202
+        job_id = resp.get_json()['id']
+        assert resp.headers['Location'] == f'/api/jobs/{job_id}'
+
+        deadline = time.time() + 5
+        job = client.get(f'/api/jobs/{job_id}').get_json()
+        while job['status'] not in ('done', 'failed') and time.time() < deadline:
+            time.sleep(0.02)
+            job = client.get(f'/api/jobs/{job_id}').get_json()
+        assert job['status'] == 'done'
+        assert job['priority'] == 'bulk'
+        assert job['result']['refined'].startswith('Refined')
+        assert client.get('/api/jobs/unknown').status_code == 404
+        assert client.post('/api/jobs', json={'text': 'x', 'priority': 'urgent'}).status_code == 400
+    finally:
+        appmod._job_queue.stop()
+
+
+def test_stale_worker_cannot_overwrite_a_reclaimed_job(tmp_path):
+    now = [1000.0]
+    q = _queue(tmp_path, clock=lambda: now[0], lease_seconds=30)
+    job_id = q.enqueue({'text': 'hello'})
+    _, _, stale_lease = q.claim()
+    now[0] += 31
+    _, _, lease = q.claim()
+    assert q.complete(job_id, lease, {'ok': 'new'}, 200)
+    assert not q.complete(job_id, stale_lease, {'ok': 'old'}, 500)
+    job = q.get(job_id)
+    assert job['status'] == 'done' and job['result'] == {'ok': 'new'}
+
+
+def test_job_that_keeps_losing_its_lease_is_failed(tmp_path):
+    now = [1000.0]
+    q = _queue(tmp_path, clock=lambda: now[0], lease_seconds=30, max_attempts=2)
+    job_id = q.enqueue({'text': 'crash'})
+    for _ in range(2):
+        assert q.claim()[0] == job_id  # worker dies every time
+        now[0] += 31
+    assert q.claim() is None
+    job = q.get(job_id)
+    assert job['status'] == 'failed' and job['attempts'] == 2 and job['httpStatus'] == 500
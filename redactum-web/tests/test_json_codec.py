@@ -0,0 +1,47 @@
+import pytest
+
+import app as appmod
+import jsoncodec
+import metrics
+import schemas
+
+
+def test_codec_round_trip_is_compact_utf8():
+    obj = {'text': 'Café — naïve', 'n': [1, 2.5, True, None]}
+    data = jsoncodec.dumps(obj)
+    assert isinstance(data, bytes) and b' ' not in data.replace('Café — naïve'.encode(), b'')
+    assert jsoncodec.loads(data) == obj
+    assert jsoncodec.loads(jsoncodec.dumps(obj, indent=True)) == obj
+    with pytest.raises(jsoncodec.DecodeError):
+        jsoncodec.loads(b'{"text": ')
+
+
+def test_encode_and_decode_are_timed():
+    timings = {}
+    jsoncodec.decode(jsoncodec.encode({'a': 1}, 'test', timings=timings), 'test', timings=timings)
+    assert set(timings) == {'encode', 'decode'}
+    samples = metrics.collect()
+    assert samples[('redactum_json_codec_seconds_count', (('op', 'encode'), ('site', 'test')))] >= 1
+
+
+def test_schema_validation():
+    assert schemas.validate({'text': 'hi', 'tone': None, 'extra': 1}, schemas.RefineRequest) == {'text': 'hi', 'extra': 1}
+    with pytest.raises(schemas.SchemaError, match='"text" must be a string'):
+        schemas.validate({'text': 42}, schemas.RefineRequest)
+    with pytest.raises(schemas.SchemaError, match='integer'):
+        schemas.validate({'items': [{}], 'concurrency': True}, schemas.BatchRequest)
+    with pytest.raises(schemas.SchemaError):
+        schemas.validate(['text'], schemas.RefineRequest)
+
+
+def test_endpoints_reject_bad_bodies_and_report_server_timing():
+    client = appmod.app.test_client()
+    bad = client.post('/api/postprocess', json={'text': ['not', 'a', 'string']})
+    assert bad.status_code == 400 and bad.json['error'] == '"text" must be a string'
+    broken = client.post('/api/refine', data=b'{"text": ', content_type='application/json')
+    assert broken.status_code == 400 and 'not valid JSON' in broken.json['error']
+
+    ok = client.post('/api/postprocess', json={'text': 'It is fine. We will ship it on Friday.'})
+    assert ok.status_code == 200 and ok.json['success']
+    timing = ok.headers['Server-Timing']
+    assert 'json-decode;dur=' in timing and 'json-encode;dur=' in timing
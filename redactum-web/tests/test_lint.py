@@ -0,0 +1,63 @@
+import time
+
+import app as appmod
+import lint
+import postprocess as pp
+
+DRAFT = """Note: I removed the filler.
+We delve into robust tooling — fast — and more.
+To clarify, this is not just fast but not just cheap.
+- 🚀 Launch
+- Ship
+- Celebrate
+
+- one
+- two
+Please note that this is short.
+"""
+
+
+def _found(text):
+    return [(v['rule'], v['match']) for v in lint.lint(text)]
+
+
+def test_every_rule_is_reported_with_its_span():
+    violations = lint.lint(DRAFT)
+    for v in violations:
+        assert DRAFT[v['start']:v['end']] == v['match'] and v['message'] == lint.RULES[v['rule']]
+    assert [v['start'] for v in violations] == sorted(v['start'] for v in violations)
+    assert _found(DRAFT) == [
+        ('editorial_note', 'Note: I removed the filler.'),
+        ('banned_word', 'delve into'),
+        ('banned_word', 'robust'),
+        ('em_dash_budget', '—'),
+        ('clarifying_phrase', 'To clarify'),
+        ('parallel_structure', 'not just'),
+        ('three_item_list', '- 🚀 Launch\n- Ship\n- Celebrate'),
+        ('emoji_bullet', '🚀'),
+        ('editorial_note', 'note that this is short.'),
+    ]
+    assert set(lint.summary(violations)) == set(lint.RULES)
+
+
+def test_clean_text_and_postprocessed_output_pass():
+    assert lint.lint('') == []
+    assert _found('Notebooks are fine. We shipped on time, as planned — twice.\n- a\n- b\n') == []
+    fixed = pp.fix_three_item_lists(pp.replace_banned_words(pp.remove_clarifying_phrases(
+        'In summary, we leverage robust tools.\n- a\n- b\n- c')))
+    assert lint.lint(fixed) == []
+
+
+def test_lint_endpoint_and_throughput():
+    client = appmod.app.test_client()
+    res = client.post('/api/lint', json={'text': DRAFT})
+    assert res.status_code == 200 and res.json['clean'] is False
+    assert res.json['counts']['banned_word'] == 2
+    assert client.post('/api/lint', json={'text': 'All good here.'}).json['clean'] is True
+
+    text = ('The team reviewed the figures and agreed on a plan. We will leverage the new tooling.\n' * 12000)
+    start = time.perf_counter()
+    violations = lint.lint(text)
+    assert len(violations) == 12000
+    # About 1 MB; several MB/s on a laptop, with headroom for slow CI machines
+    assert time.perf_counter() - start < 2.0
@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+
+import pytest
+
+import metrics
+from app import app
+
+
+@pytest.fixture
+def metrics_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, '_store_pid', None)
+    return tmp_path
+
+
+def _child_records():
+    metrics.ERRORS.inc(endpoint='test', kind='child')
+    metrics.POSTPROCESS_LATENCY.observe(0.02, aggressiveness='low')
+
+
+def test_histogram_renders_cumulative_buckets(metrics_dir):
+    metrics.POSTPROCESS_LATENCY.observe(0.003, aggressiveness='standard')
+    metrics.POSTPROCESS_LATENCY.observe(0.2, aggressiveness='standard')
+    text = metrics.render()
+    assert 'redactum_postprocess_latency_seconds_bucket{aggressiveness="standard",le="0.005"} 1' in text
+    assert 'redactum_postprocess_latency_seconds_bucket{aggressiveness="standard",le="+Inf"} 2' in text
+    assert 'redactum_postprocess_latency_seconds_count{aggressiveness="standard"} 2' in text
+
+
+def test_metrics_aggregate_across_forked_processes(metrics_dir):
+    metrics.ERRORS.inc(endpoint='test', kind='child')
+    ctx = multiprocessing.get_context('fork')
+    procs = [ctx.Process(target=_child_records) for _ in range(2)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(10)
+    assert len(list(metrics_dir.glob('values_*.db'))) == 3
+    text = metrics.render()
+    assert 'redactum_errors_total{endpoint="test",kind="child"} 3' in text
+    assert 'redactum_postprocess_latency_seconds_count{aggressiveness="low"} 2' in text
+
+
+def test_store_grows_past_initial_mapping(metrics_dir):
+    for i in range(3000):
+        metrics.ERRORS.inc(endpoint='grow', kind=f'k{i}')
+    totals = metrics.collect()
+    assert totals[('redactum_errors_total', (('endpoint', 'grow'), ('kind', 'k2999')))] == 1
+
+
+def test_metrics_endpoint_reports_refine_latency(metrics_dir, monkeypatch):
+    class FakeProvider:
+        name = 'fake'
+        model = 'm'
+
+        def generate_completion(self, prompt, temperature=0.4):
+            return 'Refined text here.'
+
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: FakeProvider())
+    client = app.test_client()
+    client.post('/api/refine', json={'text': 'Hello', 'tone': 'professional'})
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert 'redactum_provider_latency_seconds_count{provider="fake",model="m"} 1' in body
+    assert 'redactum_requests_total{endpoint="refine_text",status="200"} 1' in body
+
+
+def test_files_of_dead_processes_are_removed(metrics_dir):
+    metrics.ERRORS.inc(endpoint='test', kind='stale')
+    ctx = multiprocessing.get_context('fork')
+    child = ctx.Process(target=_child_records)
+    child.start()
+    child.join(10)
+    assert len(list(metrics_dir.glob('values_*.db'))) == 2
+    assert metrics.remove_dead_files() == 1
+    assert [p.name for p in metrics_dir.glob('values_*.db')] == [f'values_{os.getpid()}.db']
+    metrics.clear()
+    assert not metrics_dir.exists()
@@ -0,0 +1,149 @@
+import re
+import threading
+import time
+
+import pytest
+
+import app as appmod
+import microbatch
+import resilience
+from app import app
+
+
+def _submit_concurrently(batcher, texts, execute, key='k'):
+    results = [None] * len(texts)
+
+    def run(i):
+        try:
+            results[i] = batcher.submit(key, texts[i], execute)
+        except microbatch.BatchFallback as e:
+            results[i] = ('fallback', e.reason)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+def test_pack_and_split_roundtrip():
+    packed = microbatch.pack_items(['one', 'two'], 'abc')
+    assert microbatch.split_response(packed, 2, 'abc') == ['one', 'two']
+    with pytest.raises(ValueError):
+        microbatch.split_response('<<<ITEM 1 abc>>>\nonly one', 2, 'abc')
+    with pytest.raises(ValueError):
+        microbatch.split_response('<<<ITEM 2 abc>>>\nb\n<<<ITEM 1 abc>>>\na', 2, 'abc')
+
+
+def test_concurrent_submissions_share_one_call():
+    calls = []
+    batcher = microbatch.MicroBatcher(window_ms=200, max_items=4)
+    texts = [f't{i}' for i in range(4)]
+
+    def execute(items):
+        calls.append(list(items))
+        return [s.upper() for s in items]
+
+    results = _submit_concurrently(batcher, texts, execute)
+    assert len(calls) == 1
+    assert results == ['T0', 'T1', 'T2', 'T3']
+    assert batcher.stats()['batched_items'] == 4
+
+
+def test_failed_split_falls_back_for_every_request():
+    batcher = microbatch.MicroBatcher(window_ms=200, max_items=3)
+
+    def execute(items):
+        raise ValueError('bad split')
+
+    results = _submit_concurrently(batcher, ['a', 'b', 'c'], execute)
+    assert results == [('fallback', 'failed')] * 3
+
+
+def test_lone_request_is_not_batched():
+    batcher = microbatch.MicroBatcher(window_ms=1)
+    with pytest.raises(microbatch.BatchFallback) as exc:
+        batcher.submit('k', 'solo', lambda items: items)
+    assert exc.value.reason == 'single'
+
+
+def test_refine_requests_are_packed_into_one_provider_call(monkeypatch):
+    calls = []
+
+    class PackingProvider:
+        def generate_completion(self, prompt, temperature=0.4):
+            calls.append(prompt)
+            nonce = re.search(r'<<<ITEM 1 (\w+)>>>', prompt).group(1)
+            items = re.findall(rf'<<<ITEM (\d+) {nonce}>>>\n(.*)', prompt)
+            return '\n'.join(f'<<<ITEM {n} {nonce}>>>\nRefined {t}' for n, t in items) + f'\n<<<END {nonce}>>>'
+
+    settings = {'activeProvider': 'groq', 'providers': {'groq': {'apiKey': 'k'}},
+                'microBatching': {'enabled': True, 'windowMs': 300, 'maxItems': 3}}
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: PackingProvider())
+    monkeypatch.setattr('app.load_settings', lambda: settings)
+    monkeypatch.setattr(appmod, 'MICRO_BATCHER', microbatch.MicroBatcher())
+
+    outputs = [None] * 3
+
+    def post(i):
+        resp = app.test_client().post('/api/refine', json={'text': f'draft number {i}.', 'tone': 'casual'})
+        outputs[i] = resp.get_json()['refined']
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1
+    for i, out in enumerate(outputs):
+        assert f'number {i}' in out
+
+
+def test_provider_error_reaches_every_request_without_individual_calls():
+    batcher = microbatch.MicroBatcher(window_ms=200, max_items=3)
+    calls = []
+    outage = resilience.CircuitOpen('stub', 30)
+
+    def execute(items):
+        calls.append(items)
+        raise outage
+
+    errors = []
+
+    def run(text):
+        try:
+            batcher.submit('k', text, execute)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in 'abc']
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1 and len(errors) == 3
+    # One exception object per thread, so no two threads share its traceback
+    assert len({id(e) for e in errors}) == 3
+    assert all(type(e) is type(outage) and e.args == outage.args and e.status == outage.status for e in errors)
+    assert batcher.stats()['error_items'] == 3
+
+
+def test_followers_stop_waiting_at_their_own_deadline():
+    batcher = microbatch.MicroBatcher(window_ms=500, max_items=2)
+    release = threading.Event()
+
+    def execute(items):
+        release.wait(5)
+        return [s.upper() for s in items]
+
+    leader = threading.Thread(target=batcher.submit, args=('k', 'slow', execute))
+    leader.start()
+    try:
+        start = time.monotonic()
+        with pytest.raises(resilience.DeadlineExceeded):
+            batcher.submit('k', 'hurried', execute, deadline=resilience.Deadline(0.1))
+        assert time.monotonic() - start < 1.0
+    finally:
+        release.set()
+        leader.join(5)
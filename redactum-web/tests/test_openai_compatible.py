@@ -0,0 +1,57 @@
+import pytest
+
+import app as appmod
+import httpclient
+import resilience
+from tools import stub_provider
+
+
+@pytest.fixture
+def stub():
+    config = stub_provider.StubConfig(latency='fixed:0', cached_tokens=4, seed=1)
+    server, base_url = stub_provider.start_in_thread(config)
+    yield config, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def _settings(name, **config):
+    return {'activeProvider': name, 'providers': {name: dict({'apiKey': '', 'model': 'stub-model'}, **config)}}
+
+
+def test_every_listed_provider_is_mapped():
+    for name in ('nvidia', 'grok', 'together', 'openrouter'):
+        provider = appmod.get_ai_provider(name, _settings(name, apiKey='k'))
+        assert isinstance(provider, appmod.OpenAICompatibleProvider)
+        assert provider.base_url == appmod.OPENAI_COMPATIBLE_BASE_URLS[name]
+        assert provider.scheduler is not None and provider.breaker is not None
+    # ollama runs locally without a key; custom needs an endpoint
+    assert appmod.get_ai_provider('ollama', _settings('ollama')) is not None
+    assert appmod.get_ai_provider('custom', _settings('custom', apiKey='k')) is None
+    assert appmod.get_ai_provider('nvidia', _settings('nvidia')) is None
+
+
+def test_custom_provider_calls_stub_and_reuses_connection(stub, monkeypatch):
+    config, base_url = stub
+    provider = appmod.get_ai_provider('custom', _settings('custom', baseUrl=base_url + '/v1'))
+    pool = httpclient.ConnectionPool()
+    monkeypatch.setattr(httpclient, 'get_client', lambda: pool)
+    prompt = appmod.create_refinement_prompt('Hello there, this is a test.', 'professional', 'Keep it professional.')
+    first = provider.generate_completion(prompt)
+    second = provider.generate_completion(prompt)
+    assert first and second
+    assert config.requests == 2
+    assert pool.stats()['created'] == 1 and pool.stats()['reused'] == 1
+    assert provider.usage_log[0]['cached_tokens'] == 4
+
+
+def test_error_status_maps_to_retryable_provider_error(stub):
+    config, base_url = stub
+    config.error_rate = 1.0
+    config.error_statuses = (429,)
+    provider = appmod.OpenAICompatibleProvider('ollama', '', 'stub-model', base_url=base_url + '/v1')
+    with pytest.raises(resilience.ProviderError) as info:
+        provider.generate_completion('Hi')
+    assert info.value.status == 429
+    assert info.value.retryable
+    assert info.value.retry_after == 1.0
@@ -0,0 +1,103 @@
+import random
+
+import dedupe
+import paragraph_cache
+import postprocess
+from app import app
+
+DOC = ("We leverage robust tooling for the release. It is ready to ship.\n\n"
+       "The rollout is gradual — and monitored — and reversible.\n\n"
+       "Support will track tickets daily. We do not expect surprises.")
+
+
+def test_only_edited_paragraphs_are_reprocessed(monkeypatch):
+    cache = paragraph_cache.ParagraphCache()
+    first = paragraph_cache.postprocess_incremental(DOC, 'standard', cache)
+    assert first['report']['paragraphs_reprocessed'] == 3
+    assert 'leverage' not in first['text']
+
+    calls = []
+    real = postprocess.postprocess_refined_text_full
+    monkeypatch.setattr(postprocess, 'postprocess_refined_text_full',
+                        lambda text, **kw: calls.append(text) or real(text, **kw))
+    edited = DOC.replace('Support will track', 'Support tracks')
+    second = paragraph_cache.postprocess_incremental(edited, 'standard', cache)
+    assert second['report']['paragraphs_reprocessed'] == 1
+    assert len(calls) == 1 and calls[0].startswith('Support tracks')
+    assert second['text'].split('\n\n')[0] == first['text'].split('\n\n')[0]
+
+
+def test_document_budgets_are_reconciled():
+    doc = '\n\n'.join(f"Paragraph {i} is short — really short." for i in range(4))
+    out = paragraph_cache.postprocess_incremental(doc, 'low', paragraph_cache.ParagraphCache())
+    assert out['text'].count('—') <= 1
+
+
+def test_cross_paragraph_dedupe_only_hashes_edited_paragraphs(monkeypatch):
+    rng = random.Random(5)
+    words = 'team plan release budget review cache server client draft launch quarter report'.split()
+    paragraphs = [' '.join(' '.join(rng.choice(words) for _ in range(10)).capitalize() + '.' for _ in range(5))
+                  for _ in range(70)]
+    cache = paragraph_cache.ParagraphCache()
+    paragraph_cache.postprocess_incremental('\n\n'.join(paragraphs), 'standard', cache)
+
+    hashed = []
+    real = dedupe.shingles
+    monkeypatch.setattr(dedupe, 'shingles', lambda sentence: hashed.append(sentence) or real(sentence))
+    # The edit repeats a sentence from the first paragraph, so the cross-paragraph step has work to do
+    repeated = paragraphs[0].split('. ')[1] + '.'
+    paragraphs[40] = 'The new paragraph covers the rollout plan for next week. ' + repeated
+    out = paragraph_cache.postprocess_incremental('\n\n'.join(paragraphs), 'standard', cache)
+    assert 0 < len(hashed) <= 2 * len(paragraphs[40].split('. '))
+    assert out['text'].count(repeated) == 1
+    assert out['report']['near_duplicate_sentences_removed'] >= 1
+
+
+def test_cached_sentence_features_give_the_same_dedupe():
+    rng = random.Random(9)
+    words = 'plan ready team ship next week after review budget launch'.split()
+    removed = 0
+    for _ in range(20):
+        base = [[rng.choice(words) for _ in range(8)] for _ in range(12)]
+        sentences = []
+        for _ in range(40):
+            sentence = list(rng.choice(base))
+            # Some copies get a filler word, which still counts as a repeat
+            if rng.random() < 0.5:
+                sentence.insert(rng.randrange(len(sentence)), rng.choice(('just', 'really', 'also')))
+            sentences.append(' '.join(sentence).capitalize() + '.')
+        text = '\n\n'.join(' '.join(sentences[i:i + 4]) for i in range(0, 40, 4))
+        expected = dedupe.remove_near_duplicate_sentences(text)
+        assert dedupe.remove_near_duplicate_sentences(text, features=dedupe.sentence_features(text)) == expected
+        removed += expected[1]
+    assert removed
+
+
+def test_lru_evicts_oldest():
+    cache = paragraph_cache.ParagraphCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, (key, {}))
+    assert cache.get('a') is None and cache.get('c') == ('c', {})
+
+
+def test_postprocess_endpoint(monkeypatch):
+    monkeypatch.setattr('app.PARAGRAPH_CACHE', paragraph_cache.ParagraphCache())
+    client = app.test_client()
+    resp = client.post('/api/postprocess', json={'text': DOC, 'humanizeLevel': 'low', 'debug': True})
+    data = resp.get_json()
+    assert resp.status_code == 200 and data['reprocessed'] == 3
+    assert 'banned_word_replacements' in data['postprocessReport']
+    again = client.post('/api/postprocess', json={'text': DOC, 'humanizeLevel': 'low', 'debug': True}).get_json()
+    assert again['reprocessed'] == 0 and again['text'] == data['text']
+    assert again['cache']['hits'] == 3
+    assert client.post('/api/postprocess', json={'text': ' '}).status_code == 400
+
+
+def test_at_most_one_human_marker_per_document(monkeypatch):
+    # soften_transitions opens paragraphs with similar phrases on purpose; keep it out of the count
+    monkeypatch.setattr(postprocess, 'soften_transitions', lambda text, rng: text)
+    markers = ("For many people,", "In practice,", "Often,", "For example,", "That said,")
+    doc = '\n\n'.join(f"Section {i} covers the rollout plan and the support schedule for team {i}."
+                       for i in range(60))
+    out = paragraph_cache.postprocess_incremental(doc, 'aggressive', paragraph_cache.ParagraphCache())
+    assert sum(p.startswith(markers) for p in out['text'].split('\n\n')) <= 1
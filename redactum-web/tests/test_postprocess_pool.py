@@ -0,0 +1,73 @@
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import postprocess
+import postprocess_pool
+
+LONG = ("We leverage robust tooling for the release, and it is ready. " * 80).strip()
+
+
+def _reset(monkeypatch, max_queue=4):
+    monkeypatch.setattr(postprocess_pool, 'MAX_QUEUE', max_queue)
+    monkeypatch.setattr(postprocess_pool, '_slots', threading.BoundedSemaphore(max_queue))
+    monkeypatch.setattr(postprocess_pool, '_stats', dict(postprocess_pool._stats, inline=0, pooled=0, overflow=0,
+                                                         broken=0, in_flight=0, wait_total=0.0, wait_max=0.0))
+
+
+def test_short_texts_stay_inline_and_long_texts_use_the_pool(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _reset(monkeypatch)
+    assert postprocess_pool.postprocess('It is short.') == postprocess.postprocess_refined_text_full('It is short.')
+    pooled = postprocess_pool.postprocess(LONG, aggressiveness='aggressive')
+    assert pooled == postprocess.postprocess_refined_text_full(LONG, aggressiveness='aggressive')
+    stats = postprocess_pool.stats()
+    assert stats['inline'] == 1 and stats['pooled'] == 1 and stats['overflow'] == 0
+    assert stats['inFlight'] == 0 and stats['maxQueueWaitMs'] >= 0
+    postprocess_pool.shutdown()
+
+
+def test_saturated_pool_overflows_inline(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _reset(monkeypatch, max_queue=1)
+    postprocess_pool._slots.acquire()  # another request holds the only slot
+    try:
+        out = postprocess_pool.postprocess(LONG, debug=True)
+    finally:
+        postprocess_pool._slots.release()
+    assert 'report' in out
+    assert postprocess_pool.stats()['overflow'] == 1
+
+
+def test_broken_pool_is_counted_apart_and_slots_never_leak(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _reset(monkeypatch, max_queue=1)
+
+    class BrokenPool:
+        def submit(self, *args):
+            raise BrokenProcessPool('worker died')
+
+        def shutdown(self, wait=True):
+            pass
+
+    monkeypatch.setattr(postprocess_pool, 'get_pool', BrokenPool)
+    assert postprocess_pool.postprocess(LONG) == postprocess.postprocess_refined_text_full(LONG)
+    stats = postprocess_pool.stats()
+    assert stats['broken'] == 1 and stats['overflow'] == 0
+
+    def unavailable():
+        raise OSError('cannot start workers')
+
+    monkeypatch.setattr(postprocess_pool, 'get_pool', unavailable)
+    with pytest.raises(OSError):
+        postprocess_pool.postprocess(LONG)
+    assert postprocess_pool.stats()['inFlight'] == 0
+    assert postprocess_pool._slots.acquire(blocking=False)
+    postprocess_pool._slots.release()
+
+
+def test_pool_is_not_forked_from_the_threaded_worker():
+    assert postprocess_pool._mp_context().get_start_method() in ('forkserver', 'spawn')
+    assert 1 <= postprocess_pool.POOL_WORKERS <= max(1, os.cpu_count() // postprocess_pool.SERVER_WORKERS)
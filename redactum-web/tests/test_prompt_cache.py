@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import app as appmod
+from app import app
+
+
+class StubChatClient:
+    """Local stand-in for an OpenAI-compatible SDK client that reports cached tokens."""
+
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        # The provider reports the static prefix as cached from the second call on
+        cached = 1024 if len(self.calls) > 1 else 0
+        return {
+            'choices': [{'message': {'content': 'Refined text.'}}],
+            'usage': {'prompt_tokens': 1500, 'completion_tokens': 20,
+                      'prompt_tokens_details': {'cached_tokens': cached}},
+        }
+
+
+class StubAnthropicClient:
+    def __init__(self):
+        self.calls = []
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text='Refined text.')],
+            usage=SimpleNamespace(input_tokens=100, output_tokens=20,
+                                  cache_read_input_tokens=900, cache_creation_input_tokens=0),
+        )
+
+
+def test_static_prefix_is_byte_identical_and_text_last():
+    tone = appmod.TONES[1]['instruction']
+    p1 = appmod.create_refinement_prompt('First draft.', 'professional', tone)
+    p2 = appmod.create_refinement_prompt('Another draft.', 'professional', tone, 'Keep it short')
+    assert p1.prefix == p2.prefix
+    assert str(p1).startswith(p1.prefix)
+    assert 'First draft.' not in p1.prefix
+    assert p1.body.rstrip().endswith('REFINED TEXT:')
+    assert p2.body.index('CUSTOM INSTRUCTIONS') < p2.body.index('Another draft.')
+
+
+def test_openai_adapter_sends_stable_system_prefix_and_records_cached_tokens(monkeypatch):
+    monkeypatch.setattr(appmod, 'PROMPT_CACHE_STATS', {})
+    stub = StubChatClient()
+    provider = appmod.OpenAIProvider('key', 'gpt-4o')
+    provider._client = lambda: stub
+    tone = appmod.TONES[0]['instruction']
+    for text in ('One.', 'Two.'):
+        provider.generate_completion(appmod.create_refinement_prompt(text, 'formal', tone))
+
+    systems = [c['messages'][0]['content'] for c in stub.calls]
+    assert systems[0] == systems[1]
+    assert stub.calls[1]['messages'][-1]['content'].find('Two.') != -1
+    assert [u['cached_tokens'] for u in provider.usage_log] == [0, 1024]
+    stats = appmod.prompt_cache_snapshot()['openai']
+    assert stats['cached_tokens'] == 1024
+    assert 0 < stats['hit_rate'] < 1
+
+
+def test_anthropic_adapter_marks_system_prefix_cacheable(monkeypatch):
+    monkeypatch.setattr(appmod, 'PROMPT_CACHE_STATS', {})
+    stub = StubAnthropicClient()
+    provider = appmod.AnthropicProvider('key', 'claude')
+    provider._client = lambda: stub
+    provider.generate_completion(appmod.create_refinement_prompt('Draft.', 'formal', 'Be formal.'))
+
+    call = stub.calls[0]
+    assert call['system'][0]['cache_control'] == {'type': 'ephemeral'}
+    assert all(m['role'] != 'system' for m in call['messages'])
+    assert provider.usage_log[0] == {'prompt_tokens': 1000, 'completion_tokens': 20, 'cached_tokens': 900}
+
+    client = app.test_client()
+    assert client.get('/api/cache-stats').get_json()['anthropic']['cached_tokens'] == 900
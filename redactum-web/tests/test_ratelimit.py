@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+import ratelimit
+from app import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_per_minute():
+    clock = FakeClock()
+    bucket = ratelimit.TokenBucket(60, clock)
+    assert bucket.wait_time(60) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now += 30
+    assert bucket.wait_time(30) == 0
+
+
+def test_scheduler_rejects_when_queue_full():
+    sched = ratelimit.ProviderScheduler({'maxInFlight': 1, 'queueSize': 0})
+    sched.acquire()
+    with pytest.raises(ratelimit.RateLimited) as exc:
+        sched.acquire()
+    assert int(exc.value.retry_after_header) >= 1
+    assert sched.stats()['rejected'] == 1
+
+
+def test_scheduler_queues_until_slot_frees():
+    sched = ratelimit.ProviderScheduler({'maxInFlight': 1, 'queueSize': 4, 'queueTimeout': 5})
+    sched.acquire()
+    admitted = threading.Event()
+
+    def waiter():
+        with sched.slot():
+            admitted.set()
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    time.sleep(0.05)
+    assert sched.stats()['queue_depth'] == 1
+    assert not admitted.is_set()
+    sched.release()
+    t.join(2)
+    assert admitted.is_set()
+    stats = sched.stats()
+    assert stats['waited'] == 1 and stats['avg_wait_ms'] > 0
+
+
+def test_scheduler_times_out_on_rpm_budget():
+    sched = ratelimit.ProviderScheduler({'rpm': 1, 'queueTimeout': 0.05})
+    sched.acquire()
+    sched.release()
+    with pytest.raises(ratelimit.RateLimited):
+        sched.acquire()
+
+
+def test_refine_returns_429_with_retry_after(monkeypatch):
+    class FakeProvider:
+        scheduler = ratelimit.ProviderScheduler({'maxInFlight': 0, 'queueSize': 0})
+        max_tokens = 2000
+
+        def generate_completion(self, prompt, temperature=0.4):
+            return 'never called'
+
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: FakeProvider())
+    resp = app.test_client().post('/api/refine', json={'text': 'Hello', 'tone': 'professional'})
+    assert resp.status_code == 429
+    assert int(resp.headers['Retry-After']) >= 1
@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+
+import postprocess_pool
+from app import app
+
+
+class SlowFakeProvider:
+    """Returns the input back; the first item is slowest so it finishes last."""
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def generate_completion(self, prompt, temperature=0.4):
+        with SlowFakeProvider.lock:
+            SlowFakeProvider.active += 1
+            SlowFakeProvider.peak = max(SlowFakeProvider.peak, SlowFakeProvider.active)
+        try:
+            text = prompt.split('ORIGINAL TEXT:\n', 1)[1].split('\n\nREFINED TEXT:', 1)[0]
+            time.sleep(0.15 if text == 'item 0' else 0.02)
+            return f"Refined {text}."
+        finally:
+            with SlowFakeProvider.lock:
+                SlowFakeProvider.active -= 1
+
+
+def _patch(monkeypatch):
+    SlowFakeProvider.active = SlowFakeProvider.peak = 0
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: SlowFakeProvider())
+
+
+def test_batch_returns_results_in_input_order(monkeypatch):
+    _patch(monkeypatch)
+    items = [{'text': f'item {i}', 'tone': 'professional', 'humanizeLevel': 'low'} for i in range(6)]
+    items.append({'text': '', 'tone': 'professional'})
+    resp = app.test_client().post('/api/refine/batch', json={'items': items, 'concurrency': 2})
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [r['index'] for r in data['results']] == list(range(7))
+    assert data['results'][3]['refined'] == 'Refined item 3.'
+    assert data['results'][6]['status'] == 400 and 'error' in data['results'][6]
+    assert data['succeeded'] == 6 and data['failed'] == 1
+    assert SlowFakeProvider.peak <= 2
+    postprocess_pool.shutdown()
+
+
+def test_batch_streams_ndjson_as_items_finish(monkeypatch):
+    _patch(monkeypatch)
+    items = [{'text': f'item {i}', 'tone': 'professional'} for i in range(4)]
+    resp = app.test_client().post('/api/refine/batch', json={'items': items, 'concurrency': 4, 'stream': True})
+    assert resp.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert sorted(line['index'] for line in lines) == [0, 1, 2, 3]
+    # The slow first item completes last
+    assert lines[-1]['index'] == 0
+    postprocess_pool.shutdown()
+
+
+def test_batch_validates_items():
+    client = app.test_client()
+    assert client.post('/api/refine/batch', json={'items': []}).status_code == 400
+    assert client.post('/api/refine/batch', json={}).status_code == 400
@@ -0,0 +1,140 @@
+import pytest
+
+import app as appmod
+import ratelimit
+import resilience
+from app import app
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FaultInjectingProvider(appmod.AIProvider):
+    """Local stub provider that fails according to a scripted list of faults.
+
+    Each entry is an HTTP status to fail with, 'timeout', or None for success.
+    """
+    name = 'stub'
+
+    def __init__(self, faults, output='Refined by stub.'):
+        super().__init__('key', 'stub-model')
+        self.faults = list(faults)
+        self.output = output
+        self.calls = 0
+
+    def generate_completion(self, prompt, temperature=0.4):
+        self.calls += 1
+        fault = self.faults.pop(0) if self.faults else None
+        try:
+            if fault == 'timeout':
+                raise TimeoutError('read timed out')
+            if fault is not None:
+                raise UpstreamError(fault)
+            return self.output
+        except Exception as e:
+            raise resilience.wrap_provider_error('Stub', e) from e
+
+
+def _wire(provider, threshold=3, attempts=3):
+    provider.retry_policy = resilience.RetryPolicy(max_attempts=attempts, base_delay=0.001, max_delay=0.002, deadline=5)
+    provider.breaker = resilience.CircuitBreaker(provider.name, failure_threshold=threshold, reset_timeout=60)
+    return provider
+
+
+def test_transient_errors_are_retried():
+    provider = _wire(FaultInjectingProvider([503, 'timeout']))
+    assert appmod.call_provider(provider, 'prompt') == 'Refined by stub.'
+    assert provider.calls == 3
+    assert provider.breaker.state == 'closed'
+
+
+def test_non_retryable_error_fails_immediately():
+    provider = _wire(FaultInjectingProvider([401]))
+    with pytest.raises(resilience.ProviderError) as exc:
+        appmod.call_provider(provider, 'prompt')
+    assert exc.value.status == 401
+    assert provider.calls == 1
+
+
+def test_backoff_respects_total_deadline():
+    slept = []
+    policy = resilience.RetryPolicy(max_attempts=10, base_delay=1, max_delay=1, deadline=0.5, sleep=slept.append)
+    policy.backoff = lambda attempt, error=None: 1.0
+
+    def always_fail():
+        raise resilience.ProviderError('boom', status=503, retryable=True)
+
+    with pytest.raises(resilience.RetriesExhausted):
+        policy.call(always_fail)
+    assert slept == []
+
+
+def test_circuit_opens_and_fails_fast():
+    provider = _wire(FaultInjectingProvider([500] * 10), threshold=2, attempts=2)
+    with pytest.raises(resilience.RetriesExhausted):
+        appmod.call_provider(provider, 'prompt')
+    assert provider.breaker.state == 'open'
+    calls = provider.calls
+    with pytest.raises(resilience.CircuitOpen):
+        appmod.call_provider(provider, 'prompt')
+    assert provider.calls == calls
+
+
+def test_refine_falls_back_to_secondary_provider(monkeypatch):
+    primary = _wire(FaultInjectingProvider([503] * 10), threshold=1, attempts=2)
+    secondary = _wire(FaultInjectingProvider([], output='Refined by fallback.'))
+    secondary.name = 'secondary'
+
+    def fake_get(name, settings):
+        return secondary if name == 'secondary' else primary
+
+    monkeypatch.setattr('app.get_ai_provider', fake_get)
+    monkeypatch.setattr('app.load_settings', lambda: {'activeProvider': 'groq', 'fallbackProvider': 'secondary'})
+    client = app.test_client()
+    resp = client.post('/api/refine', json={'text': 'Hello', 'tone': 'professional'})
+    assert resp.status_code == 200
+    assert 'fallback' in resp.get_json()['refined']
+
+
+def test_refine_maps_outage_to_503(monkeypatch):
+    primary = _wire(FaultInjectingProvider([503] * 10), attempts=2)
+    monkeypatch.setattr('app.get_ai_provider', lambda name, s: primary)
+    resp = app.test_client().post('/api/refine', json={'text': 'Hello', 'tone': 'professional'})
+    assert resp.status_code == 503
+
+
+def test_half_open_trial_is_settled_by_any_outcome(monkeypatch):
+    clock = [0.0]
+    provider = _wire(FaultInjectingProvider([503, 503, 400]), threshold=2, attempts=2)
+    provider.breaker.clock = lambda: clock[0]
+    with pytest.raises(resilience.RetriesExhausted):
+        appmod.call_provider(provider, 'prompt')
+    assert provider.breaker.state == 'open'
+
+    # A non-retryable answer to the trial shows the provider is reachable again
+    clock[0] += 61
+    with pytest.raises(resilience.ProviderError) as exc:
+        appmod.call_provider(provider, 'prompt')
+    assert exc.value.status == 400 and provider.breaker.state == 'closed'
+    assert appmod.call_provider(provider, 'prompt') == 'Refined by stub.'
+
+    # A trial that never reaches the provider leaves the circuit half-open for the next call
+    provider.faults = [503, 503]
+    with pytest.raises(resilience.RetriesExhausted):
+        appmod.call_provider(provider, 'prompt')
+    clock[0] += 61
+    scheduled = appmod._scheduled_completion
+
+    def queue_timeout(*args):
+        raise ratelimit.RateLimited('queue full', 1)
+
+    monkeypatch.setattr(appmod, '_scheduled_completion', queue_timeout)
+    with pytest.raises(ratelimit.RateLimited):
+        appmod.call_provider(provider, 'prompt')
+    assert provider.breaker.state == 'half_open'
+    monkeypatch.setattr(appmod, '_scheduled_completion', scheduled)
+    assert appmod.call_provider(provider, 'prompt') == 'Refined by stub.'
+    assert provider.breaker.state == 'closed'
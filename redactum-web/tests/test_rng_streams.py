@@ -0,0 +1,51 @@
+import random
+
+import postprocess
+
+
+def test_substreams_are_stable_and_independent():
+    a = postprocess.RngStreams('some text', 'standard')
+    b = postprocess.RngStreams('some text', 'standard')
+    assert a.rng('vary_sentence_rhythm', 0).random() == b.rng('vary_sentence_rhythm', 0).random()
+    # Drawing from one stream does not shift another
+    first = a.rng('apply_contractions', 1).random()
+    for _ in range(5):
+        a.rng('vary_sentence_rhythm', 1).random()
+    assert a.rng('apply_contractions', 1).random() == first
+    assert a.rng('apply_contractions', 2).random() != first
+    assert postprocess.RngStreams('some text', 'aggressive').rng('apply_contractions', 1).random() != first
+
+
+def test_per_paragraph_choices_stay_local():
+    para = "It is likely that we do not need further changes. I am sure it is fine."
+    streams = postprocess.RngStreams('doc', 'aggressive')
+    one = postprocess.apply_per_paragraph(para + "\n\nSecond paragraph.", postprocess.apply_contractions, streams)
+    two = postprocess.apply_per_paragraph(para + "\n\nA different second paragraph.", postprocess.apply_contractions, streams)
+    assert one.split('\n\n')[0] == two.split('\n\n')[0]
+
+
+def test_aggressive_pipeline_still_applies_contractions():
+    text = "It is clear that we do not have time. I am certain that it is late. We are behind and you are aware."
+    out = postprocess.postprocess_refined_text_full(text, debug=True, aggressiveness='aggressive')
+    assert out['report'].get('contractions_applied', 0) >= 1
+    assert out == postprocess.postprocess_refined_text_full(text, debug=True, aggressiveness='aggressive')
+
+
+def test_inserted_phrases_are_not_repeated_across_paragraphs():
+    rng = random.Random(0)
+    words = 'the team plan review release budget customer support office schedule project goal quarter'.split()
+
+    def sentence(n):
+        return ' '.join(rng.choice(words) for _ in range(n)).capitalize() + '.'
+
+    inserted = 0
+    for level in ('standard', 'standard', 'aggressive'):
+        doc = '\n\n'.join(f'{sentence(12)} {sentence(10)}' for _ in range(30))
+        out = postprocess.postprocess_refined_text_full(doc, aggressiveness=level, telemetry=False)
+        counts = [out.count(phrase) for phrase in postprocess.PERSONALIZING_PHRASES]
+        assert max(counts) <= 1
+        inserted += sum(counts)
+    assert inserted > 0
+    assert postprocess.drop_repeated_phrases('A. Often, this appears in how people choose tasks or teams. B. '
+                                             'Often, this appears in how people choose tasks or teams.') == \
+        'A. Often, this appears in how people choose tasks or teams. B.'
@@ -0,0 +1,118 @@
+import pytest
+
+import app as appmod
+import speculation
+from tools import stub_provider
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    config = stub_provider.StubConfig(latency='fixed:0', seed=3)
+    server, base_url = stub_provider.start_in_thread(config)
+    monkeypatch.setattr(appmod, 'SPECULATOR', speculation.Speculator(workers=2))
+    yield config, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def _settings(base_url, **spec):
+    return {
+        'activeProvider': 'custom',
+        'providers': {'custom': {'apiKey': '', 'model': 'stub-model', 'baseUrl': base_url + '/v1'}},
+        'speculation': dict({'enabled': True, 'tones': 1, 'choices': 1, 'tokensPerMinute': 100000}, **spec),
+    }
+
+
+TEXT = 'We should maybe think about moving the launch to next week, if that works for everyone.'
+
+
+def test_cache_serves_each_result_once_and_counts_expired_as_wasted():
+    clock = FakeClock()
+    cache = speculation.SpeculativeCache(ttl=10, clock=clock)
+    cache.put('s1', 'k', 'a')
+    cache.put('s1', 'k', 'b')
+    assert cache.take('s2', 'k') is None
+    assert cache.take('s1', 'k') == 'a'
+    clock.now = 11
+    assert cache.take('s1', 'k') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stored'], stats['wasted']) == (1, 2, 2, 1)
+    assert stats['hitRate'] == pytest.approx(1 / 3, abs=1e-4)
+
+
+def test_budget_and_tone_ranking():
+    clock = FakeClock()
+    budget = speculation.Budget(600, clock=clock)
+    assert budget.try_spend(500) and not budget.try_spend(500)
+    clock.now = 60
+    assert budget.try_spend(500)
+    assert budget.stats() == {'tokensPerMinute': 600, 'spentTokens': 1000, 'denied': 1}
+
+    history = speculation.ToneHistory()
+    tones = ['casual', 'professional', 'formal', 'friendly']
+    assert history.likely_next('professional', tones, 2) == ['formal', 'casual']
+    history.record('s', 'professional')
+    history.record('s', 'friendly')
+    assert history.likely_next('professional', tones, 1) == ['friendly']
+
+
+def test_retry_and_tone_switch_are_prefetched_in_background(stub):
+    config, base_url = stub
+    settings = _settings(base_url)
+    data = {'text': TEXT, 'tone': 'professional', 'sessionId': 'tab-1', 'debug': True}
+
+    body, status, _ = appmod.run_refinement(dict(data), settings)
+    assert status == 200 and 'speculative' not in body['postprocessReport']
+    assert appmod.SPECULATOR.wait_idle()
+    # The request itself, a retry of it and the neighbouring tone
+    assert config.requests == 3
+
+    for tone in ('professional', 'neutral'):
+        body, status, _ = appmod.run_refinement(dict(data, tone=tone), settings)
+        assert status == 200 and body['postprocessReport']['speculative'] is True
+        assert appmod.SPECULATOR.wait_idle()
+    assert appmod.SPECULATOR.stats()['cache']['hits'] == 2
+
+    # Other sessions and opted-out requests never see another session's results
+    requests = config.requests
+    appmod.run_refinement(dict(data, sessionId='tab-2', speculate=False), settings)
+    assert config.requests == requests + 1
+
+
+def test_extra_choices_become_prefetched_retries(stub):
+    config, base_url = stub
+    settings = _settings(base_url, choices=3, tones=0)
+    data = {'text': TEXT, 'tone': 'casual', 'sessionId': 'tab-1'}
+
+    appmod.run_refinement(dict(data), settings)
+    assert appmod.SPECULATOR.wait_idle()
+    assert config.requests == 1
+    assert appmod.SPECULATOR.stats()['cache']['entries'] == 2
+
+    spent = appmod.SPECULATOR.stats()['budget']['spentTokens']
+    assert spent > 0
+    body, status, _ = appmod.run_refinement(dict(data), settings)
+    assert appmod.SPECULATOR.wait_idle()
+    assert status == 200 and body['refined']
+    assert config.requests == 1
+    # A cache hit asks for no extra choices, so it charges nothing to the budget
+    assert appmod.SPECULATOR.stats()['budget']['spentTokens'] == spent
+
+
+def test_budget_caps_speculative_calls(stub):
+    config, base_url = stub
+    settings = _settings(base_url, tokensPerMinute=1, choices=1)
+    appmod.run_refinement({'text': TEXT, 'sessionId': 'tab-1'}, settings)
+    assert appmod.SPECULATOR.wait_idle()
+    # A full bucket admits one oversized spend (the retry); the tone switch is denied
+    assert config.requests == 2
+    assert appmod.SPECULATOR.stats()['budget']['denied'] >= 1
+    assert 'speculation' in appmod.app.test_client().get('/api/scheduler').json
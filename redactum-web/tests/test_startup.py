@@ -0,0 +1,37 @@
+import gc
+
+import app as appmod
+import postprocess_pool
+import startup
+from app import app
+
+
+def test_readiness_reports_warm_worker(monkeypatch, tmp_path):
+    monkeypatch.setattr(startup, '_state', dict(startup._state, ready=False, warmup={}))
+    monkeypatch.setattr('app.JOBS_DB', str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setattr('app._job_queue', None, raising=False)
+    client = app.test_client()
+    assert client.get('/readyz').status_code == 503
+
+    startup.warm_app(appmod)
+    gc.unfreeze()
+    startup.warm_worker(appmod)
+    appmod.get_job_queue().stop()
+    postprocess_pool.shutdown()
+
+    resp = client.get('/readyz')
+    data = resp.get_json()
+    assert resp.status_code == 200
+    assert set(data['warmup']) >= {'sdks', 'postprocess', 'prompts', 'templates', 'clients', 'jobs', 'postprocess_pool'}
+    assert data['memory']['rss'] > 0
+    assert data['workerStartSeconds'] >= 0
+
+
+def test_shared_sdk_client_is_reused_per_key():
+    provider = appmod.OpenAIProvider('key-a', 'gpt-4o')
+    made = []
+    first = appmod.shared_sdk_client(provider, lambda: made.append(1) or object())
+    assert appmod.shared_sdk_client(provider, lambda: made.append(1) or object()) is first
+    other = appmod.OpenAIProvider('key-b', 'gpt-4o')
+    assert appmod.shared_sdk_client(other, lambda: object()) is not first
+    assert len(made) == 1
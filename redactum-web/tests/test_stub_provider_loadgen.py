@@ -0,0 +1,73 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tools import loadgen, stub_provider
+
+
+@pytest.fixture
+def stub():
+    config = stub_provider.StubConfig(latency='fixed:0', cached_tokens=8, seed=1)
+    server, base_url = stub_provider.start_in_thread(config)
+    yield config, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return resp.status, resp.read().decode()
+
+
+CHAT = {'model': 'm', 'messages': [{'role': 'system', 'content': 'sys ' * 40}, {'role': 'user', 'content': 'Hello there'}]}
+
+
+def test_openai_and_groq_endpoints_report_usage(stub):
+    _, base_url = stub
+    for path in ('/v1/chat/completions', '/openai/v1/chat/completions'):
+        status, body = _post(base_url + path, CHAT)
+        data = json.loads(body)
+        assert status == 200
+        assert data['choices'][0]['message']['content']
+        assert data['usage']['prompt_tokens_details']['cached_tokens'] == 8
+
+
+def test_streaming_frames(stub):
+    _, base_url = stub
+    _, body = _post(base_url + '/v1/chat/completions', dict(CHAT, stream=True))
+    assert body.rstrip().endswith('data: [DONE]')
+    _, body = _post(base_url + '/v1/messages', dict(CHAT, stream=True))
+    assert 'event: content_block_delta' in body
+    assert body.rstrip().endswith('data: {"type": "message_stop"}')
+
+
+def test_error_injection(stub):
+    config, base_url = stub
+    config.error_rate = 1.0
+    config.error_statuses = (429,)
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _post(base_url + '/v1/chat/completions', CHAT)
+    assert exc.value.code == 429
+    assert exc.value.headers['Retry-After'] == '1'
+
+
+def test_loadgen_reports_percentiles_and_errors(stub):
+    config, base_url = stub
+    config.error_rate = 0.5
+    report = loadgen.run_load(base_url + '/v1/chat/completions', rps=100, duration=0.3,
+                              payload_factory=lambda i: CHAT, concurrency=8, timeout=5)
+    assert report['requests'] == 30
+    assert report['ok'] + sum(report['errors'].values()) == 30
+    assert set(report['errors']) <= {'http_503'}
+    assert report['latency_ms']['p50'] <= report['latency_ms']['p99']
+    assert 'throughput' in loadgen.format_report(report)
+
+
+def test_percentile_nearest_rank():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert loadgen.percentile(values, 50) == 5
+    assert loadgen.percentile(values, 95) == 10
+    assert loadgen.percentile([], 99) == 0.0
@@ -0,0 +1,37 @@
+import numpy as np
+
+import stylometry
+from tools import stylometry_benchmark
+
+
+def _feature(features, row, name):
+    return features[row, stylometry.FEATURES.index(name)]
+
+
+def test_features_capture_rule_violations():
+    flagged = ("We leverage robust tools — and seamless ones — to delve into data. "
+               "It is fast, cheap, and safe. In summary, it works.")
+    clean = "We don't overthink it. Sometimes the plan changes halfway through, and that's fine. Really."
+    features, scores = stylometry.score_corpus([flagged, clean])
+    assert _feature(features, 0, 'banned_per_1000w') > 0
+    assert _feature(features, 0, 'em_dash_per_500w') > 0
+    assert _feature(features, 0, 'triads_per_sentence') > 0
+    assert _feature(features, 0, 'clarifying_per_1000w') > 0
+    assert _feature(features, 1, 'contractions_per_100w') > 0
+    assert scores[0] > scores[1]
+    assert ((scores >= 0) & (scores <= 1)).all()
+
+
+def test_batch_scoring_matches_per_document_scoring():
+    docs = stylometry_benchmark.SAMPLE_CORPUS + ['', 'One line only']
+    batch, _ = stylometry.score_corpus(docs)
+    single = np.vstack([stylometry.extract_features([d]) for d in docs])
+    assert np.allclose(batch, single)
+
+
+def test_benchmark_reports_every_level(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the pipeline appends telemetry to the working directory
+    report = stylometry_benchmark.run_benchmark(stylometry_benchmark.SAMPLE_CORPUS)
+    assert set(report['levels']) == set(stylometry_benchmark.LEVELS)
+    assert report['levels']['aggressive']['score_delta'] < 0
+    assert report['levels']['aggressive']['postprocess_docs_per_s'] > 0
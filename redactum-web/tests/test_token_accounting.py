@@ -0,0 +1,56 @@
+import pytest
+
+import app as appmod
+import jsoncodec
+from tools import stub_provider
+
+
+@pytest.fixture
+def stub():
+    config = stub_provider.StubConfig(latency='fixed:0', seed=5)
+    server, base_url = stub_provider.start_in_thread(config)
+    yield {'activeProvider': 'custom',
+           'providers': {'custom': {'apiKey': '', 'model': 'stub-model', 'baseUrl': base_url + '/v1'}}}
+    server.shutdown()
+    server.server_close()
+
+
+def test_prompt_sections_and_compact_variant():
+    tone = appmod.TONES[1]
+    full = appmod.create_refinement_prompt('Please send the files.', tone['id'], tone['instruction'], 'Be brief')
+    compact = appmod.create_refinement_prompt('Please send the files.', tone['id'], tone['instruction'], 'Be brief',
+                                              variant='compact')
+    assert set(full.sections) == {'system', 'tone', 'examples', 'custom', 'context', 'text'}
+    assert full.sections['custom'] > 0 and full.sections['context'] == 0
+    assert compact.sections['system'] < full.sections['system'] / 2
+    assert compact.prefix == full.prefix and compact.body == full.body
+    assert appmod.split_prompt(compact)[0] == appmod.COMPACT_SYSTEM_MESSAGE + compact.prefix
+    assert appmod.split_prompt(full)[0].startswith(appmod.UNIFIED_SYSTEM_MESSAGE)
+
+    assert appmod.prompt_variant({'promptVariant': 'compact'}, {}) == 'compact'
+    assert appmod.prompt_variant({}, {'promptVariant': 'compact'}) == 'compact'
+    assert appmod.prompt_variant({'promptVariant': 'tiny'}, {}) == 'full'
+
+
+def test_refine_reports_and_logs_tokens(stub, tmp_path, monkeypatch):
+    log = tmp_path / 'telemetry.jsonl'
+    monkeypatch.setattr(appmod, 'TELEMETRY_FILE', str(log))
+    data = {'text': 'Sorry we messed up your order, we will fix it soon.', 'tone': 'professional', 'debug': True}
+
+    reports = {}
+    for variant in ('full', 'compact'):
+        body, status, _ = appmod.run_refinement(dict(data, promptVariant=variant), stub)
+        assert status == 200
+        reports[variant] = body['postprocessReport']['tokens']
+
+    full, compact = reports['full'], reports['compact']
+    assert full['calls'] == 1 and full['completion'] > 0 and full['promptVariant'] == 'full'
+    assert full['prompt'] == sum(full['sections'].values())
+    assert compact['prompt'] < full['prompt'] and compact['promptVariant'] == 'compact'
+    # The stub reports usage too; the local estimate should be in the same range
+    assert abs(full['usage']['prompt_tokens'] - full['prompt']) < full['prompt'] * 0.25
+
+    entries = [jsoncodec.loads(line) for line in log.read_bytes().splitlines()]
+    assert [e['promptVariant'] for e in entries] == ['full', 'compact']
+    assert entries[0]['kind'] == 'tokens' and entries[0]['tone'] == 'professional'
+    assert data['text'] not in log.read_text()
@@ -0,0 +1,85 @@
+"""Compact text patches for refine responses.
+
+A patch is a list of ``[start, end, replacement]`` splices against the original
+text, in ascending order. Applying the splices from last to first turns the
+original into the refined text. Diffing is done on word tokens (each with its
+trailing whitespace), which keeps patches small.
+
+Word-level diffing is quadratic on repetitive text, so long documents are first
+matched paragraph by paragraph; only changed stretches of at most
+MAX_WORD_DIFF_TOKENS tokens are diffed word by word, longer ones are replaced
+whole.
+
+Offsets count code points by default. The API sends ``utf16=True`` offsets,
+which count UTF-16 code units like JavaScript string indices, so characters
+outside the BMP (emoji) count as two.
+"""
+import re
+from difflib import SequenceMatcher
+
+_TOKEN_RE = re.compile(r'\w+\s*|[^\w\s]+\s*|\s+')
+# A paragraph with the blank lines after it
+_PARAGRAPH_RE = re.compile(r'.+?(?:\n\s*\n\s*|$)', re.S)
+# Word diffs above this many tokens (either side) fall back to coarser splices
+MAX_WORD_DIFF_TOKENS = 2000
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text)
+
+
+def _paragraphs(text):
+    return [p for p in _PARAGRAPH_RE.findall(text) if p]
+
+
+def _length(text, utf16) -> int:
+    return len(text.encode('utf-16-le')) // 2 if utf16 else len(text)
+
+
+def _diff(a, b, base, patch, utf16, refine=None):
+    """Append splices turning the pieces ``a`` into ``b``; ``base`` is the offset of a[0].
+
+    ``refine(a_text, b_text, start)`` re-diffs a changed stretch more finely.
+    """
+    offsets = [base]
+    for piece in a:
+        offsets.append(offsets[-1] + _length(piece, utf16))
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if op == 'equal':
+            continue
+        if refine is not None and op == 'replace':
+            refine(''.join(a[i1:i2]), ''.join(b[j1:j2]), offsets[i1])
+        else:
+            patch.append([offsets[i1], offsets[i2], ''.join(b[j1:j2])])
+
+
+def make_patch(original: str, refined: str, utf16: bool = False):
+    """Return the splices that turn ``original`` into ``refined``."""
+    patch = []
+
+    def words(a_text, b_text, start):
+        a, b = _tokens(a_text), _tokens(b_text)
+        if max(len(a), len(b)) > MAX_WORD_DIFF_TOKENS:
+            patch.append([start, start + _length(a_text, utf16), b_text])
+        else:
+            _diff(a, b, start, patch, utf16)
+
+    a, b = _tokens(original), _tokens(refined)
+    if max(len(a), len(b)) <= MAX_WORD_DIFF_TOKENS:
+        _diff(a, b, 0, patch, utf16)
+    else:
+        _diff(_paragraphs(original), _paragraphs(refined), 0, patch, utf16, refine=words)
+    return patch
+
+
+def apply_patch(original: str, patch, utf16: bool = False) -> str:
+    """Apply splices produced by make_patch (with the same ``utf16``)."""
+    if utf16:
+        data = original.encode('utf-16-le')
+        for start, end, replacement in reversed(patch):
+            data = data[:2 * start] + replacement.encode('utf-16-le') + data[2 * end:]
+        return data.decode('utf-16-le')
+    text = original
+    for start, end, replacement in reversed(patch):
+        text = text[:start] + replacement + text[end:]
+    return text
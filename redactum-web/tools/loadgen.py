@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Open-loop load generator for redactum-web.
+
+Sends requests to ``/api/refine`` (or any JSON endpoint) at a fixed target rate
+and reports throughput, latency percentiles and an error breakdown. Requests are
+scheduled on a fixed timetable and latency is measured from each request's
+scheduled start, so a slow server cannot hide queueing delay by slowing the
+generator down (no coordinated omission).
+
+    python -m tools.loadgen --url http://127.0.0.1:5555 --rps 20 --duration 30
+
+Pair it with ``tools.stub_provider`` configured as the active provider's
+``baseUrl`` to capacity-plan workers without calling real providers.
+"""
+import argparse
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SAMPLE_TEXT = (
+    "Our team has been working on the new release for several weeks. We think it is ready, "
+    "but there are a few open questions about the rollout plan and the support load."
+)
+
+
+def default_payload(i):
+    return {'text': SAMPLE_TEXT, 'tone': 'professional', 'humanizeLevel': 'standard'}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0 for an empty list)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def send_request(url, payload, timeout):
+    """POST one JSON payload. Returns (outcome, status) where outcome is 'ok' or an error label."""
+    data = json.dumps(payload).encode('utf-8')
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return 'ok', resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return f'http_{e.code}', e.code
+    except urllib.error.URLError as e:
+        return f'connection:{type(e.reason).__name__}', None
+    except (TimeoutError, OSError) as e:
+        return type(e).__name__, None
+
+
+def run_load(url, rps, duration, payload_factory=default_payload, concurrency=64, timeout=60.0,
+             schedule=None, sender=send_request):
+    """Drive ``url`` at ``rps`` for ``duration`` seconds and return a report dict.
+
+    ``schedule`` may be a list of (offset_seconds, payload) pairs to replay instead of
+    a fixed-rate timetable.
+    """
+    if schedule is None:
+        total = max(1, int(rps * duration))
+        interval = 1.0 / rps
+        schedule = [(i * interval, payload_factory(i)) for i in range(total)]
+
+    results = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def _fire(offset, payload):
+        scheduled_at = start + offset
+        outcome, status = sender(url, payload, timeout)
+        latency = time.perf_counter() - scheduled_at
+        with lock:
+            results.append((outcome, latency))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for offset, payload in schedule:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(_fire, offset, payload)
+    elapsed = time.perf_counter() - start
+    return summarize(results, elapsed)
+
+
+def summarize(results, elapsed):
+    latencies = sorted(lat for outcome, lat in results if outcome == 'ok')
+    errors = {}
+    for outcome, _ in results:
+        if outcome != 'ok':
+            errors[outcome] = errors.get(outcome, 0) + 1
+    return {
+        'requests': len(results),
+        'ok': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(1000 * percentile(latencies, 50), 1),
+            'p95': round(1000 * percentile(latencies, 95), 1),
+            'p99': round(1000 * percentile(latencies, 99), 1),
+            'max': round(1000 * latencies[-1], 1) if latencies else 0.0,
+        },
+    }
+
+
+def format_report(report):
+    lat = report['latency_ms']
+    lines = [
+        f"requests: {report['requests']}  ok: {report['ok']}  elapsed: {report['elapsed_s']}s",
+        f"throughput: {report['throughput_rps']} req/s",
+        f"latency ms: p50={lat['p50']} p95={lat['p95']} p99={lat['p99']} max={lat['max']}",
+    ]
+    if report['errors']:
+        lines.append('errors: ' + ', '.join(f"{k}={v}" for k, v in sorted(report['errors'].items())))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Open-loop load generator for redactum-web')
+    parser.add_argument('--url', default='http://127.0.0.1:5555', help='server base URL')
+    parser.add_argument('--path', default='/api/refine')
+    parser.add_argument('--rps', type=float, default=5.0)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=64, help='max requests in flight')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--text-file', help='use this file as the text of every request')
+    parser.add_argument('--tone', default='professional')
+    parser.add_argument('--humanize-level', default='standard')
+    parser.add_argument('--prompt-variant', help='system message variant to request (full or compact)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    text = SAMPLE_TEXT
+    if args.text_file:
+        with open(args.text_file) as f:
+            text = f.read()
+
+    def payload(i):
+        body = {'text': text, 'tone': args.tone, 'humanizeLevel': args.humanize_level}
+        if args.prompt_variant:
+            body['promptVariant'] = args.prompt_variant
+        return body
+
+    report = run_load(args.url.rstrip('/') + args.path, args.rps, args.duration, payload,
+                      args.concurrency, args.timeout)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == '__main__':
+    main()
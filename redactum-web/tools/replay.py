@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Replay captured traffic shapes against a running server.
+
+Reads a capture file written with ``REDACTUM_TRAFFIC_CAPTURE`` (see capture.py),
+rebuilds each request with synthetic text of the same length, tone, humanize
+level and options, and sends them with the captured inter-arrival times, divided
+by ``--speed``. Reports latency and throughput like tools.loadgen.
+
+    python -m tools.replay --capture traffic.jsonl --url http://127.0.0.1:5555 --speed 4
+
+Point the server's provider ``baseUrl`` at tools.stub_provider to benchmark
+the app itself without calling real providers.
+"""
+import argparse
+import json
+import random
+
+import capture
+from tools import loadgen
+
+WORDS = (
+    "the team plan release customer support report week data change review update project "
+    "meeting budget quarter product feature issue result process goal question time cost "
+    "schedule launch feedback design draft note market sales account service policy risk "
+    "we will should could need make take keep improve check share send agree expect "
+    "new clear small large early late simple final current open strong quick"
+).split()
+
+
+def synthetic_text(chars, seed=0):
+    """Plain English-like text of exactly ``chars`` characters (deterministic per seed)."""
+    if chars <= 0:
+        return ''
+    rng = random.Random(seed)
+    sentences = []
+    length = 0
+    while length < chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 22))]
+        sentence = ' '.join(words).capitalize() + '.'
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    text = ' '.join(sentences)[:chars]
+    return text if not text.endswith(' ') else text[:-1] + '.'
+
+
+def payload_for(shape, seed=0):
+    payload = {
+        'text': synthetic_text(shape.get('textChars', 0), seed),
+        'tone': shape.get('tone', 'professional'),
+        'humanizeLevel': shape.get('humanizeLevel', 'standard'),
+    }
+    if shape.get('customInstructionChars'):
+        payload['customInstructions'] = synthetic_text(shape['customInstructionChars'], seed + 1)
+    for key in ('debug', 'compact'):
+        if shape.get(key):
+            payload[key] = True
+    if shape.get('responseFormat', 'full') != 'full':
+        payload['responseFormat'] = shape['responseFormat']
+    if shape.get('promptVariant', 'full') != 'full':
+        payload['promptVariant'] = shape['promptVariant']
+    return payload
+
+
+def build_schedule(shapes, speed=1.0, limit=None):
+    """Turn captured shapes into loadgen (offset_seconds, payload) pairs."""
+    shapes = shapes[:limit] if limit else shapes
+    if not shapes:
+        return []
+    start = shapes[0].get('ts', 0)
+    return [(max(0.0, (s.get('ts', start) - start) / speed), payload_for(s, seed=i))
+            for i, s in enumerate(shapes)]
+
+
+def describe(shapes) -> dict:
+    """Traffic mix of a capture: request count, span, sizes, tones and levels."""
+    if not shapes:
+        return {'requests': 0}
+    chars = sorted(s.get('textChars', 0) for s in shapes)
+    tones, levels = {}, {}
+    for s in shapes:
+        tones[s.get('tone')] = tones.get(s.get('tone'), 0) + 1
+        levels[s.get('humanizeLevel')] = levels.get(s.get('humanizeLevel'), 0) + 1
+    return {
+        'requests': len(shapes),
+        'span_s': round(shapes[-1].get('ts', 0) - shapes[0].get('ts', 0), 3),
+        'text_chars': {'p50': loadgen.percentile(chars, 50), 'p95': loadgen.percentile(chars, 95), 'max': chars[-1]},
+        'tones': tones,
+        'humanize_levels': levels,
+    }
+
+
+def replay(url, shapes, speed=1.0, limit=None, concurrency=64, timeout=60.0, sender=loadgen.send_request):
+    schedule = build_schedule(shapes, speed, limit)
+    report = loadgen.run_load(url, rps=1.0, duration=0, concurrency=concurrency, timeout=timeout,
+                              schedule=schedule, sender=sender)
+    report['traffic'] = describe(shapes[:limit] if limit else shapes)
+    report['speed'] = speed
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay captured traffic shapes against redactum-web')
+    parser.add_argument('--capture', required=True, help='capture file (REDACTUM_TRAFFIC_CAPTURE output)')
+    parser.add_argument('--url', default='http://127.0.0.1:5555', help='server base URL')
+    parser.add_argument('--path', default='/api/refine')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed-up factor (1 = real time)')
+    parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    parser.add_argument('--concurrency', type=int, default=64, help='max requests in flight')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    shapes = capture.load(args.capture)
+    report = replay(args.url.rstrip('/') + args.path, shapes, args.speed, args.limit,
+                    args.concurrency, args.timeout)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        traffic = report['traffic']
+        print(f"replayed {traffic['requests']} requests spanning {traffic.get('span_s', 0)}s at {args.speed}x")
+        print(loadgen.format_report(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Local stub of the OpenAI, Groq and Anthropic chat endpoints.
+
+Serves canned completions with configurable latency, error rate and prompt-cache
+usage so the real HTTP path of redactum-web can be exercised and load-tested
+without touching a paid provider. Point a provider's ``baseUrl`` at this server:
+
+    python -m tools.stub_provider --port 8089 --latency lognormal:0.4,0.5 --error-rate 0.02
+
+Endpoints:
+  POST /v1/chat/completions           OpenAI (and any OpenAI-compatible client)
+  POST /openai/v1/chat/completions    Groq
+  POST /v1/messages                   Anthropic
+Streaming (``"stream": true``) is supported for all three using each API's SSE framing.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_OUTPUTS = [
+    "The team shipped the update on Tuesday. Support tickets dropped by a third in the first week.",
+    "We moved the review to Friday so everyone has time to read the draft. Send comments by Thursday noon.",
+    "The new onboarding guide covers account setup and billing. It takes about ten minutes to read.",
+]
+
+
+def parse_latency(spec: str):
+    """Return a zero-argument sampler (seconds) for a latency spec.
+
+    Supported: ``fixed:S``, ``uniform:LO,HI``, ``lognormal:MEDIAN,SIGMA``,
+    ``normal:MEAN,STDDEV`` (clamped at zero).
+    """
+    kind, _, args = (spec or 'fixed:0').partition(':')
+    values = [float(v) for v in args.split(',') if v.strip()] if args else [0.0]
+    rng = random.Random()
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda: rng.lognormvariate(mu, values[1])
+    if kind == 'normal':
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class StubConfig:
+    """Behaviour of the stub server; mutable at runtime (e.g. from tests)."""
+
+    def __init__(self, latency='fixed:0', error_rate=0.0, error_statuses=(503,), outputs=None,
+                 echo=False, cached_tokens=0, stream_chunk_words=4, seed=None):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.outputs = list(outputs or DEFAULT_OUTPUTS)
+        self.echo = echo
+        self.cached_tokens = cached_tokens
+        self.stream_chunk_words = stream_chunk_words
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def next_output(self, prompt_text, extra_choice=False):
+        with self.lock:
+            if not extra_choice:
+                self.requests += 1
+            if self.echo:
+                return prompt_text
+            return self.outputs[self.rng.randrange(len(self.outputs))]
+
+    def next_error(self):
+        with self.lock:
+            if self.error_rate and self.rng.random() < self.error_rate:
+                return self.error_statuses[self.rng.randrange(len(self.error_statuses))]
+        return None
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _prompt_text(body, anthropic=False):
+    parts = []
+    if anthropic:
+        system = body.get('system')
+        if isinstance(system, list):
+            parts.extend(b.get('text', '') for b in system if isinstance(b, dict))
+        elif system:
+            parts.append(str(system))
+    for message in body.get('messages') or []:
+        content = message.get('content', '')
+        if isinstance(content, list):
+            parts.extend(b.get('text', '') for b in content if isinstance(b, dict))
+        else:
+            parts.append(str(content))
+    return '\n'.join(parts)
+
+
+def _last_user_text(body):
+    for message in reversed(body.get('messages') or []):
+        if message.get('role') == 'user':
+            content = message.get('content', '')
+            if isinstance(content, list):
+                return ' '.join(b.get('text', '') for b in content if isinstance(b, dict))
+            return str(content)
+    return ''
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'RedactumStub/1.0'
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.stub_config
+
+    def log_message(self, format, *args):
+        if getattr(self.server, 'verbose', False):
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b'{}'
+        return json.loads(raw or b'{}')
+
+    def do_GET(self):
+        if self.path in ('/health', '/v1/models', '/openai/v1/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'stub-model', 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        try:
+            body = self._read_body()
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'invalid JSON'}})
+            return
+        if self.path in ('/v1/chat/completions', '/openai/v1/chat/completions', '/chat/completions'):
+            anthropic = False
+        elif self.path in ('/v1/messages', '/messages'):
+            anthropic = True
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+
+        time.sleep(self.config.sample_latency())
+        status = self.config.next_error()
+        if status is not None:
+            headers = {'Retry-After': '1'} if status == 429 else None
+            self._send_json(status, {'error': {'type': 'stub_error', 'message': f'injected {status}'}}, headers)
+            return
+
+        prompt_text = _prompt_text(body, anthropic)
+        output = self.config.next_output(_last_user_text(body))
+        prompt_tokens = _estimate_tokens(prompt_text)
+        cached = min(self.config.cached_tokens, prompt_tokens)
+        completion_tokens = _estimate_tokens(output)
+        model = body.get('model') or 'stub-model'
+
+        if body.get('stream'):
+            if anthropic:
+                self._stream_anthropic(model, output, prompt_tokens, cached, completion_tokens)
+            else:
+                self._stream_openai(model, output)
+            return
+
+        if anthropic:
+            self._send_json(200, {
+                'id': f'msg_{uuid.uuid4().hex[:12]}', 'type': 'message', 'role': 'assistant', 'model': model,
+                'content': [{'type': 'text', 'text': output}], 'stop_reason': 'end_turn',
+                'usage': {'input_tokens': prompt_tokens - cached, 'output_tokens': completion_tokens,
+                          'cache_read_input_tokens': cached, 'cache_creation_input_tokens': 0},
+            })
+        else:
+            # n > 1 returns extra choices, billed as extra completion tokens
+            outputs = [output] + [self.config.next_output(_last_user_text(body), extra_choice=True)
+                                  for _ in range(max(1, int(body.get('n') or 1)) - 1)]
+            completion_tokens = sum(_estimate_tokens(o) for o in outputs)
+            self._send_json(200, {
+                'id': f'chatcmpl-{uuid.uuid4().hex[:12]}', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': i, 'message': {'role': 'assistant', 'content': o}, 'finish_reason': 'stop'}
+                            for i, o in enumerate(outputs)],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens,
+                          'prompt_tokens_details': {'cached_tokens': cached}},
+            })
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+    def _pieces(self, output):
+        words = output.split(' ')
+        n = max(1, self.config.stream_chunk_words)
+        for i in range(0, len(words), n):
+            yield (' ' if i else '') + ' '.join(words[i:i + n])
+
+    def _sse(self, payload, event=None):
+        frame = (f'event: {event}\n' if event else '') + f'data: {payload}\n\n'
+        self.wfile.write(frame.encode('utf-8'))
+        self.wfile.flush()
+
+    def _stream_openai(self, model, output):
+        self._start_stream()
+        cid = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+        base = {'id': cid, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model}
+        for piece in self._pieces(output):
+            self._sse(json.dumps(dict(base, choices=[{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}])))
+        self._sse(json.dumps(dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])))
+        self._sse('[DONE]')
+
+    def _stream_anthropic(self, model, output, prompt_tokens, cached, completion_tokens):
+        self._start_stream()
+        mid = f'msg_{uuid.uuid4().hex[:12]}'
+        self._sse(json.dumps({'type': 'message_start', 'message': {
+            'id': mid, 'type': 'message', 'role': 'assistant', 'model': model, 'content': [],
+            'usage': {'input_tokens': prompt_tokens - cached, 'output_tokens': 0, 'cache_read_input_tokens': cached}}}),
+            'message_start')
+        self._sse(json.dumps({'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}),
+                  'content_block_start')
+        for piece in self._pieces(output):
+            self._sse(json.dumps({'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': piece}}),
+                      'content_block_delta')
+        self._sse(json.dumps({'type': 'content_block_stop', 'index': 0}), 'content_block_stop')
+        self._sse(json.dumps({'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                              'usage': {'output_tokens': completion_tokens}}), 'message_delta')
+        self._sse(json.dumps({'type': 'message_stop'}), 'message_stop')
+
+
+def make_server(config=None, host='127.0.0.1', port=0, verbose=False):
+    """Create (but do not start) a stub server; ``port=0`` picks a free port."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.stub_config = config or StubConfig()
+    server.verbose = verbose
+    return server
+
+
+def start_in_thread(config=None, host='127.0.0.1', port=0):
+    """Start a stub server on a background thread; returns (server, base_url)."""
+    server = make_server(config, host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', default='fixed:0.3', help='fixed:S | uniform:LO,HI | lognormal:MEDIAN,SIGMA | normal:MEAN,SD')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', default='503', help='comma-separated statuses to inject, e.g. 429,503')
+    parser.add_argument('--outputs', help='JSON file with a list of canned outputs')
+    parser.add_argument('--echo', action='store_true', help='return the user message instead of canned output')
+    parser.add_argument('--cached-tokens', type=int, default=0, help='prompt tokens to report as cached')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    outputs = None
+    if args.outputs:
+        with open(args.outputs) as f:
+            outputs = json.load(f)
+    config = StubConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_status.split(',') if s.strip()],
+        outputs=outputs,
+        echo=args.echo,
+        cached_tokens=args.cached_tokens,
+    )
+    server = make_server(config, args.host, args.port, args.verbose)
+    print(f"Stub provider listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
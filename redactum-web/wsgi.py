@@ -0,0 +1,13 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py
+
+With ``preload_app`` this module is imported once in the gunicorn master, so the
+warmup below runs before workers fork and its results are shared copy-on-write.
+"""
+import startup  # noqa: F401  (first import, so BOOT_STARTED marks process boot)
+import app as appmod
+
+startup.warm_app(appmod)
+
+application = appmod.app